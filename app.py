@@ -1,54 +1,31 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import uuid, time
+import json
+import os
 
-from itinerary import build_itinerary, make_human_like
-from flight_utils import ask_and_show_flights
+from itinerary import build_itinerary, make_human_like, make_human_like_stream, date_resolver_stats
+from flight_utils import ask_and_show_flights, search_cache, skyexperts_flight
 from smart_flight_utils import run_smart_flight_search
+from date_engine import date_engine_stats
+from intent_cache import intent_cache
+from query_rules import parser_tier_stats
+from narrative_cache import narrative_cache
+from catalog_snapshot import load_info as catalog_load_info
+from session_store import sessions
+from llm_client import openai_flight
+from upstream_limits import UpstreamBusy, upstream_limit_stats
+from deadline import DeadlineExceeded, deadline_scope, deadline_stats, degraded, use_deadline
 
 app = Flask(__name__)
 CORS(app)
 
-sessions = {}
-SESSION_TTL = 600
+# Less request budget than this left after planning → itinerary goes out without the narrative
+NARRATIVE_MIN_SECONDS = float(os.getenv("NARRATIVE_MIN_SECONDS", 3))
 
 
 def get_session(session_id=None):
     """Fetch existing session or create a new one."""
-    now = time.time()
-
-    # Purane expired sessions hata do
-    expired = [sid for sid, s in sessions.items() if now - s["timestamp"] > SESSION_TTL]
-    for sid in expired:
-        del sessions[sid]
-
-    # ✅ Agar client ne session_id bheja hai
-    if session_id:
-        if session_id in sessions:
-            # Existing session update
-            sessions[session_id]["timestamp"] = now
-        else:
-            # 👇 Quick fix: Naya session create karo but same ID use karo
-            sessions[session_id] = {
-                "flight_already_searched": False,
-                "started_with_flight": False,
-                "last_depdate": None,
-                "last_parsed": None,
-                "timestamp": now
-            }
-        return session_id, sessions[session_id]
-
-    # Agar client ne session_id nahi bheja to naya generate karo
-    new_id = str(uuid.uuid4())
-    sessions[new_id] = {
-        "flight_already_searched": False,
-        "started_with_flight": False,
-        "last_depdate": None,
-        "last_parsed": None,
-        "timestamp": now
-    }
-    return new_id, sessions[new_id]
-
+    return sessions.get(session_id)
 
 
 @app.route("/")
@@ -56,73 +33,243 @@ def home():
     return jsonify({"message": "🌍 Travel Planner API is running"})
 
 
-@app.route("/query", methods=["POST"])
-def query_handler():
-    data = request.get_json()
-    query = data.get("query", "").strip()
-    session_id = data.get("session_id")
+def stats_payload():
+    return {
+        "flight_cache": search_cache.stats(),
+        "date_resolver": date_resolver_stats(),
+        "date_engine": date_engine_stats(),
+        "intent_cache": intent_cache.stats(),
+        "flight_parser": parser_tier_stats(),
+        "narrative_cache": narrative_cache.stats(),
+        "sessions": sessions.stats(),
+        "single_flight": {"skyexperts": skyexperts_flight.stats(), "openai": openai_flight.stats()},
+        "upstream_limits": upstream_limit_stats(),
+        "deadlines": deadline_stats(),
+        "catalog": catalog_load_info
+    }
 
-    # Get session
-    session_id, state = get_session(session_id)
 
-    if not query:
-        return jsonify({"error": "⚠️ Please enter a query", "session_id": session_id}), 400
+@app.route("/stats")
+def stats():
+    return jsonify(stats_payload())
+
+
+def busy_response(e):
+    """503 body for an UpstreamBusy: fail fast, tell the client when to retry."""
+    return {
+        "error": f"⚠️ We're handling a lot of requests right now, please retry in {e.retry_after} s",
+        "upstream": e.upstream,
+        "retry_after": e.retry_after
+    }
+
+
+@app.errorhandler(UpstreamBusy)
+def upstream_busy(e):
+    return jsonify(busy_response(e)), 503, {"Retry-After": str(e.retry_after)}
+
+
+TIMEOUT_RESPONSE = {"error": "⚠️ That took longer than expected, please try again"}
+
+
+@app.errorhandler(DeadlineExceeded)
+def deadline_exceeded(e):
+    return jsonify(TIMEOUT_RESPONSE), 504
 
-    # ---------------- detect flight query ----------------
+
+def is_flight_query(query):
     flight_keywords = ["flight", "book", "ticket"]
     is_flight = any(k in query.lower() for k in flight_keywords)
     if " from " in query.lower() and " to " in query.lower():
         is_flight = True
+    return is_flight
 
-    # ---------------- case 1: flight after itinerary ----------------
+
+def flight_case(query, state):
+    """1 = flight after itinerary, 2 = direct flight query, None = itinerary query (case 3)."""
+    is_flight = is_flight_query(query)
     if state["last_parsed"] and not is_flight:
-        parts = query.split(" ", 1)
-        dep_from = parts[0].strip().upper()
-        raw_date = parts[1] if len(parts) > 1 else None
+        return 1
+    return 2 if is_flight else None
+
+
+def split_departure(query):
+    """Case 1 follow-up "DEL tomorrow" → ("DEL", "tomorrow")."""
+    parts = query.split(" ", 1)
+    return parts[0].strip().upper(), (parts[1] if len(parts) > 1 else None)
+
+
+def after_itinerary_response(session_id, flights):
+    return {
+        "session_id": session_id,
+        "flight_search": "✅ Flights fetched after itinerary",
+        "flights": flights
+    }
+
 
+def direct_flight_response(session_id, state, flight_data):
+    # ✅ Force update flags hamesha
+    state["flight_already_searched"] = True
+    state["started_with_flight"] = True
+    if isinstance(flight_data, dict):
+        state["last_depdate"] = flight_data.get("depdate")
+
+    return {
+        "session_id": session_id,
+        "flight_search": "✅ Flights fetched from SkyExperts API",
+        **flight_data,
+        "next_question": "🗺️ Want me to plan a trip for your dates? Just tell me for how many days."
+    }
+
+
+def handle_flight_query(query, data, session_id, state):
+    """Cases 1 and 2 of /query. Returns the response dict, or None for an itinerary query."""
+    case = flight_case(query, state)
+
+    # ---------------- case 1: flight after itinerary ----------------
+    if case == 1:
+        dep_from, raw_date = split_departure(query)
         flights = ask_and_show_flights(state["last_parsed"], dep_from=dep_from, raw_date=raw_date)
-        return jsonify({
-            "session_id": session_id,
-            "flight_search": "✅ Flights fetched after itinerary",
-            "flights": flights
-        })
+        return after_itinerary_response(session_id, flights)
 
     # ---------------- case 2: direct flight query ----------------
-    if is_flight:
-        flight_data = run_smart_flight_search(query)
-
-        # ✅ Force update flags hamesha
-        state["flight_already_searched"] = True
-        state["started_with_flight"] = True
-        if isinstance(flight_data, dict):
-            state["last_depdate"] = flight_data.get("depdate")
-
-        return jsonify({
-            "session_id": session_id,
-            "flight_search": "✅ Flights fetched from SkyExperts API",
-            **flight_data,
-            "next_question": "🗺️ Want me to plan a trip for your dates? Just tell me for how many days."
-        })
-
-    # ---------------- case 3: itinerary query ----------------
-    parsed, itinerary = build_itinerary(query)
+    if case == 2:
+        # Optional "flex_days": N → fare calendar over depdate ± N days
+        flight_data = run_smart_flight_search(query, flex_days=data.get("flex_days") or 0)
+        return direct_flight_response(session_id, state, flight_data)
+
+    return None
+
+
+def plan_itinerary(query, state):
+    """Case 3 of /query (without the narrative)."""
+    return remember_itinerary(state, *build_itinerary(query))
+
+
+def remember_itinerary(state, parsed, itinerary):
     if state["last_depdate"]:
         parsed["start_date"] = state["last_depdate"]
 
     state["last_parsed"] = parsed
-    narrative = make_human_like(parsed, itinerary)
+    return parsed, itinerary
+
+
+def narrative_skipped(deadline):
+    """True (and recorded) when too little of the request budget is left for the narrative."""
+    if deadline.remaining() >= NARRATIVE_MIN_SECONDS:
+        return False
+    degraded("narrative", f"{deadline.remaining():.1f} s left")
+    return True
+
 
+def narrative_or_none(parsed, itinerary, deadline):
+    """make_human_like, or None if it can't be written within the deadline."""
+    if narrative_skipped(deadline):
+        return None
+    try:
+        return make_human_like(parsed, itinerary)
+    except Exception as e:
+        degraded("narrative", e)
+        return None
+
+
+def itinerary_response(session_id, state, itinerary, narrative):
     response = {
         "session_id": session_id,
         "itinerary": itinerary,
         "narrative": narrative
     }
 
+    # Narrative skipped to stay within the deadline: the itinerary itself is complete
+    if narrative is None:
+        response["degraded"] = ["narrative"]
+
     # ✅ Flight question tabhi poochna jab ab tak flights search hi nahi hue
     if state.get("flight_already_searched") is False:
         response["next_question"] = "✈️ Do you want to book flights? Just tell me your departure city and date."
+    return response
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route("/query", methods=["POST"])
+def query_handler():
+    data = request.get_json()
+    query = data.get("query", "").strip()
+    session_id = data.get("session_id")
+
+    # Get session
+    session_id, state = get_session(session_id)
+
+    if not query:
+        return jsonify({"error": "⚠️ Please enter a query", "session_id": session_id}), 400
+
+    # Every upstream call below shares this request's QUERY_DEADLINE budget
+    with deadline_scope() as deadline:
+        flight_response = handle_flight_query(query, data, session_id, state)
+        if flight_response is not None:
+            sessions.save(session_id, state)
+            return jsonify(flight_response)
+
+        # ---------------- case 3: itinerary query ----------------
+        parsed, itinerary = plan_itinerary(query, state)
+        sessions.save(session_id, state)
+        narrative = narrative_or_none(parsed, itinerary, deadline)
+        return jsonify(itinerary_response(session_id, state, itinerary, narrative))
+
+
+@app.route("/query/stream", methods=["POST"])
+def query_stream_handler():
+    """
+    Server-Sent Events variant of /query.
+    Itinerary queries: "itinerary" event right away, then "narrative" events with text
+    deltas as the LLM generates them, then "done" with the full narrative.
+    Flight queries have no narrative, so they arrive as a single "result" event.
+    """
+    data = request.get_json()
+    query = data.get("query", "").strip()
+    session_id = data.get("session_id")
+
+    session_id, state = get_session(session_id)
+
+    if not query:
+        return jsonify({"error": "⚠️ Please enter a query", "session_id": session_id}), 400
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    with deadline_scope() as deadline:
+        flight_response = handle_flight_query(query, data, session_id, state)
+        if flight_response is not None:
+            sessions.save(session_id, state)
+            return Response(sse_event("result", flight_response), mimetype="text/event-stream", headers=headers)
+
+        parsed, itinerary = plan_itinerary(query, state)
+        sessions.save(session_id, state)
+
+    def generate():
+        yield sse_event("itinerary", {"session_id": session_id, "itinerary": itinerary})
+        narrative = None
+        if not narrative_skipped(deadline):
+            parts = []
+            # Runs after the handler returned: re-enter the same deadline
+            with use_deadline(deadline):
+                try:
+                    for delta in make_human_like_stream(parsed, itinerary):
+                        parts.append(delta)
+                        yield sse_event("narrative", {"delta": delta})
+                except Exception as e:
+                    # Same contract as /query: an unfinished narrative is null + "degraded"
+                    degraded("narrative", e)
+                    yield sse_event("error", {"error": f"⚠️ Narrative generation failed: {e}"})
+                else:
+                    narrative = "".join(parts)
+
+        done = itinerary_response(session_id, state, itinerary, narrative)
+        done.pop("itinerary")  # already sent in the first event
+        yield sse_event("done", done)
 
-    return jsonify(response)
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=headers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,235 @@
+"""
+asyncio (ASGI) serving mode of the same API as app.py: /, /stats, /query, /query/stream.
+
+In the Flask app every LLM / SkyExperts wait blocks its worker, so concurrency is capped
+by the process count. Here those waits are awaited on the async OpenAI and httpx clients,
+and one worker process holds hundreds of requests in flight. Everything else (parsing,
+catalog, sessions, response shapes) is the same code as app.py.
+
+Run (with more than one worker, set SESSION_BACKEND=sqlite so follow-ups find their state):
+    uvicorn async_app:app --host 0.0.0.0 --port 5000 [--workers N]
+"""
+import json
+import traceback
+
+from app import (
+    TIMEOUT_RESPONSE, after_itinerary_response, busy_response, direct_flight_response, flight_case, get_session,
+    itinerary_response, narrative_skipped, remember_itinerary, split_departure, sse_event, stats_payload,
+)
+from deadline import DeadlineExceeded, deadline_scope, degraded
+from flight_utils import ask_and_show_flights_async
+from itinerary import build_itinerary_async, make_human_like_async, make_human_like_stream_async
+from session_store import sessions
+from smart_flight_utils import run_smart_flight_search_async
+from upstream_limits import UpstreamBusy
+
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+SSE_HEADERS = [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")]
+
+
+# ---------------- Query handling (mirrors app.py) ----------------
+async def handle_flight_query(query, data, session_id, state):
+    """Cases 1 and 2 of /query. Returns the response dict, or None for an itinerary query."""
+    case = flight_case(query, state)
+    if case == 1:
+        dep_from, raw_date = split_departure(query)
+        flights = await ask_and_show_flights_async(state["last_parsed"], dep_from=dep_from, raw_date=raw_date)
+        return after_itinerary_response(session_id, flights)
+    if case == 2:
+        flight_data = await run_smart_flight_search_async(query, flex_days=data.get("flex_days") or 0)
+        return direct_flight_response(session_id, state, flight_data)
+    return None
+
+
+async def plan_itinerary(query, state):
+    return remember_itinerary(state, *await build_itinerary_async(query))
+
+
+async def narrative_or_none(parsed, itinerary, deadline):
+    if narrative_skipped(deadline):
+        return None
+    try:
+        return await make_human_like_async(parsed, itinerary)
+    except Exception as e:
+        degraded("narrative", e)
+        return None
+
+
+async def query_handler(data, send):
+    query = data.get("query", "").strip()
+    session_id, state = get_session(data.get("session_id"))
+
+    if not query:
+        return await send_json(send, {"error": "⚠️ Please enter a query", "session_id": session_id}, 400)
+
+    with deadline_scope() as deadline:
+        flight_response = await handle_flight_query(query, data, session_id, state)
+        if flight_response is not None:
+            sessions.save(session_id, state)
+            return await send_json(send, flight_response)
+
+        # ---------------- case 3: itinerary query ----------------
+        parsed, itinerary = await plan_itinerary(query, state)
+        sessions.save(session_id, state)
+        narrative = await narrative_or_none(parsed, itinerary, deadline)
+        await send_json(send, itinerary_response(session_id, state, itinerary, narrative))
+
+
+async def query_stream_handler(data, send):
+    """Same events as app.query_stream_handler."""
+    query = data.get("query", "").strip()
+    session_id, state = get_session(data.get("session_id"))
+
+    if not query:
+        return await send_json(send, {"error": "⚠️ Please enter a query", "session_id": session_id}, 400)
+
+    with deadline_scope() as deadline:
+        flight_response = await handle_flight_query(query, data, session_id, state)
+        if flight_response is not None:
+            sessions.save(session_id, state)
+            await start_events(send)
+            return await send_event(send, sse_event("result", flight_response), last=True)
+
+        parsed, itinerary = await plan_itinerary(query, state)
+        sessions.save(session_id, state)
+
+        await start_events(send)
+        await send_event(send, sse_event("itinerary", {"session_id": session_id, "itinerary": itinerary}))
+        narrative = None
+        if not narrative_skipped(deadline):
+            parts = []
+            try:
+                async for delta in make_human_like_stream_async(parsed, itinerary):
+                    parts.append(delta)
+                    await send_event(send, sse_event("narrative", {"delta": delta}))
+            except Exception as e:
+                degraded("narrative", e)
+                await send_event(send, sse_event("error", {"error": f"⚠️ Narrative generation failed: {e}"}))
+            else:
+                narrative = "".join(parts)
+
+    done = itinerary_response(session_id, state, itinerary, narrative)
+    done.pop("itinerary")  # already sent in the first event
+    await send_event(send, sse_event("done", done), last=True)
+
+
+# ---------------- ASGI plumbing ----------------
+async def read_json(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    try:
+        data = json.loads(body or b"null")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def send_json(send, payload, status=200, headers=()):
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                    *headers, *CORS_HEADERS],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def start_events(send):
+    await send({"type": "http.response.start", "status": 200, "headers": SSE_HEADERS + CORS_HEADERS})
+
+
+async def send_event(send, event, last=False):
+    await send({"type": "http.response.body", "body": event.encode("utf-8"), "more_body": not last})
+
+
+def tracking(send):
+    """(send wrapper, state): state["started"] / state["finished"] record what has gone out."""
+    state = {"started": False, "finished": False}
+
+    async def tracked(message):
+        if message["type"] == "http.response.start":
+            state["started"] = True
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            state["finished"] = True
+        await send(message)
+
+    return tracked, state
+
+
+async def send_error(send, state, payload, status, headers=()):
+    """
+    Error as a JSON response; once an event stream has started (headers sent), as a last
+    SSE "error" event instead, like the Flask generate() path. Nothing if it already ended.
+    """
+    if state["finished"]:
+        return
+    if state["started"]:
+        return await send_event(send, sse_event("error", payload), last=True)
+    await send_json(send, payload, status, headers)
+
+
+async def preflight(scope, send):
+    requested = dict(scope["headers"]).get(b"access-control-request-headers", b"*")
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+                    (b"access-control-allow-headers", requested), (b"content-length", b"0"), *CORS_HEADERS],
+    })
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+ROUTES = {
+    ("POST", "/query"): query_handler,
+    ("POST", "/query/stream"): query_stream_handler,
+}
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"]
+    if method == "OPTIONS":
+        return await preflight(scope, send)
+    if method == "GET" and path == "/":
+        return await send_json(send, {"message": "🌍 Travel Planner API is running"})
+    if method == "GET" and path == "/stats":
+        return await send_json(send, stats_payload())
+
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        allowed = any(p == path for _, p in ROUTES)
+        return await send_json(send, {"error": "Method Not Allowed" if allowed else "Not Found"},
+                               405 if allowed else 404)
+
+    data = await read_json(receive)
+    if data is None:
+        return await send_json(send, {"error": "Bad Request: expected a JSON object"}, 400)
+    send, state = tracking(send)
+    try:
+        await handler(data, send)
+    except UpstreamBusy as e:
+        await send_error(send, state, busy_response(e), 503, [(b"retry-after", str(e.retry_after).encode())])
+    except DeadlineExceeded:
+        await send_error(send, state, TIMEOUT_RESPONSE, 504)
+    except Exception:
+        traceback.print_exc()
+        await send_error(send, state, {"error": "Internal Server Error"}, 500)
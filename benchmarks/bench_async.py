@@ -0,0 +1,141 @@
+"""
+/query throughput of the two serving modes against a local fake upstream:
+- sync:  gunicorn + Flask (app:app), SYNC_WORKERS sync worker processes
+- async: uvicorn + async_app:app, ONE worker process
+
+fake_upstream.py answers LLM calls after FAKE_LLM_MS and SkyExperts searches after
+FAKE_SKYEXPERTS_MS. The workload alternates itinerary queries (LLM date extraction +
+LLM narrative) and direct flight queries (offline parse + SkyExperts POST). Flight and
+narrative caches are disabled so every request waits on the upstream.
+For each concurrency level, that many clients loop for DURATION seconds. Reported:
+completed requests/s, p50 / p99 latency, errors.
+
+Run from the repo root (needs gunicorn, uvicorn and httpx):
+    python benchmarks/bench_async.py [concurrency ...]
+"""
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH = os.path.join(REPO, "benchmarks")
+sys.path.insert(0, BENCH)
+
+from bench_workers_rss import CSV_NAMES, UAE_CITIES  # noqa: E402
+from bench_catalog_memory import write_csvs  # noqa: E402
+
+FAKE_PORT, APP_PORT = 18900, 18901
+SYNC_WORKERS = int(os.getenv("SYNC_WORKERS", 4))
+DURATION = float(os.getenv("DURATION", 10))
+QUERIES = [
+    {"query": "3 days in Dubai beach culture"},
+    {"query": "flights from DEL to DXB on 20 Nov"},
+]
+
+
+def start(cmd, env, cwd):
+    return subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def wait_up(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"nothing listening on :{port}")
+
+
+async def load(concurrency, duration):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", limits=limits, timeout=120) as client:
+        async def user(i):
+            nonlocal errors
+            n = i
+            while time.perf_counter() < deadline:
+                start_at = time.perf_counter()
+                try:
+                    response = await client.post("/query", json=QUERIES[n % len(QUERIES)])
+                    ok = response.status_code == 200 and "error" not in response.json()
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start_at)
+                else:
+                    errors += 1
+                n += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def report(mode, concurrency, latencies, errors, elapsed):
+    p50 = statistics.median(latencies) * 1000 if latencies else float("nan")
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else float("nan")
+    print(f"{mode:>22} | {concurrency:>5} | {len(latencies) / elapsed:>7.1f} | {p50:>8.0f} | {p99:>8.0f} | {errors:>6}")
+
+
+def main():
+    levels = [int(a) for a in sys.argv[1:]] or [16, 64, 256]
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_csvs(data_dir, 200, cities=UAE_CITIES, names=CSV_NAMES)
+        env = {
+            **os.environ,
+            "CATALOG_DIR": data_dir,
+            "CATALOG_SNAPSHOT": "",
+            "SESSION_BACKEND": "sqlite",
+            "SESSION_DB": os.path.join(data_dir, "sessions.db"),
+            "OPENAI_API_KEY": "sk-fake",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{FAKE_PORT}/v1",
+            "FLIGHT_API_URL": f"http://127.0.0.1:{FAKE_PORT}/searchflight",
+            "FLIGHT_CACHE_SIZE": "0",
+            "NARRATIVE_VARIANTS": str(10 ** 9),
+        }
+        fake = start([sys.executable, "-m", "uvicorn", "fake_upstream:app", "--port", str(FAKE_PORT),
+                      "--log-level", "warning"], env, BENCH)
+        try:
+            wait_up(FAKE_PORT)
+            print(f"fake upstream: LLM {os.getenv('FAKE_LLM_MS', 400)} ms, "
+                  f"SkyExperts {os.getenv('FAKE_SKYEXPERTS_MS', 800)} ms; {DURATION:.0f} s per run")
+            print(f"{'mode':>22} | {'conc.':>5} | {'req/s':>7} | {'p50 ms':>8} | {'p99 ms':>8} | {'errors':>6}")
+            modes = {
+                f"sync gunicorn x{SYNC_WORKERS}": [sys.executable, "-m", "gunicorn", "-w", str(SYNC_WORKERS),
+                                                   "-b", f"127.0.0.1:{APP_PORT}", "--timeout", "120", "app:app"],
+                "async uvicorn x1": [sys.executable, "-m", "uvicorn", "async_app:app", "--port", str(APP_PORT),
+                                     "--log-level", "warning"],
+            }
+            for mode, cmd in modes.items():
+                server = start(cmd, env, REPO)
+                try:
+                    wait_up(APP_PORT)
+                    for concurrency in levels:
+                        report(mode, concurrency, *asyncio.run(load(concurrency, DURATION)))
+                finally:
+                    stop(server)
+        finally:
+            stop(fake)
+
+
+if __name__ == "__main__":
+    main()
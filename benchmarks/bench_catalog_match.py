@@ -0,0 +1,111 @@
+"""
+Micro-benchmark: per-itinerary attraction matching for one city.
+- pandas: the previous path (shuffle + reset_index, str.contains per preference x category
+  with pd.concat, regex str.contains + isin per slot pick)
+- bitmask: CityCatalog from catalog_index (uint64 category masks, NumPy AND per slot pick)
+
+Both pick Morning / Afternoon / Evening for a 7-day trip with two preferences.
+The category maps mirror itinerary.py (imported from there would need the CSVs + OpenAI key).
+
+Run from the repo root:
+    python benchmarks/bench_catalog_match.py
+"""
+import os
+import random
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_index import build_catalog  # noqa: E402
+
+PREFERENCE_MAP = {
+    "beach": ["Beach", "Water Park", "Island", "Waterway"],
+    "culture": ["Heritage", "Cultural", "Museum", "Religious", "Memorial"],
+    "adventure": ["Adventure", "Theme Park", "Desert", "Safari"],
+    "luxury": ["Landmark", "Leisure"],
+    "nature": ["Nature", "Park", "Garden", "Zoo"],
+    "shopping": ["Shopping", "Mall", "Souq", "Market"],
+    "history": ["Heritage", "Museum", "Religious", "Memorial"],
+    "wildlife": ["Zoo", "Nature"],
+}
+TIME_BASED_MAP = {
+    "Morning": ["Museum", "Heritage", "Cultural", "Religious", "Theme Park", "Nature", "Zoo"],
+    "Afternoon": ["Shopping", "Mall", "Souq", "Market", "Aquarium", "Art", "Exhibition"],
+    "Evening": ["Desert", "Safari", "Adventure", "Nightlife", "Show", "Observation", "Fountain", "Water Park"],
+}
+CATEGORIES = [
+    "Religious", "Museum", "Theme Park", "Water Park", "Landmark", "Heritage", "Leisure", "Zoo",
+    "Nature", "Desert", "Memorial", "Island", "Shopping", "Park", "Aquarium", "Cultural",
+    "Garden", "Waterway", "Beach", "Adventure", "Town",
+]
+PREFERENCES = ["Beach", "Culture"]
+DAYS = 7
+SLOTS = ("Morning", "Afternoon", "Evening")
+
+
+def make_city(n, seed=42):
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "Name": [f"Attraction {i}" for i in range(n)],
+        "City": "Dubai",
+        "Category": [rng.choice(CATEGORIES) for _ in range(n)],
+        "Description": "Lorem ipsum.",
+    })
+
+
+NO_HOTELS = pd.DataFrame(columns=["HotelName", "HotelRating", "cityName"])
+NO_RESTAURANTS = pd.DataFrame(columns=[
+    "Restaurant Name", "City", "Cuisines", "Aggregate rating", "Votes", "Average Cost for two",
+])
+
+
+def city_catalog(frame):
+    return build_catalog(frame, NO_HOTELS, NO_RESTAURANTS, PREFERENCE_MAP, TIME_BASED_MAP).city("Dubai")
+
+
+def pandas_itinerary(frame):
+    city_attractions = frame.sample(frac=1).reset_index(drop=True)
+    matched = pd.DataFrame()
+    for pref in PREFERENCES:
+        for cat in PREFERENCE_MAP.get(pref.lower(), []):
+            matches = city_attractions[city_attractions["Category"].str.contains(cat, case=False, na=False)]
+            matched = pd.concat([matched, matches])
+    if not matched.empty:
+        non_pref = city_attractions[~city_attractions.index.isin(matched.index)]
+        city_attractions = pd.concat([matched, non_pref]).drop_duplicates().reset_index(drop=True)
+
+    used = set()
+    for _ in range(DAYS):
+        for slot in SLOTS:
+            candidates = city_attractions[
+                city_attractions["Category"].str.contains("|".join(TIME_BASED_MAP[slot]), case=False, na=False)
+            ]
+            candidates = candidates[~candidates["Name"].isin(used)]
+            if not candidates.empty:
+                used.add(candidates.iloc[0]["Name"])
+
+
+def bitmask_itinerary(catalog):
+    picker = catalog.picker(PREFERENCES, PREFERENCE_MAP)
+    for _ in range(DAYS):
+        for slot in SLOTS:
+            picker.pick(slot)
+
+
+def main():
+    print(f"{'attractions':>11} | {'pandas (ms)':>11} | {'bitmask (ms)':>12} | {'index build (ms)':>16}")
+    for n in (100, 1_000, 10_000, 50_000):
+        frame = make_city(n)
+        build = timeit.timeit(lambda: city_catalog(frame), number=1) * 1000
+        catalog = city_catalog(frame)
+        reps = max(3, 2_000 // n)
+        old = min(timeit.repeat(lambda: pandas_itinerary(frame), number=reps, repeat=3)) / reps * 1000
+        new = min(timeit.repeat(lambda: bitmask_itinerary(catalog), number=reps * 10, repeat=3)) / (reps * 10) * 1000
+        print(f"{n:>11} | {old:>11.2f} | {new:>12.3f} | {build:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Memory / latency: DataFrame catalogs (previous request path) vs the compact Catalog.
+
+Writes synthetic CSVs with the real column layout, then each mode in its own subprocess:
+- frames:   the CSVs as DataFrames
+- catalog:  load_catalog in the process (pandas ingest, then the column store)
+- snapshot: open_catalog the way a worker boots without a current snapshot: a child process
+            compiles it from the CSVs, the worker maps it
+Reported per mode:
+- heap: bytes the loaded data retains on the Python heap (tracemalloc, after gc; the
+  snapshot's arrays live in the mapping, not on the heap)
+- RSS growth once every city has served one itinerary (pandas imported up front in every
+  mode; RSS also counts allocator pages kept from ingest)
+- latency: one 5-day, single-city itinerary body (slot picks + hotel/restaurant rows + text),
+  the old way (city-filtered, shuffled frames, .iloc rows, pd.isna cleaning) vs Catalog records
+
+Run from the repo root:
+    python benchmarks/bench_catalog_memory.py [attractions per city]
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import timeit
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.join(REPO, "benchmarks"))
+
+from bench_catalog_match import CATEGORIES, PREFERENCE_MAP, TIME_BASED_MAP  # noqa: E402
+
+CITIES = [f"City {i}" for i in range(20)]
+DAYS = 5
+
+
+def write_csvs(directory, per_city, seed=42, cities=CITIES,
+               names=("attractions.csv", "hotels.csv", "restaurants.csv")):
+    rng = random.Random(seed)
+    geo = random.Random(seed + 1)   # coordinates: ~20 km around a point, own stream so the rest stays the same
+
+    def coords():
+        return f"{25.1 + geo.uniform(-0.1, 0.1):.5f},{55.2 + geo.uniform(-0.1, 0.1):.5f}"
+
+    paths = [os.path.join(directory, f) for f in names]
+    with open(paths[0], "w", encoding="utf-8") as fh:
+        fh.write("Name,Emirate,City,Category,Latitude,Longitude,Description\n")
+        for city in cities:
+            for i in range(per_city):
+                fh.write(f"{city} attraction {i},Emirate,{city},{rng.choice(CATEGORIES)},{coords()},"
+                         f"A short description of the place number {i}.\n")
+    with open(paths[1], "w", encoding="utf-8") as fh:
+        fh.write("HotelName,HotelRating,cityName,Latitude,Longitude\n")
+        for city in cities:
+            for i in range(per_city // 4):
+                fh.write(f"{city} hotel {i},{rng.choice(['ThreeStar', 'FourStar', 'FiveStar'])},{city},{coords()}\n")
+    with open(paths[2], "w", encoding="utf-8") as fh:
+        fh.write("Restaurant ID,Restaurant Name,City,Address,Locality,Locality Verbose,Longitude,Latitude,"
+                 "Cuisines,Average Cost for two,Currency,Has Table booking,Has Online delivery,"
+                 "Is delivering now,Switch to order menu,Price range,Aggregate rating,Rating color,"
+                 "Rating text,Votes\n")
+        for city in cities:
+            for i in range(per_city):
+                fh.write(f"{i},{city} restaurant {i},{city},Some street,Area,\"Area, {city}\",{55.2 + geo.uniform(-0.1, 0.1):.5f},{25.1 + geo.uniform(-0.1, 0.1):.5f},"
+                         f"\"{rng.choice(['Indian', 'Arabic, Lebanese', 'Italian, Pizza'])}\","
+                         f"{rng.randint(50, 600)},Emirati Diram(AED),No,No,No,No,3,"
+                         f"{rng.uniform(2.5, 4.9):.1f},Green,Good,{rng.randint(0, 2000)}\n")
+    return paths
+
+
+def load_frames(paths):
+    import pandas as pd
+    attractions, hotels, restaurants = (pd.read_csv(p) for p in paths)
+    for df in (attractions, hotels, restaurants):
+        df.columns = df.columns.str.strip()
+    hotels["HotelRating"] = hotels["HotelRating"].map({"ThreeStar": 3, "FourStar": 4, "FiveStar": 5})
+    restaurants["Average Cost for two"] = pd.to_numeric(restaurants["Average Cost for two"], errors="coerce")
+    return attractions, hotels, restaurants
+
+
+def trim_heap():
+    """Hand freed heap pages back to the OS (glibc), so RSS shows what is retained, not ingest garbage."""
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def rss_mb():
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def frame_itinerary(frames, city):
+    import pandas as pd
+
+    def clean_value(val, default="Not Available"):
+        if pd.isna(val) or str(val).strip().lower() in ["nan", "none", ""]:
+            return default
+        return str(val)
+
+    attractions, hotels, restaurants = frames
+    city_attractions = attractions[attractions["City"].str.lower() == city.lower()].sample(frac=1).reset_index(drop=True)
+    city_hotels = hotels[hotels["cityName"].str.lower() == city.lower()].sample(frac=1).reset_index(drop=True)
+    city_restaurants = restaurants[restaurants["City"].str.lower() == city.lower()].sample(frac=1).reset_index(drop=True)
+    used, out = set(), []
+    for i in range(DAYS):
+        for slot in ("Morning", "Afternoon", "Evening"):
+            candidates = city_attractions[
+                city_attractions["Category"].str.contains("|".join(TIME_BASED_MAP[slot]), case=False, na=False)
+            ]
+            candidates = candidates[~candidates["Name"].isin(used)]
+            if not candidates.empty:
+                pick = candidates.iloc[0]
+                used.add(pick["Name"])
+                out.append(f"{pick['Name']} ({pick['Category']}) – {pick['Description']}")
+        restaurant = city_restaurants.iloc[i % len(city_restaurants)]
+        hotel = city_hotels.iloc[i % len(city_hotels)]
+        out.append(f"{clean_value(restaurant['Restaurant Name'])} 🍴 {clean_value(restaurant['Cuisines'])} | "
+                   f"⭐ {clean_value(restaurant['Aggregate rating'], 'Not Rated')} ({clean_value(restaurant['Votes'], '0')} reviews)")
+        out.append(f"{clean_value(hotel['HotelName'])} ⭐ {int(hotel['HotelRating'])}-Star")
+    return out
+
+
+def catalog_itinerary(catalog, city):
+    city_catalog = catalog.city(city)
+    picker = city_catalog.picker([], PREFERENCE_MAP)
+    city_hotels = city_catalog.rotated_hotels()
+    city_restaurants = city_catalog.rotated_restaurants()
+    out = []
+    for i in range(DAYS):
+        for slot in ("Morning", "Afternoon", "Evening"):
+            pick = picker.pick(slot)
+            if pick is not None:
+                out.append(f"{pick.name} ({pick.category}) – {pick.description}")
+        restaurant = city_restaurants[i % len(city_restaurants)]
+        hotel = city_hotels[i % len(city_hotels)]
+        out.append(f"{restaurant.name} 🍴 {restaurant.cuisines} | ⭐ {restaurant.rating} ({restaurant.votes} reviews)")
+        out.append(f"{hotel.name} ⭐ {hotel.rating}")
+    return out
+
+
+def worker(mode, paths):
+    """Runs in a subprocess: prints 'retained_mb rss_mb latency_ms' for one representation."""
+    import gc
+    import importlib
+    import tracemalloc
+    from catalog_index import load_catalog
+    from catalog_snapshot import open_catalog
+
+    importlib.import_module("pandas")  # in every mode, so only the data is measured
+    gc.collect()
+    trim_heap()
+    before = rss_mb()
+    tracemalloc.start()
+    if mode == "frames":
+        data = load_frames(paths)
+        run = frame_itinerary
+    elif mode == "catalog":
+        data = load_catalog(*paths, PREFERENCE_MAP, TIME_BASED_MAP)
+        run = catalog_itinerary
+    else:
+        snapshot = os.path.join(os.path.dirname(paths[0]), "catalog.snapshot")
+        data = open_catalog(PREFERENCE_MAP, TIME_BASED_MAP, csvs=paths, path=snapshot)
+        run = catalog_itinerary
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+    for city in CITIES:
+        run(data, city)
+    gc.collect()
+    trim_heap()
+    grown = rss_mb() - before
+    reps = 20
+    latency = min(timeit.repeat(lambda: run(data, random.choice(CITIES)), number=reps, repeat=3)) / reps * 1000
+    print(f"{retained:.1f} {grown:.1f} {latency:.3f}")
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--worker":
+        worker(sys.argv[2], sys.argv[3:])
+        return
+    sizes = [int(sys.argv[1])] if len(sys.argv) > 1 else [100, 1_000, 5_000]
+    print(f"{'rows/city':>9} | {'mode':>8} | {'heap MB':>7} | {'RSS MB':>6} | {'ms':>7}")
+    for per_city in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = write_csvs(tmp, per_city)
+            for mode in ("frames", "catalog", "snapshot"):
+                out = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--worker", mode, *paths],
+                    capture_output=True, text=True, check=True, cwd=REPO,
+                )
+                heap, rss, ms = (float(x) for x in out.stdout.split()[-3:])
+                print(f"{per_city:>9} | {mode:>8} | {heap:>7.1f} | {rss:>6.1f} | {ms:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
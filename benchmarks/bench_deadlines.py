@@ -0,0 +1,108 @@
+"""
+Request deadlines, retries and graceful degradation on async_app (deadline.py).
+
+Two scenarios against fake_upstream.py, each with the feature off and on:
+- flaky upstream: FAKE_ERROR_RATE of SkyExperts searches fail with a 503; flight queries
+  with 1 attempt vs UPSTREAM_RETRY_ATTEMPTS=3 (jittered backoff inside the deadline)
+- slow LLM:       every LLM call takes FAKE_LLM_MS; itinerary queries (date extraction +
+  narrative) with no practical deadline vs QUERY_DEADLINE, where the narrative is dropped
+  once it can no longer finish in time
+REQUESTS queries per run, CONCURRENCY at a time. Reported per outcome: count and
+p50 / max latency, plus the retry / degradation counters from /stats.
+
+Run from the repo root (needs uvicorn and httpx):
+    python benchmarks/bench_deadlines.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_async import APP_PORT, BENCH, FAKE_PORT, REPO, start, stop, wait_up  # noqa: E402
+from bench_catalog_memory import write_csvs  # noqa: E402
+from bench_workers_rss import CSV_NAMES, UAE_CITIES  # noqa: E402
+
+REQUESTS = 60
+CONCURRENCY = 20
+FLIGHT = "flights from DEL to DXB on {day} Dec"
+ITINERARY = "3 days in Dubai beach culture"
+SCENARIOS = [
+    ("flaky upstream (30% 503), 1 attempt", FLIGHT,
+     {"FAKE_ERROR_RATE": "0.3", "UPSTREAM_RETRY_ATTEMPTS": "1"}),
+    ("flaky upstream (30% 503), 3 attempts", FLIGHT,
+     {"FAKE_ERROR_RATE": "0.3", "UPSTREAM_RETRY_ATTEMPTS": "3"}),
+    ("slow LLM (5 s), no deadline", ITINERARY,
+     {"FAKE_LLM_MS": "5000", "QUERY_DEADLINE": "1000", "LLM_TIMEOUT": "60"}),
+    ("slow LLM (5 s), 7 s deadline", ITINERARY,
+     {"FAKE_LLM_MS": "5000", "QUERY_DEADLINE": "7", "LLM_TIMEOUT": "60"}),
+]
+
+
+def outcome(response):
+    if response.status_code != 200:
+        return str(response.status_code)
+    body = response.json()
+    if "error" in body:
+        return "200 error"
+    if body.get("degraded"):
+        return "200 without " + ", ".join(body["degraded"])
+    return "200 complete"
+
+
+async def run(template):
+    outcomes = {}
+    gate = asyncio.Semaphore(CONCURRENCY)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", timeout=120) as client:
+        async def one(i):
+            async with gate:
+                began = time.perf_counter()
+                response = await client.post("/query", json={"query": template.format(day=1 + i % 28)})
+                outcomes.setdefault(outcome(response), []).append(time.perf_counter() - began)
+
+        await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+        stats = (await client.get("/stats")).json()["deadlines"]
+    return outcomes, stats
+
+
+def main():
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_csvs(data_dir, 50, cities=UAE_CITIES, names=CSV_NAMES)
+        base = {
+            **os.environ,
+            "CATALOG_DIR": data_dir,
+            "CATALOG_SNAPSHOT": "",
+            "OPENAI_API_KEY": "sk-fake",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{FAKE_PORT}/v1",
+            "FLIGHT_API_URL": f"http://127.0.0.1:{FAKE_PORT}/searchflight",
+            "FLIGHT_CACHE_SIZE": "0",
+            "NARRATIVE_VARIANTS": str(10 ** 9),
+        }
+        for label, template, overrides in SCENARIOS:
+            env = {**base, **overrides}
+            fake = start([sys.executable, "-m", "uvicorn", "fake_upstream:app", "--port", str(FAKE_PORT),
+                          "--log-level", "warning"], env, BENCH)
+            server = start([sys.executable, "-m", "uvicorn", "async_app:app", "--port", str(APP_PORT),
+                            "--log-level", "warning"], env, REPO)
+            try:
+                wait_up(FAKE_PORT)
+                wait_up(APP_PORT)
+                outcomes, stats = asyncio.run(run(template))
+            finally:
+                stop(server)
+                stop(fake)
+
+            print(f"\n{label}: retries {stats['retries']}, retries skipped (budget) "
+                  f"{stats['retries_skipped_budget']}, degraded {stats['degraded']}, exceeded {stats['exceeded']}")
+            for name, took in sorted(outcomes.items()):
+                print(f"  {name:<24} {len(took):>4}   p50 {statistics.median(took) * 1000:>6.0f} ms"
+                      f"   max {max(took) * 1000:>6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Micro-benchmark: single-pass FlightSelector vs the previous sort-based selection
+(two full sorted() passes + a direct filter + min/max, as search_flights and
+summarize_skyexperts used to do).
+
+Run from the repo root:
+    python benchmarks/bench_flight_select.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flight_select import FlightSelector  # noqa: E402
+
+
+def make_flights(n, seed=42):
+    rng = random.Random(seed)
+    return [(rng.uniform(80, 1500), rng.randint(120, 1800), rng.choice([0, 0, 1, 1, 1, 2])) for _ in range(n)]
+
+
+def sort_based(flights, k=3):
+    cheapest = sorted(flights, key=lambda f: f[0])[:k]
+    fastest = sorted(flights, key=lambda f: f[1])[:k]
+    direct = [f for f in flights if f[2] == 0][:k]
+    fewest_stops = sorted(flights, key=lambda f: (f[2], f[0]))[:k]
+    prices = [f[0] for f in flights]
+    return cheapest, fastest, direct, fewest_stops, min(prices), max(prices)
+
+
+def selector_based(flights, k=3):
+    selector = FlightSelector({"cheapest": k, "fastest": k, "direct": k, "fewest_stops": k, "pareto": 5})
+    for f in flights:
+        selector.add(f, f[0], f[1], f[2])
+    return selector.results(), selector.min_price, selector.max_price
+
+
+def main():
+    print(f"{'flights':>8} | {'sorted (ms)':>11} | {'selector (ms)':>13}")
+    for n in (100, 1_000, 10_000, 100_000):
+        flights = make_flights(n)
+        reps = max(3, 20_000 // n)
+        old = min(timeit.repeat(lambda: sort_based(flights), number=reps, repeat=3)) / reps * 1000
+        new = min(timeit.repeat(lambda: selector_based(flights), number=reps, repeat=3)) / reps * 1000
+        print(f"{n:>8} | {old:>11.3f} | {new:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
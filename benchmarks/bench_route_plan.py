@@ -0,0 +1,95 @@
+"""
+Day-level route planning (CityCatalog.plan_days) on synthetic large cities.
+
+Attractions are spread over a Dubai-sized box (~40 x 40 km). For each city size and trip
+length: the slot picks are made as in build_itinerary, then regrouped into compact days and
+ordered from a central hotel. Reported:
+- plan ms:  cold (first call, builds the cached city distance matrix when the city is under
+            ROUTE_MATRIX_MAX) and warm (median over repeats)
+- km/day:   hotel -> stop 1 -> stop 2 -> stop 3 driving distance (great-circle), picks in
+            slot order vs planned
+- mismatch: share of stops whose category does not suit their slot, picks vs planned
+
+Run from the repo root:
+    python benchmarks/bench_route_plan.py
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_catalog_match import (  # noqa: E402
+    CATEGORIES, NO_HOTELS, NO_RESTAURANTS, PREFERENCE_MAP, PREFERENCES, TIME_BASED_MAP,
+)
+from catalog_index import Hotel, build_catalog  # noqa: E402
+from route_planner import DAY_SLOTS, ROUTE_MATRIX_MAX  # noqa: E402
+from spatial_index import haversine_km  # noqa: E402
+
+HOTEL = Hotel("Central hotel", "5-Star", 25.18, 55.26)
+REPEATS = 20
+
+
+def make_city(n, seed=42):
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "Name": [f"Attraction {i}" for i in range(n)],
+        "City": "Dubai",
+        "Category": [rng.choice(CATEGORIES) for _ in range(n)],
+        "Description": "Lorem ipsum.",
+        "Latitude": [rng.uniform(25.0, 25.36) for _ in range(n)],
+        "Longitude": [rng.uniform(55.06, 55.46) for _ in range(n)],
+    })
+
+
+def picks(catalog, days):
+    picker = catalog.picker(PREFERENCES, PREFERENCE_MAP)
+    return [[i for i in (picker.pick_index(slot) for slot in DAY_SLOTS) if i is not None] for _ in range(days)]
+
+
+def km_per_day(catalog, days):
+    total = 0.0
+    for day in days:
+        lat = np.concatenate([[HOTEL.lat], catalog.lat[day]])
+        lon = np.concatenate([[HOTEL.lon], catalog.lon[day]])
+        total += float(haversine_km(lat[:-1], lon[:-1], lat[1:], lon[1:]).sum())
+    return total / len(days)
+
+
+def main():
+    np.random.seed(0)
+    print(f"(city distance matrix cached up to ROUTE_MATRIX_MAX={ROUTE_MATRIX_MAX} attractions)")
+    print(f"{'attractions':>11} | {'days':>4} | {'cold ms':>7} | {'warm ms':>7} | {'km/day picks':>12} | "
+          f"{'km/day planned':>14} | {'mismatch picks':>14} | {'mismatch planned':>16}")
+    for n in (500, 2_000, 20_000):
+        catalog = build_catalog(make_city(n), NO_HOTELS, NO_RESTAURANTS, PREFERENCE_MAP, TIME_BASED_MAP).city("Dubai")
+        for days in (3, 7, 14, 30):
+            trips = [picks(catalog, days) for _ in range(REPEATS)]
+            catalog._distances = None
+            start = time.perf_counter()
+            catalog.plan_days(trips[0], HOTEL)
+            cold = (time.perf_counter() - start) * 1000
+
+            timings, before, after, stops, mismatched = [], [], [], 0, [0, 0]
+            for trip in trips:
+                start = time.perf_counter()
+                planned = catalog.plan_days(trip, HOTEL)
+                timings.append((time.perf_counter() - start) * 1000)
+                before.append(km_per_day(catalog, trip))
+                after.append(km_per_day(catalog, planned))
+                stops += sum(len(day) for day in trip)
+                mismatched[0] += catalog.slot_mismatches(trip)
+                mismatched[1] += catalog.slot_mismatches(planned)
+            print(f"{n:>11} | {days:>4} | {cold:>7.2f} | {statistics.median(timings):>7.2f} | "
+                  f"{statistics.mean(before):>12.1f} | {statistics.mean(after):>14.1f} | "
+                  f"{100 * mismatched[0] / stops:>13.1f}% | {100 * mismatched[1] / stops:>15.1f}%")
+
+
+if __name__ == "__main__":
+    main()
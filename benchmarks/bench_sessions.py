@@ -0,0 +1,148 @@
+"""
+Per-request cost of get_session with many live sessions:
+- scan:  the previous app.get_session (list of expired ids rebuilt from every session per call)
+- store: session_store.MemorySessionStore (access-ordered dict, expiry pops from the front)
+
+Each run preloads N live sessions, then times a mix of resumed / new / unknown-id calls,
+with a slice of the sessions timing out during the run. Also checks the size cap.
+
+Then the shared SQLite backend (SQLiteSessionStore, temp file): get + save per request
+(what /query does) at the same sizes, the encoded state size, and a second process
+reading a session the first one wrote.
+
+Run from the repo root:
+    python benchmarks/bench_sessions.py [sessions ...]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_store import (  # noqa: E402
+    MemorySessionStore, SQLiteSessionStore, encode_state, new_session_state,
+)
+
+TTL = 600
+CALLS = 2_000
+
+
+def scan_get_session(sessions, session_id=None):
+    now = time.time()
+    expired = [sid for sid, s in sessions.items() if now - s["timestamp"] > TTL]
+    for sid in expired:
+        del sessions[sid]
+    if session_id:
+        if session_id in sessions:
+            sessions[session_id]["timestamp"] = now
+        else:
+            sessions[session_id] = new_session_state(now)
+        return session_id, sessions[session_id]
+    new_id = str(uuid.uuid4())
+    sessions[new_id] = new_session_state(now)
+    return new_id, sessions[new_id]
+
+
+def workload(ids):
+    """Session ids to request: mostly returning users, some new, some unknown ids."""
+    calls = []
+    for i in range(CALLS):
+        calls.append(None if i % 10 == 0 else f"unknown-{i}" if i % 10 == 1 else ids[(i * 7919) % len(ids)])
+    return calls
+
+
+def seed(n, now):
+    """n sessions, the oldest 1% just past the TTL so both implementations expire them."""
+    ids = [str(uuid.uuid4()) for _ in range(n)]
+    ages = [TTL + 1 if i < n // 100 else TTL * (1 - i / n) for i in range(n)]
+    return ids, [(sid, new_session_state(now - age)) for sid, age in zip(ids, ages)]
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for sid in calls:
+        fn(sid)
+    return (time.perf_counter() - start) / len(calls) * 1e6
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000, 250_000]
+    print(f"{'sessions':>8} | {'scan µs/call':>12} | {'store µs/call':>13} | {'store expired':>13}")
+    for n in sizes:
+        ids, entries = seed(n, time.time())
+        calls = workload(ids[n // 100:])
+
+        plain = dict((sid, dict(state)) for sid, state in entries)
+        scan_calls = calls if n <= 10_000 else calls[:max(20, CALLS * 10_000 // n)]
+        scan = per_call_us(lambda sid: scan_get_session(plain, sid), scan_calls)
+
+        store = MemorySessionStore(ttl=TTL, maxsize=n * 2)
+        store._data.update((sid, dict(state)) for sid, state in entries)
+        fast = per_call_us(store.get, calls)
+        print(f"{n:>8} | {scan:>12.1f} | {fast:>13.2f} | {store.stats()['expired']:>13}")
+
+    capped = MemorySessionStore(ttl=TTL, maxsize=1_000)
+    for _ in range(5_000):
+        capped.get()
+    print("cap check:", capped.stats())
+
+    sqlite_report(sizes)
+
+
+PARSED = {
+    "city": "Dubai", "cities": ["Dubai", "Abu Dhabi"], "days": 5, "budget": 3000, "currency": "AED",
+    "preferences": ["Beach", "Culture"], "day_split": {"Dubai": 3, "Abu Dhabi": 2}, "start_date": "2026-11-02",
+}
+
+
+def sqlite_report(sizes):
+    import json
+
+    state = {**new_session_state(time.time()), "last_parsed": PARSED, "last_depdate": "2026-11-02"}
+    plain = json.dumps({k: v for k, v in state.items() if k != "timestamp"}).encode()
+    print(f"\nencoded state: {len(encode_state(state))} bytes (plain JSON dict: {len(plain)})")
+    print(f"{'sessions':>8} | {'sqlite get µs':>13} | {'sqlite save µs':>14} | {'p99 get+save µs':>15}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteSessionStore(os.path.join(tmp, "sessions.db"), ttl=TTL, maxsize=n * 2)
+            conn = store._conn()
+            now = time.time()
+            blob = encode_state(state)
+            conn.execute("BEGIN")
+            conn.executemany("INSERT INTO sessions VALUES (?, ?, ?)",
+                             ((f"s{i}", now - TTL * i / n, blob) for i in range(n)))
+            conn.execute("COMMIT")
+            while store.cleanup():
+                pass
+
+            gets, saves, both = [], [], []
+            for i in range(CALLS):
+                sid = f"s{(i * 7919) % (n // 2)}"
+                start = time.perf_counter()
+                sid, got = store.get(sid)
+                mid = time.perf_counter()
+                got["last_parsed"] = PARSED
+                store.save(sid, got)
+                end = time.perf_counter()
+                gets.append((mid - start) * 1e6)
+                saves.append((end - mid) * 1e6)
+                both.append((end - start) * 1e6)
+            p99 = statistics.quantiles(both, n=100)[98]
+            print(f"{n:>8} | {statistics.median(gets):>13.1f} | {statistics.median(saves):>14.1f} | {p99:>15.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        SQLiteSessionStore(path).save("shared", dict(state))
+        code = (f"from session_store import SQLiteSessionStore; "
+                f"print(SQLiteSessionStore({path!r}).get('shared')[1]['last_parsed'] == {PARSED!r})")
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        print("other process sees the session:", out.stdout.strip())
+
+
+if __name__ == "__main__":
+    main()
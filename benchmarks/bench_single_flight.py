@@ -0,0 +1,88 @@
+"""
+Promo burst against a slow upstream, with and without single-flight coalescing.
+
+USERS callers arrive within SPREAD_MS of each other, each searching one of ROUTES
+distinct routes (so many callers share a route); the upstream takes UPSTREAM_MS.
+Run once on threads (SingleFlight.do, as in the gunicorn workers) and once on an event
+loop (SingleFlight.do_async, as in async_app). Reported: upstream calls actually made,
+dedup ratio, and caller latency p50 / max.
+
+Run from the repo root:
+    python benchmarks/bench_single_flight.py
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from single_flight import SingleFlight  # noqa: E402
+
+USERS = 200
+ROUTES = 5
+SPREAD_MS = 300
+UPSTREAM_MS = 500
+
+
+def arrivals(seed=7):
+    rng = random.Random(seed)
+    return sorted((rng.uniform(0, SPREAD_MS / 1000), f"DEL-DXB-2025-11-{20 + rng.randrange(ROUTES)}")
+                  for _ in range(USERS))
+
+
+def run_threads(flight):
+    latencies, lock = [], threading.Lock()
+    start = time.perf_counter()
+
+    def user(delay, key):
+        time.sleep(max(0.0, start + delay - time.perf_counter()))
+        began = time.perf_counter()
+        flight.do(key, lambda: time.sleep(UPSTREAM_MS / 1000) or key)
+        with lock:
+            latencies.append(time.perf_counter() - began)
+
+    threads = [threading.Thread(target=user, args=a) for a in arrivals()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+async def run_loop(flight):
+    latencies = []
+    start = time.perf_counter()
+
+    async def upstream(key):
+        await asyncio.sleep(UPSTREAM_MS / 1000)
+        return key
+
+    async def user(delay, key):
+        await asyncio.sleep(max(0.0, start + delay - time.perf_counter()))
+        began = time.perf_counter()
+        await flight.do_async(key, lambda: upstream(key))
+        latencies.append(time.perf_counter() - began)
+
+    await asyncio.gather(*(user(*a) for a in arrivals()))
+    return latencies
+
+
+def main():
+    print(f"{USERS} callers over {SPREAD_MS} ms, {ROUTES} distinct searches, upstream {UPSTREAM_MS} ms")
+    print(f"{'mode':>8} | {'coalescing':>10} | {'upstream calls':>14} | {'dedup':>6} | {'p50 ms':>7} | {'max ms':>7}")
+    for mode in ("threads", "asyncio"):
+        for enabled in (False, True):
+            flight = SingleFlight("bench", enabled=enabled)
+            latencies = run_threads(flight) if mode == "threads" else asyncio.run(run_loop(flight))
+            stats = flight.stats()
+            print(f"{mode:>8} | {'on' if enabled else 'off':>10} | {stats['upstream']:>14} | "
+                  f"{stats['dedup_ratio']:>6.3f} | {statistics.median(latencies) * 1000:>7.0f} | "
+                  f"{max(latencies) * 1000:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
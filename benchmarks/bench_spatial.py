@@ -0,0 +1,70 @@
+"""
+Proximity queries over synthetic POIs spread across the UAE:
+- brute force: haversine to every point + argpartition / mask (what a picker would do without an index)
+- grid:        spatial_index.SpatialIndex (sorted cell keys, binary search per cell row)
+
+Reports index build time, k-nearest (k=1, 10) and 1 km radius latency, and checks that
+both give the same rows for every query.
+
+Run from the repo root:
+    python benchmarks/bench_spatial.py [points ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spatial_index import SpatialIndex, haversine_km  # noqa: E402
+
+QUERIES = 200
+
+
+def brute_nearest(lat, lon, qlat, qlon, k):
+    dist = haversine_km(qlat, qlon, lat, lon)
+    rows = np.argpartition(dist, k)[:k] if k < len(dist) else np.arange(len(dist))
+    return rows[np.argsort(dist[rows], kind="stable")]
+
+
+def brute_radius(lat, lon, qlat, qlon, km):
+    return np.flatnonzero(haversine_km(qlat, qlon, lat, lon) <= km)
+
+
+def per_query_us(fn, queries):
+    start = time.perf_counter()
+    for q in queries:
+        fn(*q)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 500_000]
+    rng = np.random.default_rng(7)
+    print(f"{'points':>8} | {'build ms':>8} | {'query':>8} | {'brute µs':>9} | {'grid µs':>8} | {'speedup':>7} | mismatches")
+    for n in sizes:
+        lat = rng.uniform(22.6, 26.1, n)
+        lon = rng.uniform(51.6, 56.4, n)
+        start = time.perf_counter()
+        index = SpatialIndex(lat, lon)
+        build_ms = (time.perf_counter() - start) * 1000
+        queries = list(zip(rng.uniform(22.6, 26.1, QUERIES), rng.uniform(51.6, 56.4, QUERIES)))
+
+        cases = {
+            "knn k=1": (lambda a, b: brute_nearest(lat, lon, a, b, 1),
+                        lambda a, b: [r for r, _ in index.nearest(a, b, 1)]),
+            "knn k=10": (lambda a, b: brute_nearest(lat, lon, a, b, 10),
+                         lambda a, b: [r for r, _ in index.nearest(a, b, 10)]),
+            "r=1 km": (lambda a, b: brute_radius(lat, lon, a, b, 1.0),
+                       lambda a, b: [r for r, _ in index.radius(a, b, 1.0)]),
+        }
+        for name, (brute, grid) in cases.items():
+            mismatches = sum(sorted(brute(*q).tolist()) != sorted(grid(*q)) for q in queries)
+            brute_us, grid_us = per_query_us(brute, queries), per_query_us(grid, queries)
+            print(f"{n:>8} | {build_ms:>8.1f} | {name:>8} | {brute_us:>9.1f} | {grid_us:>8.1f} | "
+                  f"{brute_us / grid_us:>6.0f}x | {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
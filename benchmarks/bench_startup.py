@@ -0,0 +1,73 @@
+"""
+Cold-start report: wall time of `import app` in a fresh interpreter (what every gunicorn
+worker pays without --preload), with the catalog snapshot and with the CSV fallback,
+plus a `python -X importtime` breakdown of the slowest imports.
+
+Run from the repo root (build the snapshot first: python catalog_snapshot.py):
+    python benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from catalog_snapshot import CATALOG_SNAPSHOT  # noqa: E402
+
+IMPORT_APP = (
+    "import time; t = time.perf_counter(); import app; "
+    "print(round((time.perf_counter() - t) * 1000, 1), app.catalog_load_info['load_ms'])"
+)
+
+
+def cold_import(env_overrides):
+    env = {**os.environ, **env_overrides}
+    out = subprocess.run([sys.executable, "-c", IMPORT_APP], capture_output=True, text=True,
+                         check=True, cwd=REPO, env=env)
+    total, catalog = out.stdout.split()[-2:]
+    return float(total), float(catalog)
+
+
+def import_breakdown(env_overrides, top=15, max_depth=2):
+    """(cumulative ms, self ms, module) for the slowest imports up to `max_depth` levels under app."""
+    env = {**os.environ, **env_overrides}
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], capture_output=True,
+                         text=True, check=True, cwd=REPO, env=env)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip(" ") for part in line.replace("import time:", "|").split("|"))
+        if not self_us.isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        if depth <= max_depth:
+            rows.append((int(cumulative_us) / 1000, int(self_us) / 1000, name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    modes = {"csv fallback": {"CATALOG_SNAPSHOT": ""}}
+    if os.path.exists(os.path.join(REPO, CATALOG_SNAPSHOT)):
+        modes["snapshot"] = {}
+    else:
+        print(f"({CATALOG_SNAPSHOT} not found, run `python catalog_snapshot.py` to compare)")
+
+    print(f"{'mode':>13} | {'import app (ms)':>15} | {'catalog load (ms)':>17}")
+    for mode, env in modes.items():
+        samples = [cold_import(env) for _ in range(runs)]
+        total = statistics.median(s[0] for s in samples)
+        catalog = statistics.median(s[1] for s in samples)
+        print(f"{mode:>13} | {total:>15.1f} | {catalog:>17.2f}")
+
+    mode = "snapshot" if "snapshot" in modes else "csv fallback"
+    print(f"\nSlowest imports ({mode}, cumulative / self ms):")
+    for cumulative, own, name in import_breakdown(modes[mode]):
+        print(f"{cumulative:>9.1f} {own:>8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Overload burst on async_app with and without the SkyExperts limiter (upstream_limits).
+
+fake_upstream.py accepts FAKE_SKYEXPERTS_MAX concurrent searches (800 ms each) and answers
+429 to anything above that. BURST clients send distinct flight queries at the same moment
+(distinct route/date, so neither the flight cache nor single-flight can merge them).
+- limits off: every query goes straight upstream; the excess is rate limited upstream
+  and comes back as an error inside a 200
+- limits on:  MAX_IN_FLIGHT matches the upstream, the queue takes what can finish within
+  UPSTREAM_MAX_WAIT, the rest get a 503 + Retry-After right away
+Reported per outcome: count and p50 / max latency, plus upstream 429s.
+
+Run from the repo root (needs uvicorn and httpx):
+    python benchmarks/bench_upstream_limits.py
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_async import APP_PORT, BENCH, FAKE_PORT, REPO, start, stop, wait_up  # noqa: E402
+from bench_catalog_memory import write_csvs  # noqa: E402
+from bench_workers_rss import CSV_NAMES, UAE_CITIES  # noqa: E402
+
+BURST = 200
+UPSTREAM_CAPACITY = 16
+ORIGINS = ("DEL", "BOM", "BLR", "MAA", "HYD", "CCU", "COK", "AMD")
+LIMITS = {
+    "off": {"SKYEXPERTS_RATE": "0", "SKYEXPERTS_MAX_IN_FLIGHT": "0"},
+    "on": {"SKYEXPERTS_RATE": "0", "SKYEXPERTS_MAX_IN_FLIGHT": str(UPSTREAM_CAPACITY), "SKYEXPERTS_MAX_QUEUE": "64",
+           "SKYEXPERTS_CALL_SECONDS": "1", "UPSTREAM_MAX_WAIT": "3"},
+}
+
+
+def queries():
+    return [f"flights from {ORIGINS[i % len(ORIGINS)]} to DXB on {1 + i // len(ORIGINS)} Dec" for i in range(BURST)]
+
+
+async def burst():
+    outcomes = {}
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", timeout=120,
+                                 limits=httpx.Limits(max_connections=BURST)) as client:
+        async def one(query):
+            began = time.perf_counter()
+            response = await client.post("/query", json={"query": query})
+            took = time.perf_counter() - began
+            if response.status_code == 503:
+                outcome = f"503 retry-after {response.headers.get('retry-after')}"
+            elif "error" in response.json():
+                outcome = "200 with upstream error"
+            else:
+                outcome = "200 flights"
+            outcomes.setdefault(outcome, []).append(took)
+
+        await asyncio.gather(*(one(q) for q in queries()))
+        upstream = (await client.get(f"http://127.0.0.1:{FAKE_PORT}/counts")).json()
+        limits = (await client.get("/stats")).json()["upstream_limits"]["skyexperts"]
+    return outcomes, upstream, limits
+
+
+def main():
+    print(f"{BURST} distinct flight queries at once; upstream takes {UPSTREAM_CAPACITY} concurrent searches")
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_csvs(data_dir, 50, cities=UAE_CITIES, names=CSV_NAMES)
+        base = {
+            **os.environ,
+            "CATALOG_DIR": data_dir,
+            "CATALOG_SNAPSHOT": "",
+            "OPENAI_API_KEY": "sk-fake",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{FAKE_PORT}/v1",
+            "FLIGHT_API_URL": f"http://127.0.0.1:{FAKE_PORT}/searchflight",
+            "FLIGHT_CACHE_SIZE": "0",
+            "FAKE_SKYEXPERTS_MAX": str(UPSTREAM_CAPACITY),
+        }
+        for mode, env in LIMITS.items():
+            env = {**base, **env}
+            fake = start([sys.executable, "-m", "uvicorn", "fake_upstream:app", "--port", str(FAKE_PORT),
+                          "--log-level", "warning"], env, BENCH)
+            server = start([sys.executable, "-m", "uvicorn", "async_app:app", "--port", str(APP_PORT),
+                            "--log-level", "warning"], env, REPO)
+            try:
+                wait_up(FAKE_PORT)
+                wait_up(APP_PORT)
+                outcomes, upstream, limits = asyncio.run(burst())
+            finally:
+                stop(server)
+                stop(fake)
+
+            print(f"\nlimits {mode}: upstream searches {upstream['skyexperts']}, upstream 429s {upstream['skyexperts_429']}"
+                  f", queue max depth {limits['max_queue_depth']}, wait p99 {limits['wait_ms_p99']} ms")
+            for outcome, took in sorted(outcomes.items()):
+                print(f"  {outcome:<26} {len(took):>4}   p50 {statistics.median(took) * 1000:>6.0f} ms"
+                      f"   max {max(took) * 1000:>6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
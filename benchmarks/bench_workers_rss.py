@@ -0,0 +1,119 @@
+"""
+Memory of a gunicorn deployment at 1 / 4 / 16 workers, per catalog mode:
+- csv:       no snapshot, every worker parses the CSVs with pandas
+- snapshot:  every worker mmaps the snapshot (no preload)
+- preload:   master loads the app + snapshot once, gc.freeze(), workers fork from it
+
+A synthetic catalog (UAE city names so build_itinerary finds it) is written to a temp dir.
+After boot, each setup gets a few /query/stream itinerary requests so workers touch the
+catalog (the narrative step fails fast without an OPENAI_API_KEY, which is fine here).
+Reported: summed RSS and PSS (proportional share, counts shared pages once) over
+master + workers, from /proc/<pid>/smaps_rollup. Linux only.
+
+Run from the repo root:
+    python benchmarks/bench_workers_rss.py [rows per city]
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, "benchmarks"))
+
+from bench_catalog_memory import write_csvs  # noqa: E402
+
+UAE_CITIES = ["Dubai", "Abu Dhabi", "Sharjah", "Ajman", "Fujairah", "Ras Al Khaimah", "Umm Al Quwain"]
+CSV_NAMES = ("uae_attractions.csv", "uae_hotels.csv", "uae_restaurants.csv")
+PORT = 18765
+
+
+def smaps_kb(pid, field):
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as fh:
+            for line in fh:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def worker_pids(master):
+    with open(f"/proc/{master}/task/{master}/children") as fh:
+        return [int(p) for p in fh.read().split()]
+
+
+def wait_ready(workers, master, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{PORT}/", timeout=2).read()
+            if len(worker_pids(master)) >= workers:
+                return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("gunicorn did not come up")
+
+
+def warm(requests_count):
+    body = json.dumps({"query": "3 days in Dubai tomorrow beach culture"}).encode()
+    for _ in range(requests_count):
+        req = urllib.request.Request(f"http://127.0.0.1:{PORT}/query/stream", data=body,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(req, timeout=30).read()
+        except urllib.error.URLError:
+            pass
+
+
+def measure(mode, workers, data_dir, snapshot):
+    env = {
+        **os.environ,
+        "CATALOG_DIR": data_dir,
+        "CATALOG_SNAPSHOT": "" if mode == "csv" else snapshot,
+        "GUNICORN_PRELOAD": "1" if mode == "preload" else "0",
+        "OPENAI_API_KEY": "",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-w", str(workers),
+         "-b", f"127.0.0.1:{PORT}", "app:app"],
+        cwd=REPO, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(workers, proc.pid)
+        warm(workers * 3)
+        time.sleep(0.5)
+        pids = [proc.pid] + worker_pids(proc.pid)
+        rss = sum(smaps_kb(p, "Rss") for p in pids) / 1024
+        pss = sum(smaps_kb(p, "Pss") for p in pids) / 1024
+        return rss, pss
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+
+def main():
+    per_city = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_csvs(data_dir, per_city, cities=UAE_CITIES, names=CSV_NAMES)
+        snapshot = os.path.join(data_dir, "catalog.snapshot")
+        subprocess.run([sys.executable, "catalog_snapshot.py", snapshot], cwd=REPO, check=True,
+                       env={**os.environ, "CATALOG_DIR": data_dir}, stdout=subprocess.DEVNULL)
+
+        print(f"{per_city} rows/city x {len(UAE_CITIES)} cities")
+        print(f"{'workers':>7} | {'mode':>8} | {'total RSS MB':>12} | {'total PSS MB':>12} | {'PSS/worker MB':>13}")
+        for workers in (1, 4, 16):
+            for mode in ("csv", "snapshot", "preload"):
+                rss, pss = measure(mode, workers, data_dir, snapshot)
+                print(f"{workers:>7} | {mode:>8} | {rss:>12.1f} | {pss:>12.1f} | {pss / workers:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
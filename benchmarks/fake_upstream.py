@@ -0,0 +1,120 @@
+"""
+Local stand-in for the OpenAI and SkyExperts APIs, for load tests (bench_async.py).
+Every call sleeps a fixed latency, then returns a canned reply:
+- POST /v1/chat/completions: "null" for the date-extractor prompt, a short narrative otherwise
+                             (as server-sent chunks when "stream" is set)
+- POST /searchflight:        a SkyExperts body with a few one-way flights
+More than FAKE_SKYEXPERTS_MAX concurrent searches (0 = no cap) get an immediate 429, like a
+rate-limited API (bench_upstream_limits.py). A FAKE_ERROR_RATE share of LLM and search calls
+fail with a 503 after the usual latency (bench_deadlines.py).
+
+    FAKE_LLM_MS=400 FAKE_SKYEXPERTS_MS=800 uvicorn fake_upstream:app --port 18900
+"""
+import asyncio
+import json
+import os
+import random
+import time
+
+LLM_DELAY = float(os.getenv("FAKE_LLM_MS", 400)) / 1000
+SKYEXPERTS_DELAY = float(os.getenv("FAKE_SKYEXPERTS_MS", 800)) / 1000
+SKYEXPERTS_MAX = int(os.getenv("FAKE_SKYEXPERTS_MAX", 0))
+ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", 0))
+
+counts = {"llm": 0, "skyexperts": 0, "skyexperts_429": 0, "errors_503": 0}
+failures = random.Random(1)
+in_flight = {"skyexperts": 0}
+
+
+def flight(i):
+    """One-way SkyExperts flight in the shape flight_utils parses."""
+    stops = i % 3
+    legs = [
+        {"Departure": {"Iata": "DEL", "city": "Delhi", "Date": "2026-11-20", "time": "09:00"},
+         "Arrival": {"Iata": "DXB", "city": "Dubai", "Date": "2026-11-20", "time": "12:30"},
+         "OperatingAirline": {"name": "Emirates"}}
+        for _ in range(stops + 1)
+    ]
+    return {
+        "Airlinelists": ["EK"],
+        "price": {"total_price": 200 + 17 * i, "currency": "AED"},
+        "totaltime": 210 + 45 * stops,
+        "OutboundInboundlist": [{"totaltime": 210 + 45 * stops, "flightlist": legs}],
+    }
+
+
+SKYEXPERTS_BODY = json.dumps({"data": {"Currency_sign": "AED", "Data": [flight(i) for i in range(20)]}}).encode()
+
+
+def completion(content):
+    return json.dumps({
+        "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }).encode()
+
+
+def completion_chunks(content):
+    """The reply as a chat.completion.chunk event stream, a few words per chunk."""
+    words = content.split(" ")
+    events = []
+    for i in range(0, len(words), 3):
+        delta = {"content": " ".join(words[i:i + 3]) + (" " if i + 3 < len(words) else "")}
+        events.append({"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                       "model": "gpt-4o-mini", "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+    return "".join(f"data: {json.dumps(e)}\n\n" for e in events).encode() + b"data: [DONE]\n\n"
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+def fail():
+    if failures.random() < ERROR_RATE:
+        counts["errors_503"] += 1
+        return True
+    return False
+
+
+async def respond(send, body, status=200, content_type=b"application/json"):
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    body = await read_body(receive)
+    if scope["path"].endswith("/chat/completions"):
+        counts["llm"] += 1
+        await asyncio.sleep(LLM_DELAY)
+        if fail():
+            return await respond(send, b'{"error": {"message": "overloaded", "type": "server_error"}}', 503)
+        request = json.loads(body)
+        prompt = request["messages"][0]["content"]
+        content = "null" if "date extractor" in prompt else "**Day 1** – a lovely day."
+        if request.get("stream"):
+            return await respond(send, completion_chunks(content), content_type=b"text/event-stream")
+        return await respond(send, completion(content))
+    if scope["path"] == "/searchflight":
+        if SKYEXPERTS_MAX and in_flight["skyexperts"] >= SKYEXPERTS_MAX:
+            counts["skyexperts_429"] += 1
+            return await respond(send, b'{"error": "rate limited"}', 429)
+        counts["skyexperts"] += 1
+        in_flight["skyexperts"] += 1
+        try:
+            await asyncio.sleep(SKYEXPERTS_DELAY)
+        finally:
+            in_flight["skyexperts"] -= 1
+        if fail():
+            return await respond(send, b'{"error": "unavailable"}', 503)
+        return await respond(send, SKYEXPERTS_BODY)
+    if scope["path"] == "/counts":
+        return await respond(send, json.dumps(counts).encode())
+    await respond(send, b'{"error": "not found"}', 404)
@@ -0,0 +1,61 @@
+"""
+Tier coverage of the offline flight query parser (query_rules) over a corpus.
+Queries it can't parse confidently would fall back to the LLM.
+
+Run from the repo root:
+    python benchmarks/parser_coverage.py                 # built-in sample corpus
+    python benchmarks/parser_coverage.py queries.txt     # one query per line
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_rules import coverage_report, rule_parse_query  # noqa: E402
+
+SAMPLE_QUERIES = [
+    "Flights from Delhi to Dubai tomorrow",
+    "flight DEL to DXB on 15 Sep",
+    "book ticket mumbai to abu dhabi next friday",
+    "flights from bangalore to sharjah day after tomorrow for 2 adults",
+    "cheap indigo flight hyderabad to dubai 20 oct",
+    "Kochi to Dubai next Monday returning after 10 days",
+    "flight to dubai from chennai on 2026-12-01 return 2026-12-15",
+    "business class emirates flight dubai to london next week",
+    "3 adults 1 child kozhikode to abu dhabi tomorrow",
+    "flights from lucknow to riyadh after 5 days",
+    "दिल्ली से दुबई कल",
+    "मुंबई से दुबई परसों की फ्लाइट",
+    "flight from jaipur to dubai on 5th november",
+    "doha to delhi tomorrow economy",
+    "flights from delhi to dubai or sharjah tomorrow",
+    "book a flight to london",
+    "I want to fly somewhere warm for Christmas",
+    "flight from delhi to dubai with 2 stops max tomorrow",
+    "Need a ticket from Dhaka to Dubai mid next month",
+    "flights from delhi to dubai, flexible dates",
+    "kal dilli se dubai ki flight",
+    "DXB to BOM tonight",
+    "flight from pune to dubai this saturday",
+    "two adults from amritsar to dubai next tuesday",
+    "dubai to delhi tomorrow no indigo",
+    "delhi dubai delhi tomorrow",
+]
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as fh:
+            queries = [line.strip() for line in fh if line.strip()]
+    else:
+        queries = SAMPLE_QUERIES
+
+    for q in queries:
+        _, confident = rule_parse_query(q)
+        print(f"{'rules' if confident else 'LLM  '} | {q}")
+    print()
+    print(coverage_report(queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a TTL and stale-while-revalidate.
+    - Entry younger than `ttl` → fresh hit.
+    - Entry older than `ttl` but within `ttl + stale_ttl` → stale hit, returned
+      immediately while a background thread reloads it.
+    - Anything older (or missing) → miss, loader runs inline.
+    Values for which `is_negative(value)` is true (error / empty replies) are kept only
+    `negative_ttl` seconds and never served stale, so one bad reply isn't served for a full TTL.
+    """
+
+    def __init__(self, maxsize=256, ttl=300, stale_ttl=0, name="cache", negative_ttl=None, is_negative=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.is_negative = is_negative
+        self.name = name
+        self._data = OrderedDict()   # key -> (stored_at, value, ttl, stale_ttl)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "refreshes": 0, "refresh_errors": 0}
+
+    def get(self, key):
+        """Return a cached value (fresh or stale) or None; counts as a hit/miss."""
+        with self._lock:
+            entry = self._lookup(key)
+            self._stats["hits" if entry else "misses"] += 1
+            return entry[1] if entry else None
+
+    def peek(self, key):
+        """Like get, but not counted as a hit or miss (for read-modify-write callers)."""
+        with self._lock:
+            entry = self._lookup(key)
+            return entry[1] if entry else None
+
+    def set(self, key, value):
+        if self.is_negative is not None and self.is_negative(value):
+            ttl, stale_ttl = self.negative_ttl, 0
+        else:
+            ttl, stale_ttl = self.ttl, self.stale_ttl
+        with self._lock:
+            self._data[key] = (time.monotonic(), value, ttl, stale_ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for `key`, calling `loader()` on a miss.
+        Exceptions from the loader are not cached and propagate to the caller.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry:
+                stored_at, value, ttl, _ = entry
+                if time.monotonic() - stored_at <= ttl:
+                    self._stats["hits"] += 1
+                    return value
+                self._stats["stale_hits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                return value
+            self._stats["misses"] += 1
+
+        value = loader()
+        self.set(key, value)
+        return value
+
+    def items(self):
+        """Snapshot of live (key, value) pairs, least recently used first."""
+        with self._lock:
+            return [(k, entry[1]) for k, entry in self._data.items()]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                    "negative_ttl": self.negative_ttl}
+
+    # --- internals (caller holds the lock) ---
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        stored_at, _, ttl, stale_ttl = entry
+        if time.monotonic() - stored_at > ttl + stale_ttl:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _refresh(self, key, loader):
+        try:
+            value = loader()
+            self.set(key, value)
+            with self._lock:
+                self._stats["refreshes"] += 1
+        except Exception as e:
+            print(f"{self.name}: background refresh failed:", e)
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
@@ -0,0 +1,553 @@
+"""
+Per-city index over the attraction / hotel / restaurant catalogs.
+
+Built once at load time so build_itinerary does dictionary lookups and O(k) work on
+the city's own rows instead of scanning and copying the full DataFrames per request:
+attractions are drawn lazily from cached per-(preference, slot) candidate lists, hotels
+and restaurants are read from a random offset of the city's span.
+pandas is only used to read the CSVs (load_catalog). The request path sees an immutable
+column store: rows grouped by city, free text packed into one UTF-8 buffer per column,
+repeated values (categories, cuisines, ratings...) as small integer codes into interned
+string tables. Records are materialized only for the handful of rows an itinerary uses.
+Coordinates are plain float64 columns with a grid SpatialIndex per city span for proximity picks.
+"""
+import math
+import os
+import random
+import sys
+
+import numpy as np
+
+from route_planner import (
+    DAY_SLOTS, ROUTE_MATRIX_MAX, cluster_days, distance_matrix, order_route, route_cost, slot_mismatch_km,
+)
+from spatial_index import SpatialIndex, haversine_km
+
+# Source CSVs (compiled into a snapshot by catalog_snapshot.py)
+CATALOG_DIR = os.getenv("CATALOG_DIR", ".")
+CATALOG_CSVS = tuple(
+    os.path.join(CATALOG_DIR, name) for name in ("uae_attractions.csv", "uae_hotels.csv", "uae_restaurants.csv")
+)
+
+RATING_MAP = {
+    "OneStar": 1,
+    "TwoStar": 2,
+    "ThreeStar": 3,
+    "FourStar": 4,
+    "FiveStar": 5
+}
+
+
+# ---------------- Value cleaning (ingest time) ----------------
+def _is_missing(val):
+    return val is None or (isinstance(val, float) and math.isnan(val))
+
+
+def clean_value(val, default="Not Available"):
+    if _is_missing(val) or str(val).strip().lower() in ["nan", "none", ""]:
+        return default
+    return str(val)
+
+
+def format_rating(rating):
+    if _is_missing(rating):
+        return "Not Rated"
+    return f"{int(rating)}-Star"
+
+
+def _text(val):
+    return "" if _is_missing(val) else str(val)
+
+
+def _coordinates(df, column):
+    """float64 column (NaN where missing / unparsable, all NaN if the CSV has no such column)."""
+    import pandas as pd
+
+    if column not in df:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+# ---------------- Columns ----------------
+class StringColumn:
+    """Strings packed into one UTF-8 buffer plus an offsets array (no per-row str objects)."""
+
+    __slots__ = ("_blob", "_offsets")
+
+    def __init__(self, values):
+        encoded = [v.encode("utf-8") for v in values]
+        self._offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded)), out=self._offsets[1:])
+        self._blob = b"".join(encoded)
+
+    @classmethod
+    def from_buffers(cls, blob, offsets):
+        """Wrap existing buffers (e.g. slices of a memory-mapped snapshot) without copying."""
+        column = cls.__new__(cls)
+        column._blob = blob
+        column._offsets = offsets
+        return column
+
+    @property
+    def blob(self):
+        return self._blob
+
+    @property
+    def offsets(self):
+        return self._offsets
+
+    def __getitem__(self, i):
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+
+class CodedColumn:
+    """Low-cardinality strings: table of interned values plus int32 codes."""
+
+    __slots__ = ("values", "codes")
+
+    def __init__(self, values):
+        table = {}
+        self.codes = np.fromiter((table.setdefault(v, len(table)) for v in values), dtype=np.int32, count=len(values))
+        self.values = tuple(sys.intern(v) for v in table)
+
+    @classmethod
+    def from_arrays(cls, values, codes):
+        column = cls.__new__(cls)
+        column.values = tuple(sys.intern(v) for v in values)
+        column.codes = codes
+        return column
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+    def __len__(self):
+        return len(self.codes)
+
+
+# ---------------- Records (built on access) ----------------
+class Attraction:
+    __slots__ = ("name", "category", "description", "lat", "lon")
+
+    def __init__(self, name, category, description, lat, lon):
+        self.name = name
+        self.category = category
+        self.description = description
+        self.lat = lat
+        self.lon = lon
+
+
+class Hotel:
+    __slots__ = ("name", "rating", "lat", "lon")
+
+    def __init__(self, name, rating, lat, lon):
+        self.name = name        # display string
+        self.rating = rating    # "5-Star" / "Not Rated"
+        self.lat = lat
+        self.lon = lon
+
+
+class Restaurant:
+    __slots__ = ("name", "cuisines", "rating", "votes", "cost_for_two", "lat", "lon")
+
+    def __init__(self, name, cuisines, rating, votes, cost_for_two, lat, lon):
+        self.name = name
+        self.cuisines = cuisines
+        self.rating = rating
+        self.votes = votes
+        self.cost_for_two = cost_for_two
+        self.lat = lat
+        self.lon = lon
+
+
+class Table:
+    """
+    Column store for one record type; rows are grouped by city, spans[city] = (start, stop).
+    The last two columns are always lat / lon (float64 arrays); spatial[city] indexes the
+    city's span only, so other cities' rows never become candidates of a proximity query.
+    """
+
+    __slots__ = ("record_cls", "columns", "spans", "spatial")
+    RECORDS = {"attractions": Attraction, "hotels": Hotel, "restaurants": Restaurant}
+
+    def __init__(self, record_cls, columns, spans):
+        self.record_cls = record_cls
+        self.columns = columns      # one column per record_cls slot, same order
+        self.spans = spans
+        lat, lon = columns[-2], columns[-1]
+        self.spatial = {
+            city: SpatialIndex(lat[start:stop], lon[start:stop], offset=start)
+            for city, (start, stop) in spans.items() if stop > start
+        }
+
+    def row(self, i):
+        return self.record_cls(*(col[i] for col in self.columns))
+
+    def nearest(self, city, lat, lon, k=1, exclude=None):
+        """[(row, distance_km)] for the k rows of `city` nearest to (lat, lon)."""
+        index = self.spatial.get(city)
+        return index.nearest(lat, lon, k, exclude=exclude) if index is not None else []
+
+    def rows(self, city):
+        start, stop = self.spans.get(city, (0, 0))
+        return RowView(self, range(start, stop))
+
+
+class RowView:
+    """Sequence of records over some rows of a Table (a city's span), read from position `offset` on."""
+
+    __slots__ = ("table", "index", "offset")
+
+    def __init__(self, table, index, offset=0):
+        self.table = table
+        self.index = index
+        self.offset = offset
+
+    def __getitem__(self, i):
+        return self.table.row(int(self.index[(self.offset + i) % len(self.index)]))
+
+    def __len__(self):
+        return len(self.index)
+
+    def rotated(self):
+        """Same rows starting at a random position (O(1), nothing is copied)."""
+        return RowView(self.table, self.index, random.randrange(len(self.index))) if len(self.index) else self
+
+
+class LazyShuffle:
+    """Draws `rows` (array or range) in random order without replacement, O(1) per draw (sparse Fisher-Yates)."""
+
+    __slots__ = ("rows", "_left", "_swaps")
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._left = len(rows)
+        self._swaps = {}
+
+    def draw(self):
+        """Next row, or None once every row has been drawn."""
+        if not self._left:
+            return None
+        j = random.randrange(self._left)
+        self._left -= 1
+        picked = self._swaps.get(j, j)
+        self._swaps[j] = self._swaps.pop(self._left, self._left)
+        return int(self.rows[picked])
+
+
+# ---------------- Category bitmasks ----------------
+def category_bits(preference_map, time_based_map):
+    """One bit per category pattern used by the slot and preference maps (lowercase)."""
+    patterns = sorted({c.lower() for cats in (*preference_map.values(), *time_based_map.values()) for c in cats})
+    if len(patterns) > 64:
+        raise ValueError(f"catalog_index: {len(patterns)} category patterns, bitmask holds 64")
+    return {p: np.uint64(1 << i) for i, p in enumerate(patterns)}
+
+
+def pattern_mask(patterns, bits):
+    mask = np.uint64(0)
+    for p in patterns:
+        mask |= bits[p.lower()]
+    return mask
+
+
+def category_masks(categories, bits):
+    """uint64 mask per row of a CodedColumn: bit p set when the category contains pattern p."""
+    value_masks = np.array(
+        [pattern_mask((p for p in bits if p in value.lower()), bits) for value in categories.values],
+        dtype=np.uint64,
+    )
+    return value_masks[categories.codes] if len(categories) else np.zeros(0, dtype=np.uint64)
+
+
+class CityCatalog:
+    """
+    Rows of one city plus each attraction's Category encoded as a bitmask:
+    bit p is set when the category contains pattern p (case-insensitive substring, same
+    as the old `str.contains` filters). Slots and preferences are masks over the same bits,
+    so matching is a bitwise AND over one uint64 array, done once per (preference bit, slot)
+    and cached; requests only draw from the cached candidate lists.
+    """
+
+    __slots__ = ("name", "attractions", "hotels", "restaurants", "masks", "name_ids", "lat", "lon",
+                 "slot_masks", "bits", "_distances", "_candidates")
+
+    def __init__(self, name, attractions, hotels, restaurants, masks, name_ids, lat, lon, slot_masks, bits):
+        self.name = name                    # lowercase city key
+        self.attractions = attractions      # RowViews
+        self.hotels = hotels
+        self.restaurants = restaurants
+        self.masks = masks                  # views into the catalog-wide arrays
+        self.name_ids = name_ids
+        self.lat = lat                      # attraction coordinates
+        self.lon = lon
+        self.slot_masks = slot_masks
+        self.bits = bits
+        self._distances = None
+        self._candidates = {}
+
+    def ranked_bits(self, preferences, preference_map):
+        """Category bits of the preferences' (preference, category) pairs, in the order given."""
+        ranked = []
+        for pref in preferences:
+            for cat in preference_map.get(pref.lower(), []):
+                bit = self.bits[cat.lower()]
+                if bit not in ranked:
+                    ranked.append(bit)
+        return ranked
+
+    def candidates(self, bit=None, slot_mask=None):
+        """
+        City-local indices of the attractions matching `bit` and suited to `slot_mask` (None: no
+        filter). Built with one pass over the city's masks on first use, then cached.
+        """
+        key = (bit, slot_mask)
+        rows = self._candidates.get(key)
+        if rows is None:
+            if bit is None and slot_mask is None:
+                rows = range(len(self.attractions))
+            else:
+                hit = np.ones(len(self.masks), dtype=bool)
+                for mask in (bit, slot_mask):
+                    if mask is not None:
+                        hit &= (self.masks & mask) != 0
+                rows = np.flatnonzero(hit).astype(np.int32)
+            self._candidates[key] = rows
+        return rows
+
+    def picker(self, preferences, preference_map):
+        return AttractionPicker(self, self.ranked_bits(preferences, preference_map))
+
+    def rotated_hotels(self):
+        return self.hotels.rotated()
+
+    def rotated_restaurants(self):
+        return self.restaurants.rotated()
+
+    def nearest_hotel(self, lat, lon):
+        """Hotel closest to (lat, lon), or None if no hotel here has coordinates."""
+        hits = self.hotels.table.nearest(self.name, lat, lon)
+        return self.hotels.table.row(hits[0][0]) if hits else None
+
+    def nearest_restaurant(self, lat, lon, used):
+        """
+        Closest restaurant to (lat, lon) whose row is not in `used` (the row is added to it),
+        or None if none with coordinates is left.
+        """
+        hits = self.restaurants.table.nearest(self.name, lat, lon, exclude=used)
+        if not hits:
+            return None
+        used.add(hits[0][0])
+        return self.restaurants.table.row(hits[0][0])
+
+    def distances(self):
+        """Attraction-to-attraction km matrix (float32), built on first use; None above ROUTE_MATRIX_MAX rows."""
+        if self._distances is None and len(self.attractions) <= ROUTE_MATRIX_MAX:
+            self._distances = distance_matrix(self.lat, self.lon)
+        return self._distances
+
+    def _slot_cost(self, stops, penalty=1.0):
+        """len(stops) x len(stops): `penalty` where stop p does not suit the slot at position i."""
+        cost = np.zeros((len(stops), len(stops)), dtype=np.float64)
+        masks = self.masks[stops]
+        for i, slot in enumerate(DAY_SLOTS[:len(stops)]):
+            slot_mask = self.slot_masks.get(slot, np.uint64(0))
+            if slot_mask:
+                cost[(masks & slot_mask) == 0, i] = penalty
+        return cost
+
+    def slot_mismatches(self, days):
+        """Stops (city-local indices, one list per day in slot order) whose category does not suit their slot."""
+        return sum(int(np.trace(self._slot_cost(np.array(day, dtype=np.int64)))) for day in days if day)
+
+    def plan_days(self, days, hotel=None):
+        """
+        Regroup picked attractions (one list of city-local indices per day, in slot order) into
+        compact days, each ordered as a route from the hotel. Every day keeps one pick per slot
+        it had (a Morning pick only trades places with other days' Morning picks), and a day's
+        stops are reordered only between orders with no more slot mismatches, so planning never
+        adds a mismatch. Returned unchanged if any pick has no coordinates.
+        """
+        stops = np.array([i for day in days for i in day], dtype=np.int64)
+        if len(stops) < 2 or not (np.isfinite(self.lat[stops]).all() and np.isfinite(self.lon[stops]).all()):
+            return days
+
+        full = self.distances()
+        dist = full[np.ix_(stops, stops)] if full is not None else distance_matrix(self.lat[stops], self.lon[stops])
+        origin = None
+        if hotel is not None and np.isfinite(hotel.lat) and np.isfinite(hotel.lon):
+            origin = haversine_km(hotel.lat, hotel.lon, self.lat[stops], self.lon[stops])
+
+        slots = np.array([i for day in days for i in range(len(day))], dtype=np.int64)
+        capacities = np.zeros((len(days), len(DAY_SLOTS)), dtype=np.int64)
+        for d, day in enumerate(days):
+            capacities[d, :len(day)] = 1
+
+        planned = []
+        for group in cluster_days(dist, capacities, slots):
+            group = sorted(group, key=lambda p: slots[p])   # slot order
+            group_stops = stops[group]
+            group_dist = dist[np.ix_(group, group)]
+            group_origin = None if origin is None else origin[group]
+            slot_cost = self._slot_cost(group_stops, slot_mismatch_km(group_dist, group_origin))
+            route = min(order_route(group_dist, group_origin, slot_cost), list(range(len(group))),
+                        key=lambda r: route_cost(r, group_dist, group_origin, slot_cost))
+            planned.append([int(group_stops[p]) for p in route])
+        return planned
+
+
+class AttractionPicker:
+    """
+    Random slot picks, preference matches first (by the first preference bit they match, in
+    the order given); a picked attraction's name is used up for the whole city.
+    Candidate lists are drawn lazily, so a trip costs O(picks) rather than O(attractions in city).
+    """
+
+    def __init__(self, catalog, ranked):
+        self.catalog = catalog
+        self._groups = [*ranked, None]  # preference bits, then every attraction
+        self._draws = {}                # (bit, slot_mask) -> LazyShuffle
+        self._used = set()              # name ids
+
+    def pick(self, slot):
+        """Random unused attraction suited to `slot`, else a random unused one, else None."""
+        index = self.pick_index(slot)
+        return None if index is None else self.catalog.attractions[index]
+
+    def pick_index(self, slot):
+        """Like pick, but the city-local attraction index."""
+        slot_mask = self.catalog.slot_masks.get(slot, np.uint64(0))
+        passes = (slot_mask, None) if slot_mask else (None,)
+        for mask in passes:
+            for bit in self._groups:
+                index = self._draw(bit, mask)
+                if index is not None:
+                    self._used.add(int(self.catalog.name_ids[index]))
+                    return index
+        return None
+
+    def _draw(self, bit, slot_mask):
+        """Next unused candidate of (bit, slot_mask); used ones are dropped for good (names stay used)."""
+        key = (bit, slot_mask)
+        draws = self._draws.get(key)
+        if draws is None:
+            draws = self._draws[key] = LazyShuffle(self.catalog.candidates(bit, slot_mask))
+        while True:
+            index = draws.draw()
+            if index is None or int(self.catalog.name_ids[index]) not in self._used:
+                return index
+
+
+# ---------------- Catalog ----------------
+class Catalog:
+    """
+    Per-city catalogs over shared column stores, plus the attraction category names.
+    The tables, name ids and categories come from the data (CSV ingest or snapshot);
+    the category masks are derived here from the slot / preference maps.
+    """
+
+    __slots__ = ("attractions", "hotels", "restaurants", "masks", "name_ids", "slot_masks", "bits",
+                 "categories", "_cities")
+
+    def __init__(self, attractions, hotels, restaurants, name_ids, categories, preference_map, time_based_map):
+        self.attractions = attractions      # Tables
+        self.hotels = hotels
+        self.restaurants = restaurants
+        self.name_ids = name_ids
+        self.categories = categories
+        self.bits = category_bits(preference_map, time_based_map)
+        self.masks = category_masks(attractions.columns[1], self.bits)  # columns follow Attraction.__slots__
+        self.slot_masks = {slot: pattern_mask(cats, self.bits) for slot, cats in time_based_map.items()}
+        self._cities = {
+            city: self._city_catalog(city)
+            for city in set(attractions.spans) | set(hotels.spans) | set(restaurants.spans)
+        }
+
+    def _city_catalog(self, city):
+        start, stop = self.attractions.spans.get(city, (0, 0))
+        return CityCatalog(
+            city, self.attractions.rows(city), self.hotels.rows(city), self.restaurants.rows(city),
+            self.masks[start:stop], self.name_ids[start:stop],
+            self.attractions.columns[-2][start:stop], self.attractions.columns[-1][start:stop],
+            self.slot_masks, self.bits,
+        )
+
+    def city(self, name):
+        key = name.lower()
+        return self._cities.get(key) or self._city_catalog(key)
+
+
+def _group_by_city(df, city_column):
+    """Rows with a city, stably sorted by lowercase city → (frame, {city: (start, stop)})."""
+    df = df[df[city_column].notna()]
+    df = df.assign(_city=df[city_column].astype(str).str.lower()).sort_values("_city", kind="stable")
+    spans, start = {}, 0
+    for city, count in df["_city"].value_counts(sort=False).sort_index().items():
+        spans[city] = (start, start + count)
+        start += count
+    return df, spans
+
+
+def build_catalog(attractions, hotels, restaurants, preference_map, time_based_map):
+    """Catalog from the three (already normalized) DataFrames."""
+    a, a_spans = _group_by_city(attractions, "City")
+    h, h_spans = _group_by_city(hotels, "cityName")
+    r, r_spans = _group_by_city(restaurants, "City")
+
+    attraction_table = Table(Attraction, (
+        StringColumn([_text(v) for v in a["Name"].tolist()]),
+        CodedColumn([_text(v) for v in a["Category"].tolist()]),
+        StringColumn([_text(v) for v in a["Description"].tolist()]),
+        _coordinates(a, "Latitude"),
+        _coordinates(a, "Longitude"),
+    ), a_spans)
+    hotel_table = Table(Hotel, (
+        StringColumn([clean_value(v) for v in h["HotelName"].tolist()]),
+        CodedColumn([format_rating(v) for v in h["HotelRating"].tolist()]),
+        _coordinates(h, "Latitude"),
+        _coordinates(h, "Longitude"),
+    ), h_spans)
+    restaurant_table = Table(Restaurant, (
+        StringColumn([clean_value(v) for v in r["Restaurant Name"].tolist()]),
+        CodedColumn([clean_value(v) for v in r["Cuisines"].tolist()]),
+        CodedColumn([clean_value(v, "Not Rated") for v in r["Aggregate rating"].tolist()]),
+        CodedColumn([clean_value(v, "0") for v in r["Votes"].tolist()]),
+        CodedColumn([clean_value(v, "N/A") for v in r["Average Cost for two"].tolist()]),
+        _coordinates(r, "Latitude"),
+        _coordinates(r, "Longitude"),
+    ), r_spans)
+
+    seen = {}
+    name_ids = np.fromiter(
+        (seen.setdefault(n, len(seen)) for n in a["Name"].tolist()), dtype=np.int32, count=len(a)
+    )
+    return Catalog(
+        attraction_table, hotel_table, restaurant_table, name_ids,
+        [c for c in attractions["Category"].dropna().unique().tolist() if c.lower() != "hotel"],
+        preference_map, time_based_map,
+    )
+
+
+def load_catalog(attractions_csv, hotels_csv, restaurants_csv, preference_map, time_based_map):
+    """
+    Read the CSVs with pandas, normalize them and build the Catalog; the frames are dropped afterwards.
+    Workers normally load the prebuilt snapshot instead (catalog_snapshot.open_catalog).
+    """
+    import pandas as pd
+
+    attractions = pd.read_csv(attractions_csv)
+    hotels = pd.read_csv(hotels_csv)
+    restaurants = pd.read_csv(restaurants_csv)
+
+    attractions.columns = attractions.columns.str.strip()
+    hotels.columns = hotels.columns.str.strip()
+    restaurants.columns = restaurants.columns.str.strip()
+
+    # Rating conversion
+    hotels["HotelRating"] = hotels["HotelRating"].map(RATING_MAP)
+    restaurants["Average Cost for two"] = pd.to_numeric(
+        restaurants["Average Cost for two"], errors="coerce"
+    )
+    return build_catalog(attractions, hotels, restaurants, preference_map, time_based_map)
@@ -0,0 +1,246 @@
+"""
+Prebuilt binary snapshot of the catalog, so workers skip pandas and CSV parsing at boot.
+
+Build it whenever the CSVs change (the app falls back to the CSVs if it is missing or stale):
+    python catalog_snapshot.py [output path]
+
+Layout: 8-byte magic, uint32 header length, JSON header (format version, source CSV
+fingerprints, spans, small string tables, array directory), then each array at a 64-byte
+aligned offset. The file is memory-mapped read-only; arrays and text buffers are views into
+the mapping, so loading is O(header) and the pages are shared through the OS page cache.
+
+A missing or stale snapshot is rebuilt in a child process (compile_snapshot): pandas and the
+ingest garbage, which the allocator keeps as RSS after it is freed, never enter the worker.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from catalog_index import (
+    CATALOG_CSVS, Catalog, CodedColumn, StringColumn, Table, load_catalog,
+)
+
+SNAPSHOT_MAGIC = b"TRVLCAT\x00"
+SNAPSHOT_VERSION = 2  # v2: lat / lon float columns
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", "catalog.snapshot")
+_ALIGN = 64
+
+# How the running catalog was loaded (shown in /stats)
+load_info = {"source": None, "load_ms": None, "path": None}
+
+
+# ---------------- Source fingerprints ----------------
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(paths):
+    return [
+        {"name": os.path.basename(p), "size": os.path.getsize(p), "mtime_ns": os.stat(p).st_mtime_ns, "sha256": _sha256(p)}
+        for p in paths
+    ]
+
+
+def _is_current(recorded, paths):
+    """True when the CSVs match the snapshot (size+mtime first, content hash if mtime moved)."""
+    if len(recorded) != len(paths):
+        return False
+    for entry, path in zip(recorded, paths):
+        if not os.path.exists(path):
+            continue  # deployed without the CSVs → trust the snapshot
+        stat = os.stat(path)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns != entry["mtime_ns"] and _sha256(path) != entry["sha256"]:
+            return False
+    return True
+
+
+# ---------------- Write ----------------
+def write_snapshot(catalog, path, sources):
+    """Serialize the data part of a Catalog (tables, name ids, categories) to `path` atomically."""
+    arrays = []
+
+    def add(array):
+        arrays.append(np.ascontiguousarray(array))
+        return len(arrays) - 1
+
+    tables = {}
+    for name in Table.RECORDS:
+        table = getattr(catalog, name)
+        columns = []
+        for column in table.columns:
+            if isinstance(column, StringColumn):
+                blob = np.frombuffer(bytes(column.blob), dtype=np.uint8)
+                columns.append({"kind": "str", "blob": add(blob), "offsets": add(column.offsets)})
+            elif isinstance(column, np.ndarray):
+                columns.append({"kind": "float", "values": add(column.astype(np.float64, copy=False))})
+            else:
+                columns.append({"kind": "coded", "values": list(column.values), "codes": add(column.codes)})
+        tables[name] = {"spans": table.spans, "columns": columns}
+
+    directory, offset = [], 0
+    name_ids = add(catalog.name_ids)
+    for array in arrays:
+        offset = -(-offset // _ALIGN) * _ALIGN
+        directory.append({"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)})
+        offset += array.nbytes
+
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "built_at": time.time(),
+        "sources": sources,
+        "categories": catalog.categories,
+        "tables": tables,
+        "name_ids": name_ids,
+        "arrays": directory,
+    }, ensure_ascii=False).encode("utf-8")
+    data_start = -(-(len(SNAPSHOT_MAGIC) + 4 + len(header)) // _ALIGN) * _ALIGN
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(SNAPSHOT_MAGIC + struct.pack("<I", len(header)) + header)
+        for array, entry in zip(arrays, directory):
+            fh.seek(data_start + entry["offset"])
+            fh.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+# ---------------- Read ----------------
+def _read_header(mapped, path):
+    if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        print("catalog_snapshot: not a snapshot file:", path)
+        return None, 0
+    (header_len,) = struct.unpack_from("<I", mapped, len(SNAPSHOT_MAGIC))
+    header_start = len(SNAPSHOT_MAGIC) + 4
+    header = json.loads(bytes(mapped[header_start:header_start + header_len]))
+    if header.get("version") != SNAPSHOT_VERSION:
+        print(f"catalog_snapshot: {path} is format v{header.get('version')}, expected v{SNAPSHOT_VERSION}")
+        return None, 0
+    return header, -(-(header_start + header_len) // _ALIGN) * _ALIGN
+
+
+def snapshot_is_current(path=CATALOG_SNAPSHOT, csvs=CATALOG_CSVS):
+    """True if `path` is a snapshot of this format version built from the current CSVs."""
+    try:
+        with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            header, _ = _read_header(mapped, path)
+    except (OSError, ValueError):
+        return False
+    return header is not None and _is_current(header["sources"], csvs)
+
+
+def read_snapshot(path, preference_map, time_based_map, sources=None):
+    """
+    Catalog backed by a memory-mapped snapshot, or None if the file is missing, has another
+    format version, or (when `sources` CSV paths are given) was built from different CSVs.
+    """
+    try:
+        with open(path, "rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    header, data_start = _read_header(mapped, path)
+    if header is None:
+        return None
+    if sources is not None and not _is_current(header["sources"], sources):
+        print(f"catalog_snapshot: {path} is stale (CSVs changed), rebuild with `python catalog_snapshot.py`")
+        return None
+
+    buffer = memoryview(mapped)
+
+    def array(i):
+        entry = header["arrays"][i]
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + entry["offset"])
+
+    tables = {}
+    for name, record_cls in Table.RECORDS.items():
+        spec = header["tables"][name]
+        columns = []
+        for column in spec["columns"]:
+            if column["kind"] == "str":
+                blob = array(column["blob"])
+                start = data_start + header["arrays"][column["blob"]]["offset"]
+                columns.append(StringColumn.from_buffers(buffer[start:start + len(blob)], array(column["offsets"])))
+            elif column["kind"] == "float":
+                columns.append(array(column["values"]))
+            else:
+                columns.append(CodedColumn.from_arrays(column["values"], array(column["codes"])))
+        tables[name] = Table(record_cls, tuple(columns), {city: tuple(span) for city, span in spec["spans"].items()})
+
+    return Catalog(
+        tables["attractions"], tables["hotels"], tables["restaurants"], array(header["name_ids"]),
+        header["categories"], preference_map, time_based_map,
+    )
+
+
+def open_catalog(preference_map, time_based_map, csvs=CATALOG_CSVS, path=CATALOG_SNAPSHOT):
+    """
+    Catalog from the snapshot when it is current; else the snapshot is rebuilt from the CSVs
+    in a child process and mapped. In-process pandas load only without a snapshot path or
+    when the rebuild fails.
+    """
+    start = time.perf_counter()
+    catalog = read_snapshot(path, preference_map, time_based_map, sources=csvs) if path else None
+    source = "snapshot"
+    if catalog is None and path and all(os.path.exists(p) for p in csvs) and compile_snapshot(path, csvs):
+        catalog = read_snapshot(path, preference_map, time_based_map, sources=csvs)
+        source = "snapshot (rebuilt)"
+    if catalog is None:
+        catalog = load_catalog(*csvs, preference_map, time_based_map)
+        source = "csv"
+    load_info.update(source=source, path=path if source != "csv" else None,
+                     load_ms=round((time.perf_counter() - start) * 1000, 2))
+    return catalog
+
+
+def build(path=CATALOG_SNAPSHOT, csvs=CATALOG_CSVS):
+    """Compile the CSVs into a snapshot at `path`."""
+    catalog = load_catalog(*csvs, {}, {})
+    write_snapshot(catalog, path, source_fingerprint(csvs))
+    return catalog
+
+
+def compile_snapshot(path=CATALOG_SNAPSHOT, csvs=CATALOG_CSVS):
+    """build() in a child process (`python catalog_snapshot.py path csvs...`). Returns True if built."""
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), path, *csvs],
+                            capture_output=True, text=True, encoding="utf-8",
+                            env={**os.environ, "PYTHONIOENCODING": "utf-8"})
+    if result.returncode != 0:
+        print("catalog_snapshot: rebuild failed:", (result.stderr.strip().splitlines() or ["?"])[-1])
+        return False
+    return True
+
+
+def ensure_snapshot(path=CATALOG_SNAPSHOT, csvs=CATALOG_CSVS):
+    """(Re)build the snapshot if it is missing or stale and the CSVs are there. Returns True if built."""
+    if not path or snapshot_is_current(path, csvs) or not all(os.path.exists(p) for p in csvs):
+        return False
+    return compile_snapshot(path, csvs)
+
+
+if __name__ == "__main__":
+    # python catalog_snapshot.py [output path [attractions.csv hotels.csv restaurants.csv]]
+    out = sys.argv[1] if len(sys.argv) > 1 else CATALOG_SNAPSHOT
+    sources = tuple(sys.argv[2:5]) if len(sys.argv) > 4 else CATALOG_CSVS
+    started = time.perf_counter()
+    built = build(out, sources)
+    print(f"✅ {out}: {len(built.attractions.columns[0])} attractions, {len(built.hotels.columns[0])} hotels, "
+          f"{len(built.restaurants.columns[0])} restaurants, {os.path.getsize(out) / 1024:.0f} KB "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms")
@@ -0,0 +1,185 @@
+import re
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+# parsedatetime / dateutil are imported on first use: most phrases resolve before reaching them
+DATE_MEMO_SIZE = 4096
+
+# ---------------- Precompiled patterns ----------------
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+HINDI_WEEKDAYS = {
+    "सोमवार": 0, "मंगलवार": 1, "बुधवार": 2, "गुरुवार": 3, "बृहस्पतिवार": 3,
+    "शुक्रवार": 4, "शनिवार": 5, "रविवार": 6,
+}
+
+_DEVANAGARI = "\u0900-\u097F"
+
+
+def _hindi_word(word):
+    """Whole-word match for Devanagari (\\b is unreliable around vowel signs)."""
+    return rf"(?<![{_DEVANAGARI}])(?:{word})(?![{_DEVANAGARI}])"
+
+
+_WEEKDAY_RE = re.compile("|".join(WEEKDAYS))
+_AFTER_DAYS_RE = re.compile(r"after (\d+) days?")
+_HINDI_AFTER_DAYS_RE = re.compile(r"(\d+)\s*दिन\s*(?:बाद|के बाद)")
+_HINDI_WEEKDAY_RE = re.compile("|".join(_hindi_word(w) for w in HINDI_WEEKDAYS))
+_HINDI_TODAY_RE = re.compile(_hindi_word("आज"))
+_HINDI_TOMORROW_RE = re.compile(_hindi_word("कल"))
+_HINDI_DAY_AFTER_RE = re.compile(_hindi_word("परसों"))
+_HINDI_NEXT_WEEK_RE = re.compile(rf"{_hindi_word('अगले|अगला')}\s*(?:हफ्ते|हफ़्ते|सप्ताह)")
+_HINDI_NEXT_MONTH_RE = re.compile(rf"{_hindi_word('अगले|अगला')}\s*(?:महीने|महीना)")
+
+_MONTHS = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+)
+_WEEKDAY_NAMES = r"(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+
+# Phrase detection in free text: most specific first, each match is the phrase as written
+DATE_PHRASE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"\bday after tomorrow\b",
+    r"\btomorrow\b",
+    r"\btoday\b|\btonight\b",
+    r"\b(?:after|in)\s+\d{1,3}\s+days?\b",
+    r"\bnext\s+(?:week|month)\b",
+    r"\b\d{4}-\d{1,2}-\d{1,2}\b",
+    r"\b\d{1,2}[/.]\d{1,2}[/.]\d{4}\b",
+    rf"\b\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTHS}\b\.?(?:,?\s+\d{{4}})?",
+    rf"\b{_MONTHS}\.?\s+\d{{1,2}}(?:st|nd|rd|th)?\b(?!\s*(?:days?|nights?)\b)(?:,?\s+\d{{4}})?",
+    rf"\b(?:(?:next|this|coming)\s+)?{_WEEKDAY_NAMES}\b",
+    # Hindi
+    _HINDI_DAY_AFTER_RE.pattern,
+    _HINDI_TOMORROW_RE.pattern,
+    _HINDI_TODAY_RE.pattern,
+    _HINDI_AFTER_DAYS_RE.pattern,
+    _HINDI_NEXT_WEEK_RE.pattern,
+    _HINDI_NEXT_MONTH_RE.pattern,
+    rf"(?:{_hindi_word('अगले|अगला')}\s*)?(?:{_HINDI_WEEKDAY_RE.pattern})",
+)]
+
+_MONTH_RE = re.compile(rf"\b{_MONTHS}\b", re.IGNORECASE)
+_DAY_NUMBER_RE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\b")
+
+# parsedatetime.Calendar keeps a context stack internally → one instance per thread
+_local = threading.local()
+
+
+def _calendar():
+    cal = getattr(_local, "calendar", None)
+    if cal is None:
+        import parsedatetime
+        cal = _local.calendar = parsedatetime.Calendar()
+    return cal
+
+
+def _next_weekday(today, weekday_num):
+    days_ahead = (weekday_num - today.weekday() + 7) % 7
+    if days_ahead == 0:
+        days_ahead = 7  # same day → push 7 days
+    return today + timedelta(days=days_ahead)
+
+
+@lru_cache(maxsize=DATE_MEMO_SIZE)
+def _parse_cached(phrase, base_day):
+    today = datetime.combine(base_day, datetime.min.time())
+
+    # ✅ Special cases first
+    if "day after tomorrow" in phrase or _HINDI_DAY_AFTER_RE.search(phrase):
+        return (today + timedelta(days=2)).strftime('%Y-%m-%d')
+    if "tomorrow" in phrase or _HINDI_TOMORROW_RE.search(phrase):
+        return (today + timedelta(days=1)).strftime('%Y-%m-%d')
+    if _HINDI_TODAY_RE.search(phrase):
+        return today.strftime('%Y-%m-%d')
+
+    # ✅ Weekdays (English + Hindi); earliest weekday wins if several are mentioned
+    weekday_hits = [WEEKDAYS.index(m) for m in _WEEKDAY_RE.findall(phrase)]
+    weekday_hits += [HINDI_WEEKDAYS[m] for m in _HINDI_WEEKDAY_RE.findall(phrase)]
+    if weekday_hits:
+        return _next_weekday(today, min(weekday_hits)).strftime('%Y-%m-%d')
+
+    # ✅ "next month" / "अगले महीने", "अगले हफ्ते"
+    if phrase == "next month" or _HINDI_NEXT_MONTH_RE.search(phrase):
+        from dateutil.relativedelta import relativedelta
+        return (today + relativedelta(months=1)).strftime('%Y-%m-%d')
+    if _HINDI_NEXT_WEEK_RE.search(phrase):
+        return (today + timedelta(days=7)).strftime('%Y-%m-%d')
+
+    # ✅ "after N days" / "N दिन बाद"
+    match = _AFTER_DAYS_RE.search(phrase) or _HINDI_AFTER_DAYS_RE.search(phrase)
+    if match:
+        return (today + timedelta(days=int(match.group(1)))).strftime('%Y-%m-%d')
+
+    # ✅ parsedatetime fallback
+    time_struct, parse_status = _calendar().parse(phrase, sourceTime=today.timetuple())
+    if parse_status != 0:
+        return datetime(*time_struct[:6]).strftime('%Y-%m-%d')
+
+    # ✅ dateutil fallback
+    import dateutil.parser
+    try:
+        return dateutil.parser.parse(phrase, fuzzy=True, default=today).strftime('%Y-%m-%d')
+    except Exception:
+        return None
+
+
+def parse_date_string(natural_date, base_date=None):
+    """
+    Natural date phrase (English or Hindi) → "YYYY-MM-DD", or None.
+    Memoized on (phrase, base day), so repeated phrases cost a dict lookup.
+    """
+    if not natural_date:
+        return None
+    base_day = (base_date or datetime.now()).date()
+    return _parse_cached(natural_date.lower().strip(), base_day)
+
+
+def parse_date_strings(phrases, base_date=None):
+    """Batch variant of parse_date_string: same base date for every phrase."""
+    base_date = base_date or datetime.now()
+    return [parse_date_string(p, base_date) for p in phrases]
+
+
+def resolve_trip_dates(depdate_raw, retdate_raw=None, base_date=None):
+    """
+    Resolve a (departure, return) phrase pair together.
+    The return phrase is relative to the resolved departure ("after 5 days" → dep + 5).
+    """
+    depdate = parse_date_string(depdate_raw, base_date) if depdate_raw else None
+    retdate = None
+    if retdate_raw and depdate:
+        retdate = parse_date_string(retdate_raw, datetime.strptime(depdate, "%Y-%m-%d"))
+    return depdate, retdate
+
+
+def find_date_phrase(query):
+    """Return the first date phrase recognised by the local patterns, or None."""
+    if not query:
+        return None
+    for pattern in DATE_PHRASE_PATTERNS:
+        match = pattern.search(query)
+        if match:
+            return match.group(0).strip()
+    return None
+
+
+def resolve_locally(phrase):
+    """
+    ISO date for a locally found phrase, or None if it can't be resolved confidently.
+    For "20th of September"-style phrases the resolved day must match the one written,
+    since parsedatetime silently falls back to other days on forms it half-understands.
+    """
+    resolved = parse_date_string(phrase)
+    if not resolved:
+        return None
+    if _MONTH_RE.search(phrase):
+        day = _DAY_NUMBER_RE.search(phrase)
+        if not day or int(day.group(1)) != int(resolved[-2:]):
+            return None
+    return resolved
+
+
+def date_engine_stats():
+    info = _parse_cached.cache_info()
+    return {"memo_hits": info.hits, "memo_misses": info.misses, "memo_size": info.currsize}
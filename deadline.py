@@ -0,0 +1,169 @@
+"""
+Per-request time budget for /query, seen by every upstream call it makes.
+
+query_handler opens a deadline_scope(); the Deadline sits in a context variable, so the
+LLM / SkyExperts calls further down read it without it being passed through every
+function. asyncio tasks inherit it; worker threads need contextvars.copy_context()
+(see fare_calendar_search). Outside a scope (background refreshes, scripts) there is no
+deadline and only the per-call limits apply.
+
+- limit_timeout / budget: per-attempt timeouts shrink to the time left
+- call_with_retries / acall_with_retries: transient failures (timeouts, connection
+  errors, 429, 5xx) are retried with full-jitter exponential backoff, but only while the
+  remaining budget still covers the backoff plus UPSTREAM_MIN_ATTEMPT
+"""
+import asyncio
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+QUERY_DEADLINE = float(os.getenv("QUERY_DEADLINE", 25))                # seconds per /query (SLO)
+UPSTREAM_RETRY_ATTEMPTS = int(os.getenv("UPSTREAM_RETRY_ATTEMPTS", 3))  # attempts per upstream call
+UPSTREAM_RETRY_BASE = float(os.getenv("UPSTREAM_RETRY_BASE", 0.25))     # first backoff ceiling (s)
+UPSTREAM_RETRY_CAP = float(os.getenv("UPSTREAM_RETRY_CAP", 4))          # largest backoff ceiling (s)
+UPSTREAM_MIN_ATTEMPT = float(os.getenv("UPSTREAM_MIN_ATTEMPT", 1))      # no attempt with less time left
+
+_current = contextvars.ContextVar("deadline", default=None)
+_lock = threading.Lock()
+_stats = {"requests": 0, "exceeded": 0, "retries": 0, "retries_skipped_budget": 0, "degraded": 0}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before (or while) calling an upstream."""
+
+
+class Deadline:
+    def __init__(self, seconds=QUERY_DEADLINE):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+    def check(self, what="request"):
+        if self.remaining() <= 0:
+            raise self.exceeded(what)
+
+    def exceeded(self, what="request"):
+        count("exceeded")
+        return DeadlineExceeded(f"{what}: {self.seconds:g} s deadline exceeded")
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(deadline=None):
+    """Make `deadline` (a new QUERY_DEADLINE one by default) current for the block."""
+    deadline = deadline or Deadline()
+    token = _current.set(deadline)
+    count("requests")
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def use_deadline(deadline):
+    """Re-enter an existing deadline (e.g. in a streaming generator that runs after the handler)."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def budget(limit):
+    """`limit` seconds, capped by the current deadline's time left; DeadlineExceeded once it is spent."""
+    deadline = current()
+    if deadline is None:
+        return limit
+    deadline.check()
+    return min(limit, deadline.remaining())
+
+
+def limit_timeout(timeout):
+    """(connect, read) timeout, or seconds, with each part capped by the time left."""
+    if isinstance(timeout, tuple):
+        return tuple(budget(t) for t in timeout)
+    return budget(timeout)
+
+
+# ---------------- Retries ----------------
+def retryable(e):
+    """Timeouts, connection errors, 429 and 5xx are worth another attempt; anything else isn't."""
+    if isinstance(e, DeadlineExceeded):
+        return False
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    transient = [requests.Timeout, requests.ConnectionError]
+    if "httpx" in sys.modules:
+        transient.append(sys.modules["httpx"].TransportError)
+    if "openai" in sys.modules:
+        transient.append(sys.modules["openai"].APIConnectionError)
+    return isinstance(e, tuple(transient))
+
+
+def _backoff(e, attempt):
+    """Seconds to sleep before the next attempt, or None to give up and re-raise `e`."""
+    if attempt + 1 >= UPSTREAM_RETRY_ATTEMPTS or not retryable(e):
+        return None
+    delay = random.uniform(0, min(UPSTREAM_RETRY_CAP, UPSTREAM_RETRY_BASE * 2 ** attempt))
+    deadline = current()
+    if deadline is not None and deadline.remaining() < delay + UPSTREAM_MIN_ATTEMPT:
+        count("retries_skipped_budget")
+        return None
+    count("retries")
+    return delay
+
+
+def call_with_retries(attempt):
+    """attempt() with deadline-aware retries of transient failures."""
+    for n in range(max(1, UPSTREAM_RETRY_ATTEMPTS)):
+        try:
+            return attempt()
+        except Exception as e:
+            delay = _backoff(e, n)
+            if delay is None:
+                raise
+        time.sleep(delay)
+
+
+async def acall_with_retries(attempt):
+    """call_with_retries for a coroutine function."""
+    for n in range(max(1, UPSTREAM_RETRY_ATTEMPTS)):
+        try:
+            return await attempt()
+        except Exception as e:
+            delay = _backoff(e, n)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+
+
+# ---------------- Stats ----------------
+def count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+def degraded(what, error):
+    """Record that `what` was left out of a response because of `error`."""
+    count("degraded")
+    print(f"deadline: {what} skipped:", error)
+
+
+def deadline_stats():
+    with _lock:
+        return {**_stats, "query_deadline": QUERY_DEADLINE, "retry_attempts": UPSTREAM_RETRY_ATTEMPTS}
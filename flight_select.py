@@ -0,0 +1,125 @@
+import heapq
+from bisect import bisect_right
+
+# Default k per ranking (0 disables a ranking, None = unbounded for pareto)
+DEFAULT_K = {
+    "cheapest": 3,
+    "fastest": 3,
+    "direct": 3,
+    "fewest_stops": 3,
+    "pareto": None,
+}
+
+
+class TopK:
+    """Keeps the k smallest items by key (number or tuple); ties keep arrival order like a stable sort."""
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []   # max-heap via (negated key, -seq, item, key)
+        self._seq = 0
+
+    def push(self, key, item):
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, (self._neg(key), -self._seq, item, key))
+        elif key < self._heap[0][3]:
+            # Strictly better than the current worst (equal keys lose to earlier arrivals)
+            heapq.heapreplace(self._heap, (self._neg(key), -self._seq, item, key))
+
+    @staticmethod
+    def _neg(key):
+        return tuple(-x for x in key) if isinstance(key, tuple) else -key
+
+    def items(self):
+        return [e[2] for e in sorted(self._heap, reverse=True)]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class ParetoFrontier:
+    """
+    Price/duration Pareto frontier: items no other item beats on both price and minutes.
+    Kept sorted by price (minutes strictly falling), so each insert is a bisect.
+    """
+
+    def __init__(self):
+        self._prices = []
+        self._points = []   # (price, minutes, item)
+
+    def add(self, price, minutes, item):
+        points = self._points
+        if points and price >= points[0][0] and minutes >= points[0][1]:
+            return  # fast path: dominated by the cheapest frontier point
+        i = bisect_right(self._prices, price)
+        if i and self._points[i - 1][1] <= minutes:
+            return  # dominated (or duplicate of an earlier point)
+        if i and self._prices[i - 1] == price:
+            i -= 1
+            del self._prices[i], self._points[i]
+        j = i
+        while j < len(self._points) and self._points[j][1] >= minutes:
+            j += 1
+        self._prices[i:j] = [price]
+        self._points[i:j] = [(price, minutes, item)]
+
+    def items(self, k=None):
+        points = self._points if k is None else self._points[:k]
+        return [p[2] for p in points]
+
+    def __len__(self):
+        return len(self._points)
+
+
+class FlightSelector:
+    """
+    Single-pass selection engine: feed every flight once with add(), then read all
+    rankings from results(). O(n log k) overall; only O(k) items are retained
+    (plus the Pareto frontier, which is small in practice).
+    - cheapest / fastest / fewest_stops: bounded heaps (fewest_stops ties broken by price)
+    - direct: first k flights with 0 stops, in upstream order
+    - pareto: price/duration frontier sorted by price
+    """
+
+    def __init__(self, k=None):
+        self.k = {**DEFAULT_K, **(k or {})}
+        self.count = 0
+        self.min_price = float("inf")
+        self.max_price = float("-inf")
+        self._cheapest = TopK(self.k["cheapest"]) if self.k["cheapest"] else None
+        self._fastest = TopK(self.k["fastest"]) if self.k["fastest"] else None
+        self._fewest_stops = TopK(self.k["fewest_stops"]) if self.k["fewest_stops"] else None
+        self._direct = [] if self.k["direct"] else None
+        self._pareto = ParetoFrontier() if self.k["pareto"] != 0 else None
+
+    def add(self, item, price, minutes, stops):
+        self.count += 1
+        if price < self.min_price:
+            self.min_price = price
+        if price > self.max_price:
+            self.max_price = price
+        if self._cheapest is not None:
+            self._cheapest.push(price, item)
+        if self._fastest is not None:
+            self._fastest.push(minutes, item)
+        if self._fewest_stops is not None and stops is not None:
+            self._fewest_stops.push((stops, price), item)
+        if self._direct is not None and stops == 0 and len(self._direct) < self.k["direct"]:
+            self._direct.append(item)
+        if self._pareto is not None:
+            self._pareto.add(price, minutes, item)
+
+    def results(self):
+        out = {}
+        if self._cheapest is not None:
+            out["cheapest"] = self._cheapest.items()
+        if self._fastest is not None:
+            out["fastest"] = self._fastest.items()
+        if self._direct is not None:
+            out["direct"] = list(self._direct)
+        if self._fewest_stops is not None:
+            out["fewest_stops"] = self._fewest_stops.items()
+        if self._pareto is not None:
+            out["pareto"] = self._pareto.items(self.k["pareto"])
+        return out
@@ -1,10 +1,58 @@
 import requests
 import random
 import string
+import json
+import os
+import http_client
+import skyexperts_stream
+from flight_select import FlightSelector
 from itinerary import extract_start_date
+from cache_utils import TTLCache
+from single_flight import SingleFlight
+from upstream_limits import UpstreamBusy, skyexperts_limit
+from deadline import DeadlineExceeded, acall_with_retries, call_with_retries
 
 
-FLIGHT_API_URL = "https://www.skyexperts.co.uk/api/FlightApi/searchflight"
+FLIGHT_API_URL = os.getenv("FLIGHT_API_URL", "https://www.skyexperts.co.uk/api/FlightApi/searchflight")
+
+# Search result cache (same route/date/pax/cabin → reuse upstream response)
+FLIGHT_CACHE_TTL = int(os.getenv("FLIGHT_CACHE_TTL", 300))              # seconds a result is fresh
+FLIGHT_CACHE_STALE_TTL = int(os.getenv("FLIGHT_CACHE_STALE_TTL", 600))  # extra seconds served stale while refreshing
+FLIGHT_CACHE_SIZE = int(os.getenv("FLIGHT_CACHE_SIZE", 512))
+FLIGHT_CACHE_NEGATIVE_TTL = int(os.getenv("FLIGHT_CACHE_NEGATIVE_TTL", 30))  # error / no-flights replies
+
+# Stream + summarize SkyExperts bodies incrementally instead of response.json()
+FLIGHT_STREAMING = os.getenv("FLIGHT_STREAMING", "0") == "1"
+
+# Rankings returned by search_flights (k per category, see flight_select.DEFAULT_K)
+SEARCH_K = {"cheapest": 3, "fastest": 3, "direct": 3, "fewest_stops": 3, "pareto": 5}
+SUMMARY_PAIR_K = {"cheapest": 5, "fastest": 1, "direct": 3, "fewest_stops": 0, "pareto": 5}
+SUMMARY_OUTBOUND_K = {"cheapest": 5, "fastest": 0, "direct": 0, "fewest_stops": 0, "pareto": 5}
+
+def is_negative_result(value):
+    """
+    True for cached search results that hold no flights: error dicts, SkyExperts bodies
+    without Data, empty summaries. Non-200 replies raise instead and are never cached.
+    """
+    if not isinstance(value, dict) or value.get("error"):
+        return True
+    if "all_flights" in value:                      # search_and_summarize summary
+        return not value["all_flights"]
+    if "cheapest" in value and "currency" in value:  # search_flights rankings
+        return not value["cheapest"]
+    return not (value.get("Data") or (value.get("data") or {}).get("Data"))  # raw body
+
+search_cache = TTLCache(
+    maxsize=FLIGHT_CACHE_SIZE,
+    ttl=FLIGHT_CACHE_TTL,
+    stale_ttl=FLIGHT_CACHE_STALE_TTL,
+    negative_ttl=FLIGHT_CACHE_NEGATIVE_TTL,
+    is_negative=is_negative_result,
+    name="flight_search_cache"
+)
+
+# Identical searches already in flight (cache misses at the same moment) share one POST
+skyexperts_flight = SingleFlight("skyexperts")
 
 # UAE city → airport code mapping
 city_to_airport = {
@@ -40,8 +88,158 @@ def fmt_price(price, currency="GBP"):
     except Exception:
         return f"{price} {currency}"
 
-def search_flights(dep_from, destination, dep_date):
-    payload = {
+class FlightRecord:
+    """
+    Compact view of one raw SkyExperts flight, built once per upstream flight.
+    Numbers stay numeric (price, minutes, stops); strings are only produced by fmt().
+    """
+    __slots__ = ("airline_code", "airline_name", "price", "currency", "minutes", "duration_minutes",
+                 "dep_time", "arr_time", "stops", "via_city", "raw")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.airline_code = raw.get("Airlinelists", ["?"])[0] if raw.get("Airlinelists") else "?"
+        self.airline_name = self.airline_code
+        self.price = get_price_val(raw)
+        self.currency = raw.get("price", {}).get("currency")
+        self.dep_time, self.arr_time = "??:??", "??:??"
+        self.stops, self.via_city = None, None
+        try:
+            self.minutes = float(raw.get("totaltime") or float("inf"))   # sort key
+        except (TypeError, ValueError):
+            self.minutes = float("inf")
+        try:
+            self.duration_minutes = int(raw.get("totaltime", 0))          # display value
+        except (TypeError, ValueError):
+            self.duration_minutes = None
+
+        try:
+            legs = raw["OutboundInboundlist"][0]["flightlist"]
+            self.stops = len(legs) - 1
+            self.airline_name = legs[0].get("OperatingAirline", {}).get("name", self.airline_code)
+            self.dep_time = legs[0]["Departure"].get("time", self.dep_time)
+            self.arr_time = legs[-1]["Arrival"].get("time", self.arr_time)
+            if self.stops == 1:
+                self.via_city = legs[0]["Arrival"].get("city")
+        except Exception:
+            pass
+
+    @property
+    def is_direct(self):
+        return self.stops == 0
+
+def search_cache_key(payload):
+    """Normalized cache key for a search payload (ignores the random `sc`)."""
+    normalized = {k: v for k, v in payload.items() if k != "sc"}
+    normalized["cabin"] = str(normalized.get("cabin") or "economy").lower()
+    normalized["airline_include"] = (normalized.get("airline_include") or "").upper()
+    normalized["segments"] = [
+        {
+            "depfrom": str(seg.get("depfrom", "")).upper(),
+            "arrto": str(seg.get("arrto", "")).upper(),
+            "depdate": seg.get("depdate")
+        }
+        for seg in payload.get("segments", [])
+    ]
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+def post_searchflight(payload, timeout=None):
+    """
+    POST to SkyExperts searchflight over the pooled keep-alive client.
+    Timeouts, connection errors, 429 and 5xx are retried while the request deadline allows.
+    Then raises requests.HTTPError on non-200, requests.Timeout on a hung upstream,
+    UpstreamBusy when no skyexperts_limit slot is free in time and DeadlineExceeded.
+    """
+    headers = {"Content-Type": "application/json"}
+
+    def attempt():
+        with skyexperts_limit.slot():
+            response = http_client.post(FLIGHT_API_URL, json=payload, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    return call_with_retries(attempt)
+
+def stream_searchflight(payload, timeout=None, meta=None):
+    """
+    Streaming variant of post_searchflight: yields flights one by one as the
+    body arrives (see skyexperts_stream). `meta` collects Currency etc.
+    """
+    headers = {"Content-Type": "application/json"}
+
+    def connect():
+        """Retried until the body starts; a stream broken half way is not."""
+        response = http_client.post(FLIGHT_API_URL, json=payload, headers=headers, timeout=timeout, stream=True)
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+        return response
+
+    with skyexperts_limit.slot():  # held while the body streams in
+        with call_with_retries(connect) as response:
+            yield from skyexperts_stream.iter_flights(skyexperts_stream.iter_response_text(response), meta)
+
+def cached_searchflight(payload, timeout=None):
+    """
+    SkyExperts search through the TTL cache (fresh sc on every real upstream call).
+    Concurrent misses for the same search wait on one POST instead of sending their own.
+    """
+    key = search_cache_key(payload)
+
+    def loader():
+        return skyexperts_flight.do(key, lambda: post_searchflight({**payload, "sc": generate_sc()}, timeout=timeout))
+    return search_cache.get_or_load(key, loader)
+
+async def apost_searchflight(payload, timeout=None):
+    """post_searchflight on the async client (raises httpx.HTTPStatusError on non-200)."""
+    headers = {"Content-Type": "application/json"}
+
+    async def attempt():
+        async with skyexperts_limit.aslot():
+            response = await http_client.apost(FLIGHT_API_URL, json=payload, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    return await acall_with_retries(attempt)
+
+async def cached_searchflight_async(payload, timeout=None):
+    """
+    cached_searchflight for the async path: same cache and keys. A stale entry is served
+    as is (no background refresh); misses load inline.
+    """
+    key = search_cache_key(payload)
+    data = search_cache.get(key)
+    if data is None:
+        data = await skyexperts_flight.do_async(
+            key, lambda: apost_searchflight({**payload, "sc": generate_sc()}, timeout=timeout)
+        )
+        search_cache.set(key, data)
+    return data
+
+def select_flights(flights, fallback_currency=None):
+    """One pass over raw flights → all search_flights rankings (FlightRecords) + currency."""
+    selector = FlightSelector(SEARCH_K)
+    for f in flights:
+        record = FlightRecord(f)
+        selector.add(record, record.price, record.minutes, record.stops)
+
+    rankings = selector.results()
+    cheapest_list = rankings.get("cheapest")
+    currency = (cheapest_list[0].currency if cheapest_list else None) or fallback_currency or "AED"
+    return selector.count, {**rankings, "currency": currency}
+
+def _search_flights_stream(payload):
+    """Single pass over the streamed body keeping only the top-k per ranking."""
+    meta = {}
+    seen, results = select_flights(stream_searchflight(payload, meta=meta))
+    if not seen:
+        return {"error": "No flights found", "raw": meta}
+    if not results["cheapest"] or not results["cheapest"][0].currency:
+        results["currency"] = meta.get("Currency") or "AED"
+    return results
+
+def _one_way_payload(dep_from, destination, dep_date):
+    return {
         "adults": 1,
         "children": 0,
         "infants": 0,
@@ -55,92 +253,93 @@ def search_flights(dep_from, destination, dep_date):
         ]
     }
 
-    try:
-        response = requests.post(FLIGHT_API_URL, json=payload, timeout=20)
-        if response.status_code != 200:
-            return {"error": f"API call failed: {response.status_code}", "details": response.text}
-
-        data = response.json()
-
-        # ✅ Always check both
-        flights = data.get("Data") or data.get("data", {}).get("Data", [])
-        if not flights:
-            return {"error": "No flights found", "raw": data}
-
-        # Top 3 cheapest
-        cheapest_list = sorted(flights, key=get_price_val)[:3]
-
-        # Top 3 fastest
-        fastest_list = sorted(
-            flights,
-            key=lambda x: float(x.get("totaltime") or float("inf"))
-        )[:3]
-
-        # Direct flights
-        direct = []
-        for f in flights:
-            try:
-                if len(f["OutboundInboundlist"][0]["flightlist"]) == 1:
-                    direct.append(f)
-            except:
-                pass
-        direct = direct[:3]
-
-        # Currency
-        currency = (
-            cheapest_list[0].get("price", {}).get("currency") if cheapest_list else None
-        ) or data.get("Currency") or "AED"
+def _http_error(e):
+    """Error dict for a non-200 upstream reply (requests or httpx), else None."""
+    response = getattr(e, "response", None)
+    if response is None:
+        return None
+    return {"error": f"API call failed: {response.status_code}", "details": response.text}
 
-        return {
-            "cheapest": cheapest_list,
-            "fastest": fastest_list,
-            "direct": direct,
-            "currency": currency
-        }
+def _rank_flights(data):
+    # ✅ Always check both
+    flights = data.get("Data") or data.get("data", {}).get("Data", [])
+    if not flights:
+        return {"error": "No flights found", "raw": data}
+
+    # All rankings in a single pass (bounded heaps, see flight_select)
+    _, results = select_flights(flights, fallback_currency=data.get("Currency"))
+    return results
+
+def search_flights(dep_from, destination, dep_date, stream=None):
+    """
+    One-way SkyExperts search → cheapest / fastest / direct / fewest_stops / pareto
+    lists of FlightRecords (format them with fmt()) plus currency.
+    """
+    payload = _one_way_payload(dep_from, destination, dep_date)
+
+    if stream is None:
+        stream = FLIGHT_STREAMING
 
+    try:
+        try:
+            if stream:
+                # Only the reduced top-3 result is cached in streaming mode
+                key = "flights:" + search_cache_key(payload)
+                return search_cache.get_or_load(key, lambda: skyexperts_flight.do(
+                    key, lambda: _search_flights_stream({**payload, "sc": generate_sc()})
+                ))
+            data = cached_searchflight(payload)
+        except requests.HTTPError as e:
+            return _http_error(e)
+        return _rank_flights(data)
+
+    except (UpstreamBusy, DeadlineExceeded):
+        raise  # /query answers 503 with a retry hint / 504
     except Exception as e:
         return {"error": str(e)}
 
+async def search_flights_async(dep_from, destination, dep_date):
+    """search_flights on the async client (always the buffered, non-streaming path)."""
+    try:
+        data = await cached_searchflight_async(_one_way_payload(dep_from, destination, dep_date))
+    except (UpstreamBusy, DeadlineExceeded):
+        raise
+    except Exception as e:
+        return _http_error(e) or {"error": str(e)}
+    return _rank_flights(data)
 
-from itinerary import extract_start_date
+
+from itinerary import extract_start_date, extract_start_date_async
   # 👈 tumhara LLM date parser
 
-def ask_and_show_flights(parsed, dep_from=None, raw_date=None):
-    """
-    API-friendly version: returns structured JSON.
-    Uses LLM-based extract_start_date() for all date parsing.
-    """
+def _clean_date_text(raw_date):
+    cleaned = raw_date.strip().lower()
+    # 👇 common prefixes remove
+    for prefix in ["on ", "for ", "starting ", "from "]:
+        if cleaned.startswith(prefix):
+            cleaned = cleaned[len(prefix):]
+    return cleaned
 
+def _flight_request(parsed, dep_from, raw_date, start_date):
+    """Validate inputs → (error dict, None) or (None, (dep_code, destination_code, start_date))."""
     destination_city = parsed.get("cities", [None])[0]
-    start_date = parsed.get("start_date")  # ✅ fallback from itinerary
-
-    # Priority: user date > itinerary date
-    if raw_date:
-        cleaned = raw_date.strip().lower()
-        # 👇 common prefixes remove
-        for prefix in ["on ", "for ", "starting ", "from "]:
-            if cleaned.startswith(prefix):
-                cleaned = cleaned[len(prefix):]
-        parsed_date = extract_start_date(cleaned)  # 👈 Always LLM parser
-        if parsed_date:
-            start_date = parsed_date
 
     # -------- Validations --------
     if not dep_from:
-        return {"error": "⚠️ Missing departure city/airport code."}
+        return {"error": "⚠️ Missing departure city/airport code."}, None
     if not destination_city:
-        return {"error": "⚠️ Missing destination city from itinerary."}
+        return {"error": "⚠️ Missing destination city from itinerary."}, None
     if not start_date:
         # Friendly error, not technical
         return {
             "error": f"⚠️ Sorry, I couldn’t understand the date '{raw_date}'. "
                      f"Please try again with a clear date (e.g., '15 Sep 2025')."
-        }
+        }, None
 
     destination_code = city_to_airport.get(destination_city, destination_city[:3].upper())
+    return None, (dep_from.upper(), destination_code, start_date)
 
-    # -------- Search Flights --------
-    results = search_flights(dep_from.upper(), destination_code, start_date)
+def _show_flights(dep_code, destination_code, start_date, results):
     if "error" in results:
         return {"error": results["error"]}
 
@@ -150,247 +349,299 @@ def ask_and_show_flights(parsed, dep_from=None, raw_date=None):
         return [fmt(f, currency) for f in flights]
 
     return {
-        "search": f"{dep_from.upper()} → {destination_code} on {start_date}",
+        "search": f"{dep_code} → {destination_code} on {start_date}",
         "cheapest": format_list(results.get("cheapest", [])),
         "fastest": format_list(results.get("fastest", [])),
         "direct": format_list(results.get("direct", [])),
+        "fewest_stops": format_list(results.get("fewest_stops", [])),
+        "pareto": format_list(results.get("pareto", [])),
         "currency": currency
     }
 
+def ask_and_show_flights(parsed, dep_from=None, raw_date=None):
+    """
+    API-friendly version: returns structured JSON.
+    Uses extract_start_date() (local patterns first, LLM fallback) for date parsing.
+    """
+    start_date = parsed.get("start_date")  # ✅ fallback from itinerary
 
+    # Priority: user date > itinerary date
+    if raw_date:
+        parsed_date = extract_start_date(_clean_date_text(raw_date))  # 👈 local fast path, LLM only if needed
+        if parsed_date:
+            start_date = parsed_date
 
+    error, request = _flight_request(parsed, dep_from, raw_date, start_date)
+    if error:
+        return error
 
+    # -------- Search Flights --------
+    return _show_flights(*request, search_flights(*request))
 
-def fmt(flight, currency="AED"):
-    if not isinstance(flight, dict) or not flight:
-        return "⚠️ No flight data"
+async def ask_and_show_flights_async(parsed, dep_from=None, raw_date=None):
+    """ask_and_show_flights with the date LLM and SkyExperts calls on the async clients."""
+    start_date = parsed.get("start_date")
+    if raw_date:
+        parsed_date = await extract_start_date_async(_clean_date_text(raw_date))
+        if parsed_date:
+            start_date = parsed_date
 
-    try:
-        # Airline
-        airline_code = flight.get("Airlinelists", ["?"])[0] if flight.get("Airlinelists") else "?"
-        airline_name = airline_code
-        try:
-            airline_name = flight["OutboundInboundlist"][0]["flightlist"][0].get("OperatingAirline", {}).get("name", airline_code)
-        except Exception:
-            pass
+    error, request = _flight_request(parsed, dep_from, raw_date, start_date)
+    if error:
+        return error
+    return _show_flights(*request, await search_flights_async(*request))
 
-        # Departure and arrival times
-        dep_time, arr_time = "??:??", "??:??"
-        try:
-            first_leg = flight["OutboundInboundlist"][0]["flightlist"][0]
-            last_leg = flight["OutboundInboundlist"][0]["flightlist"][-1]
-            dep_time = first_leg["Departure"].get("time", dep_time)
-            arr_time = last_leg["Arrival"].get("time", arr_time)
-        except Exception:
-            pass
 
-        # Stops
-        stops = 0
-        via_city = None
-        try:
-            legs = flight["OutboundInboundlist"][0]["flightlist"]
-            stops = len(legs) - 1
-            if stops == 1:
-                via_city = legs[0]["Arrival"].get("city")
-        except Exception:
-            pass
 
+
+
+def fmt(flight, currency="AED"):
+    """Render a FlightRecord (or a raw SkyExperts flight dict) as one display line."""
+    if isinstance(flight, dict):
+        if not flight:
+            return "⚠️ No flight data"
+        flight = FlightRecord(flight)
+    if not isinstance(flight, FlightRecord):
+        return "⚠️ No flight data"
+
+    try:
+        stops = flight.stops or 0
         if stops == 0:
             stop_text = "Direct"
         elif stops == 1:
-            stop_text = f"1 stop via {via_city}"
+            stop_text = f"1 stop via {flight.via_city}"
         else:
             stop_text = f"{stops} stops"
 
-        # Duration
         duration = "?"
-        try:
-            duration_minutes = int(flight.get("totaltime", 0))
-            h, m = divmod(duration_minutes, 60)
+        if flight.duration_minutes is not None:
+            h, m = divmod(flight.duration_minutes, 60)
             duration = f"{h}h {m}m"
-        except Exception:
-            pass
 
-        # Price
-        price = (
-            flight.get("price", {}).get("total_price")
-            or flight.get("price", {}).get("totalprice")
-            or "N/A"
-        )
-        price = fmt_price(price, currency)
+        price = fmt_price(flight.price if flight.price != float("inf") else "N/A", currency)
 
-        return f"{airline_name} ({airline_code}) | {dep_time} → {arr_time} | {stop_text} | Duration: {duration} | Price: {price}"
+        return (
+            f"{flight.airline_name} ({flight.airline_code}) | {flight.dep_time} → {flight.arr_time} | "
+            f"{stop_text} | Duration: {duration} | Price: {price}"
+        )
 
     except Exception as e:
         return f"⚠️ Could not parse flight: {e}"
-    
-    
+
+
 import requests
 from collections import OrderedDict
 
 def search_flights_skyexperts(payload):
-    url = "https://www.skyexperts.co.uk/api/FlightApi/searchflight"
-    headers = {"Content-Type": "application/json"}
-    response = requests.post(url, json=payload, headers=headers)
-    return response.json()
+    return cached_searchflight(payload)
 
-def summarize_skyexperts(api_data):
+async def search_flights_skyexperts_async(payload):
+    return await cached_searchflight_async(payload)
+
+class Leg:
     """
-    Summarizes SkyExperts API results.
-    - If return flights exist → build round-trip pairs (top 5 + cheapest, fastest, direct 3).
-    - If return flights absent → summarize outbound only (top 5 + cheapest, fastest, direct 3).
+    One outbound/return leg of a SkyExperts flight, parsed once.
+    Holds numeric price/minutes/stops; to_dict() renders the display dict at the output edge.
     """
-    data_root = api_data.get("data", {})
-    flights_data = data_root.get("Data", [])
-    currency_sign = data_root.get("Currency_sign", "£")
-
-    if not flights_data:
-        return {"all_flights": [], "cheapest": None, "fastest": None, "direct": [], "price_summary": {}}
+    __slots__ = ("airline", "airline_name", "price", "minutes", "stops", "stops_detail",
+                 "dep_code", "dep_city", "dep_date", "dep_time",
+                 "arr_code", "arr_city", "arr_date", "arr_time")
 
-    # --- Helper for parsing one segment ---
-    def parse_segment(f, segment_index=0):
+    @classmethod
+    def parse(cls, f, segment_index=0):
+        """Build a Leg from a raw flight, or None if that leg is missing/broken."""
         try:
-            airline_code = f.get("Airlinelists", ["Unknown"])[0]
-            price = float(f.get("price", {}).get("total_price", 0))
-            segments = (
-                f.get("OutboundInboundlist", [])[segment_index].get("flightlist", [])
-                if len(f.get("OutboundInboundlist", [])) > segment_index
-                else []
-            )
+            bounds = f.get("OutboundInboundlist", [])
+            segments = bounds[segment_index].get("flightlist", []) if len(bounds) > segment_index else []
             if not segments:
                 return None
 
-            duration_minutes = int(
-                f.get("OutboundInboundlist", [])[segment_index].get("totaltime", 0)
-            )
-            hours, mins = divmod(duration_minutes, 60)
-            duration_str = f"{hours}h {mins}m"
+            leg = cls()
+            leg.airline = f.get("Airlinelists", ["Unknown"])[0]
+            leg.price = float(f.get("price", {}).get("total_price", 0))
+            leg.minutes = int(bounds[segment_index].get("totaltime", 0))
 
             first_seg, last_seg = segments[0], segments[-1]
 
-            dep_code = first_seg["Departure"].get("Iata", "")
-            dep_city = first_seg["Departure"].get("city", "")
-            dep_date = first_seg["Departure"].get("Date", "")
-            dep_time = first_seg["Departure"].get("time", "")
+            leg.dep_code = first_seg["Departure"].get("Iata", "")
+            leg.dep_city = first_seg["Departure"].get("city", "")
+            leg.dep_date = first_seg["Departure"].get("Date", "")
+            leg.dep_time = first_seg["Departure"].get("time", "")
 
-            arr_code = last_seg["Arrival"].get("Iata", "")
-            arr_city = last_seg["Arrival"].get("city", "")
-            arr_date = last_seg["Arrival"].get("Date", "")
-            arr_time = last_seg["Arrival"].get("time", "")
+            leg.arr_code = last_seg["Arrival"].get("Iata", "")
+            leg.arr_city = last_seg["Arrival"].get("city", "")
+            leg.arr_date = last_seg["Arrival"].get("Date", "")
+            leg.arr_time = last_seg["Arrival"].get("time", "")
 
-            if arr_code == "XNB":
-                arr_city = f"{arr_city} (via Abu Dhabi Bus Transfer)"
+            if leg.arr_code == "XNB":
+                leg.arr_city = f"{leg.arr_city} (via Abu Dhabi Bus Transfer)"
 
-            airline_name = first_seg.get("OperatingAirline", {}).get("name", airline_code)
+            leg.airline_name = first_seg.get("OperatingAirline", {}).get("name", leg.airline)
 
-            stops = max(len(segments) - 1, 0)
-            stops_detail = []
+            leg.stops = max(len(segments) - 1, 0)
+            leg.stops_detail = []
             for seg in segments[:-1]:
                 stop_code = seg["Arrival"].get("Iata", "")
                 stop_city = seg["Arrival"].get("city", "")
-                stop_date = seg["Arrival"].get("Date", "")
-                stop_time = seg["Arrival"].get("time", "")
                 if stop_code == "XNB":
                     stop_city = f"{stop_city} (Bus Transfer)"
-                stops_detail.append(
-                    {"code": stop_code, "city": stop_city, "date": stop_date, "time": stop_time}
+                leg.stops_detail.append(
+                    (stop_code, stop_city, seg["Arrival"].get("Date", ""), seg["Arrival"].get("time", ""))
                 )
-
-            return {
-                "airline": airline_code,
-                "airline_name": airline_name,
-                "price": f"{currency_sign}{price:.2f}",
-                "duration": duration_str,
-                "stops": stops,
-                "stops_detail": stops_detail,
-                "dep_code": dep_code,
-                "dep_city": dep_city,
-                "dep_date": dep_date,
-                "dep_time": dep_time,
-                "arr_code": arr_code,
-                "arr_city": arr_city,
-                "arr_date": arr_date,
-                "arr_time": arr_time,
-            }
+            return leg
         except Exception as e:
             print("Error parsing segment:", e)
             return None
 
-    # --- Try to build round-trip pairs ---
-    pairs = []
-    for f in flights_data:
-        if not f.get("OutboundInboundlist"):
-            continue
-        outbound_seg = parse_segment(f, 0)
-        return_seg = parse_segment(f, 1) if len(f.get("OutboundInboundlist", [])) > 1 else None
-        if outbound_seg and return_seg:
-            pairs.append({"outbound": outbound_seg, "return": return_seg})
-
-    # --- If pairs exist → round-trip mode ---
-    if pairs:
-        def duration_to_minutes(dur):
-            try:
-                h, m = dur.replace("m", "").split("h")
-                return int(h.strip())*60 + int(m.strip())
-            except:
-                return 99999
-
-        cheapest = min(pairs, key=lambda x: float(x["outbound"]["price"].replace(currency_sign, "")))
-        fastest = min(
-            pairs,
-            key=lambda x: duration_to_minutes(x["outbound"]["duration"]) +
-                          duration_to_minutes(x["return"]["duration"])
-        )
-        direct = [p for p in pairs if p["outbound"]["stops"] == 0 and p["return"]["stops"] == 0][:3]
-        top5 = sorted(pairs, key=lambda x: float(x["outbound"]["price"].replace(currency_sign, "")))[:5]
+    @property
+    def duration(self):
+        hours, mins = divmod(self.minutes, 60)
+        return f"{hours}h {mins}m"
+
+    def to_dict(self, currency_sign="£"):
+        return {
+            "airline": self.airline,
+            "airline_name": self.airline_name,
+            "price": f"{currency_sign}{self.price:.2f}",
+            "duration": self.duration,
+            "stops": self.stops,
+            "stops_detail": [
+                {"code": code, "city": city, "date": date, "time": time}
+                for code, city, date, time in self.stops_detail
+            ],
+            "dep_code": self.dep_code,
+            "dep_city": self.dep_city,
+            "dep_date": self.dep_date,
+            "dep_time": self.dep_time,
+            "arr_code": self.arr_code,
+            "arr_city": self.arr_city,
+            "arr_date": self.arr_date,
+            "arr_time": self.arr_time,
+        }
+
+def parse_legs(f):
+    """(outbound, return) Legs for a raw flight; return is None for one-way/unparseable."""
+    bounds = f.get("OutboundInboundlist")
+    if not bounds:
+        return None, None
+    outbound = Leg.parse(f, 0)
+    inbound = Leg.parse(f, 1) if len(bounds) > 1 else None
+    return outbound, inbound
+
+def _pair_dict(pair, currency_sign):
+    return {"outbound": pair[0].to_dict(currency_sign), "return": pair[1].to_dict(currency_sign)}
+
+def _empty_summary():
+    return {"all_flights": [], "cheapest": None, "fastest": None, "direct": [], "price_summary": {}}
+
+def _outbound_summary(top5, currency_sign):
+    """Outbound-only mode: cheapest/fastest/direct/prices are taken from the top 5 by price."""
+    if not top5:
+        return _empty_summary()
+    prices = [leg.price for leg in top5]
+    return {
+        "all_flights": [leg.to_dict(currency_sign) for leg in top5],
+        "cheapest": min(top5, key=lambda leg: leg.price).to_dict(currency_sign),
+        "fastest": min(top5, key=lambda leg: leg.minutes).to_dict(currency_sign),
+        "direct": [leg.to_dict(currency_sign) for leg in top5 if leg.stops == 0][:3],
+        "price_summary": {
+            "min_price": min(prices),
+            "max_price": max(prices),
+            "currency": currency_sign
+        }
+    }
+
+def _summarize_flights(flights, meta_sign):
+    """
+    Shared single-pass core of summarize_skyexperts(_stream).
+    Round-trip pairs and outbound-only legs each feed a FlightSelector; only the
+    top-k per ranking is retained. `meta_sign()` is called at the end because a
+    streamed Currency_sign may only arrive after the Data array.
+    """
+    pair_selector = FlightSelector(SUMMARY_PAIR_K)
+    outbound_selector = FlightSelector(SUMMARY_OUTBOUND_K)
+
+    for f in flights:
+        outbound, inbound = parse_legs(f)
+        if outbound and inbound:
+            pair_selector.add(
+                (outbound, inbound),
+                outbound.price,
+                outbound.minutes + inbound.minutes,
+                outbound.stops + inbound.stops
+            )
+        elif outbound and not pair_selector.count:
+            # Outbound-only legs only matter while no round-trip pair has been seen
+            outbound_selector.add(outbound, outbound.price, outbound.minutes, outbound.stops)
+
+    currency_sign = meta_sign()
 
-        prices = [float(p["outbound"]["price"].replace(currency_sign, "")) for p in pairs]
+    # --- Round-trip mode ---
+    if pair_selector.count:
+        rankings = pair_selector.results()
         return {
-            "all_flights": top5,
-            "cheapest": cheapest,
-            "fastest": fastest,
-            "direct": direct,
+            "all_flights": [_pair_dict(p, currency_sign) for p in rankings["cheapest"]],
+            "cheapest": _pair_dict(rankings["cheapest"][0], currency_sign),
+            "fastest": _pair_dict(rankings["fastest"][0], currency_sign),
+            "direct": [_pair_dict(p, currency_sign) for p in rankings["direct"]],
+            "pareto": [_pair_dict(p, currency_sign) for p in rankings["pareto"]],
             "price_summary": {
-                "min_price": min(prices),
-                "max_price": max(prices),
+                "min_price": pair_selector.min_price,
+                "max_price": pair_selector.max_price,
                 "currency": currency_sign
             }
         }
 
-    # --- Else → outbound-only mode ---
-    outbound_only = [parse_segment(f, 0) for f in flights_data if f.get("OutboundInboundlist")]
-    outbound_only = [x for x in outbound_only if x]
-
-    if not outbound_only:
-        return {"all_flights": [], "cheapest": None, "fastest": None, "direct": [], "price_summary": {}}
+    # --- Outbound-only mode ---
+    rankings = outbound_selector.results()
+    summary = _outbound_summary(rankings["cheapest"], currency_sign)
+    if summary["all_flights"]:
+        summary["pareto"] = [leg.to_dict(currency_sign) for leg in rankings["pareto"]]
+    return summary
 
-    # Top 5 outbound
-    top5 = sorted(outbound_only, key=lambda x: float(x["price"].replace(currency_sign, "")))[:5]
+def summarize_skyexperts(api_data):
+    """
+    Summarizes SkyExperts API results.
+    - If return flights exist → build round-trip pairs (top 5 + cheapest, fastest, direct 3).
+    - If return flights absent → summarize outbound only (top 5 + cheapest, fastest, direct 3).
+    Both modes also return the price/duration Pareto frontier as "pareto".
+    """
+    data_root = api_data.get("data", {})
+    flights_data = data_root.get("Data", [])
 
-    def duration_to_minutes(dur):
-        try:
-            h, m = dur.replace("m", "").split("h")
-            return int(h.strip())*60 + int(m.strip())
-        except:
-            return 99999
+    if not flights_data:
+        return _empty_summary()
 
-    cheapest = min(top5, key=lambda x: float(x["price"].replace(currency_sign, "")))
-    fastest = min(top5, key=lambda x: duration_to_minutes(x["duration"]))
-    direct = [f for f in top5 if f["stops"] == 0][:3]
+    return _summarize_flights(flights_data, lambda: data_root.get("Currency_sign", "£"))
 
-    prices = [float(f["price"].replace(currency_sign, "")) for f in top5]
+def summarize_skyexperts_stream(flights, meta):
+    """
+    Same output as summarize_skyexperts, but consumes flights one at a time
+    (e.g. from stream_searchflight), so memory is bounded by k, not by result count.
+    """
+    return _summarize_flights(flights, lambda: meta.get("data", {}).get("Currency_sign", "£"))
 
-    return {
-        "all_flights": top5,
-        "cheapest": cheapest,
-        "fastest": fastest,
-        "direct": direct,
-        "price_summary": {
-            "min_price": min(prices),
-            "max_price": max(prices),
-            "currency": currency_sign
-        }
-    }
+def search_and_summarize(payload, stream=None):
+    """
+    SkyExperts search + summary. In streaming mode the body is parsed
+    incrementally and only the (small) summary is cached.
+    """
+    if stream is None:
+        stream = FLIGHT_STREAMING
+    if not stream:
+        return summarize_skyexperts(search_flights_skyexperts(payload))
+
+    def summarize():
+        meta = {}
+        flights = stream_searchflight({**payload, "sc": generate_sc()}, meta=meta)
+        return summarize_skyexperts_stream(flights, meta)
+
+    key = "summary:" + search_cache_key(payload)
+    return search_cache.get_or_load(key, lambda: skyexperts_flight.do(key, summarize))
+
+async def search_and_summarize_async(payload):
+    """search_and_summarize on the async client (buffered body, FLIGHT_STREAMING not applied)."""
+    return summarize_skyexperts(await search_flights_skyexperts_async(payload))
 
 from collections import OrderedDict
 
@@ -0,0 +1,55 @@
+"""
+gunicorn settings (picked up automatically by `gunicorn app:app`).
+
+Preload mode (default): the master imports the app once, so the catalog snapshot is
+mapped before forking and workers read the same read-only pages. gc.freeze() moves
+everything loaded so far out of the collector's reach, so GC passes in the workers
+don't write to (and un-share) the preloaded objects. Without preload, each worker
+maps the same snapshot file and still shares its pages through the page cache.
+"""
+import gc
+import os
+import shlex
+import sys
+
+from catalog_snapshot import ensure_snapshot
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", 4))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+
+def effective_workers():
+    """Worker count gunicorn will run: -w / --workers (GUNICORN_CMD_ARGS, then the command line) win over this file."""
+    from gunicorn.config import Config
+
+    parser = Config().parser()
+    count = workers
+    for args in (shlex.split(os.getenv("GUNICORN_CMD_ARGS", "")), sys.argv[1:]):
+        given = getattr(parser.parse_known_args(args)[0], "workers", None)
+        if given is not None:
+            count = given
+    return count
+
+
+# ✅ Multiple workers → sessions SQLite me, taaki follow-up kisi bhi worker pe jaye state mile
+# (app import se pehle decide karna hai: preload me master hi store bana leta hai)
+if effective_workers() > 1:
+    os.environ.setdefault("SESSION_BACKEND", "sqlite")
+
+# ✅ Snapshot pehle bana lo (missing/stale ho to) → app import, preload ho ya na ho, mmap hi karega
+ensure_snapshot()
+
+
+def on_starting(server):
+    sessions = getattr(sys.modules.get("session_store"), "sessions", None)
+    if server.cfg.workers > 1 and sessions is not None and sessions.backend == "memory":
+        server.log.warning("%d workers with per-process memory sessions: follow-ups can lose their state, "
+                           "set SESSION_BACKEND=sqlite", server.cfg.workers)
+
+
+def when_ready(server):
+    if preload_app:
+        from llm_client import preload
+        preload()
+        gc.freeze()
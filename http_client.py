@@ -0,0 +1,86 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from deadline import limit_timeout
+from upstream_limits import skyexperts_limit
+
+# Upstream HTTP settings (override via env)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 20))
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 4))   # distinct hosts kept
+# keep-alive sockets per host, never fewer than the SkyExperts calls skyexperts_limit lets run at once
+HTTP_POOL_MAXSIZE = max(int(os.getenv("HTTP_POOL_MAXSIZE", 10)), skyexperts_limit.max_in_flight)
+HTTP_ASYNC_KEEPALIVE = int(os.getenv("HTTP_ASYNC_KEEPALIVE", 100))   # idle sockets kept by the async client
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+_session = None
+_session_pid = None
+_async_client = None
+_async_client_pid = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Shared keep-alive requests.Session for this worker process.
+    Rebuilt after fork so gunicorn workers never share sockets with the master.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    # capped in-flight calls always find a free socket; without a cap, open extras
+                    # rather than wait for one (requests gives urllib3 no pool timeout)
+                    pool_block=skyexperts_limit.max_in_flight > 0
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session, _session_pid = session, pid
+    return _session
+
+
+def post(url, timeout=None, **kwargs):
+    """
+    POST through the pooled session with (connect, read) timeouts always set, each capped
+    by the time left on the current request deadline (see deadline.py).
+    """
+    return get_session().post(url, timeout=limit_timeout(timeout or DEFAULT_TIMEOUT), **kwargs)
+
+
+def get_async_client():
+    """
+    Shared httpx.AsyncClient for the asyncio serving mode (async_app), same timeouts.
+    Its pool is not capped per host like the sync one: a single event loop is meant to
+    hold many concurrent upstream waits.
+    """
+    global _async_client, _async_client_pid
+    pid = os.getpid()
+    if _async_client is None or _async_client_pid != pid:
+        with _lock:
+            if _async_client is None or _async_client_pid != pid:
+                import httpx
+
+                _async_client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+                    limits=httpx.Limits(max_connections=None, max_keepalive_connections=HTTP_ASYNC_KEEPALIVE),
+                )
+                _async_client_pid = pid
+    return _async_client
+
+
+async def apost(url, timeout=None, **kwargs):
+    """Async POST through the shared client; `timeout` as in post() ((connect, read) or seconds)."""
+    import httpx
+
+    timeout = limit_timeout(timeout or DEFAULT_TIMEOUT)
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    kwargs["timeout"] = httpx.Timeout(read, connect=connect)
+    return await get_async_client().post(url, **kwargs)
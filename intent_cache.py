@@ -0,0 +1,188 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from cache_utils import TTLCache
+from date_engine import find_date_phrase
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, keep the file to one worker there
+    fcntl = None
+
+INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", 2048))
+INTENT_CACHE_TTL = int(os.getenv("INTENT_CACHE_TTL", 30 * 24 * 3600))
+INTENT_CACHE_FILE = os.getenv("INTENT_CACHE_FILE")  # optional JSONL file, survives restarts
+
+# Values the LLM fills in on its own; a slot that happens to equal one of these is ambiguous
+FIELD_DEFAULTS = {"adults": "1", "children": "0", "infants": "0"}
+
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_SLOT_RE = re.compile(r"^\{\{([dn]\d+)\}\}$")
+_MAX_DATE_SLOTS = 3
+
+
+def template_query(query):
+    """
+    Normalize a flight query into a cache key plus the slot values taken out of it.
+    "Flights DEL to DXB on 15 Sep for 2 adults" →
+        ("flights del to dxb on {{d0}} for {{n0}} adults", {"d0": "15 sep", "n0": "2"})
+    """
+    text = " ".join(query.casefold().split()).strip(" ?!.")
+    slots = {}
+
+    for i in range(_MAX_DATE_SLOTS):
+        phrase = find_date_phrase(text)
+        if not phrase:
+            break
+        slots[f"d{i}"] = phrase
+        text = text.replace(phrase, f"{{{{d{i}}}}}", 1)
+
+    def number_slot(match):
+        name = f"n{sum(1 for k in slots if k[0] == 'n')}"
+        slots[name] = match.group(0)
+        return f"{{{{{name}}}}}"
+
+    text = _NUMBER_RE.sub(number_slot, text)
+    return text, slots
+
+
+def templatize(parsed, slots):
+    """
+    Replace parsed values that came from a slot with "{{slot}}" markers.
+    Returns None when the mapping is ambiguous or incomplete (then the result is not cacheable).
+    """
+    templated, used = {}, set()
+    for field, value in parsed.items():
+        if value is None or isinstance(value, (dict, list)):
+            templated[field] = value
+            continue
+        text = str(value).strip().casefold()
+        matches = [name for name, slot_value in slots.items() if slot_value == text]
+        if len(matches) > 1 or (matches and FIELD_DEFAULTS.get(field) == text):
+            return None
+        if matches:
+            templated[field] = f"{{{{{matches[0]}}}}}"
+            used.add(matches[0])
+        else:
+            templated[field] = value
+    if used != set(slots):
+        return None  # a date/number in the query didn't map to any field → can't reuse safely
+    return templated
+
+
+def fill(templated, slots):
+    filled = {}
+    for field, value in templated.items():
+        match = _SLOT_RE.match(value) if isinstance(value, str) else None
+        filled[field] = slots.get(match.group(1)) if match else value
+    return filled
+
+
+class IntentCache:
+    """LRU cache of LLM-parsed flight intents keyed on templated queries, optionally backed by a JSONL file."""
+
+    def __init__(self, maxsize=INTENT_CACHE_SIZE, ttl=INTENT_CACHE_TTL, path=INTENT_CACHE_FILE):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl, name="intent_cache")
+        self.path = path
+        self._file_lock = threading.Lock()
+        self._lines = 0
+        self.uncacheable = 0
+        if path:
+            self._load()
+
+    def lookup(self, query):
+        """Returns (parsed dict or None, key, slots)."""
+        key, slots = template_query(query)
+        templated = self.cache.get(key)
+        if templated is None:
+            return None, key, slots
+        return fill(templated, slots), key, slots
+
+    def store(self, key, slots, parsed):
+        templated = templatize(parsed, slots)
+        if templated is None:
+            self.uncacheable += 1
+            return
+        self.cache.set(key, templated)
+        if self.path:
+            self._append(key, templated)
+
+    def stats(self):
+        return {**self.cache.stats(), "uncacheable": self.uncacheable, "persisted": bool(self.path)}
+
+    # --- persistence ---
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                        self.cache.set(entry["key"], entry["value"])
+                        self._lines += 1
+                    except (ValueError, KeyError):
+                        continue  # half-written line from a crash
+        except OSError as e:
+            print("intent_cache: could not load", self.path, e)
+
+    @contextmanager
+    def _locked(self):
+        """One writer at a time: this worker's threads, and (with fcntl) every worker sharing the file."""
+        with self._file_lock:
+            if fcntl is None:
+                yield
+                return
+            # separate lock file: the JSONL itself gets replaced by _compact
+            with open(f"{self.path}.lock", "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _append(self, key, templated):
+        line = json.dumps({"key": key, "value": templated}, ensure_ascii=False) + "\n"
+        try:
+            with self._locked():
+                with open(self.path, "a", encoding="utf-8") as fh:
+                    fh.write(line)
+                self._lines += 1
+                if self._lines > 2 * self.cache.maxsize:
+                    self._compact()
+        except OSError as e:
+            print("intent_cache: could not persist", e)
+
+    def _compact(self):
+        """
+        Rewrite the file with the newest entry per key, at most maxsize of them (atomic replace).
+        Built from the file, not this worker's LRU: the other workers append to it too.
+        """
+        latest = {}
+        with open(self.path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                    latest.pop(entry["key"], None)  # re-insert → newest last
+                    latest[entry["key"]] = entry["value"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+        entries = list(latest.items())[-self.cache.maxsize:]
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                for k, v in entries:
+                    fh.write(json.dumps({"key": k, "value": v}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._lines = len(entries)
+
+
+intent_cache = IntentCache()
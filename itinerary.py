@@ -1,48 +1,14 @@
 import re
-import pandas as pd
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
+import math
 from datetime import datetime, timedelta
-import calendar
-import parsedatetime
-import dateutil.parser
-from dateutil.relativedelta import relativedelta
-
-
-# Load data
-attractions = pd.read_csv("uae_attractions.csv")
-hotels = pd.read_csv("uae_hotels.csv")
-restaurants = pd.read_csv("uae_restaurants.csv")
-
-attractions.columns = attractions.columns.str.strip()
-hotels.columns = hotels.columns.str.strip()
-restaurants.columns = restaurants.columns.str.strip()
-
-# Rating conversion
-rating_map = {
-    "OneStar": 1,
-    "TwoStar": 2,
-    "ThreeStar": 3,
-    "FourStar": 4,
-    "FiveStar": 5
-}
-hotels["HotelRating"] = hotels["HotelRating"].map(rating_map)
-restaurants["Average Cost for two"] = pd.to_numeric(
-    restaurants["Average Cost for two"], errors="coerce"
-)
-
-# Helpers
-def clean_value(val, default="Not Available"):
-    if pd.isna(val) or str(val).strip().lower() in ["nan", "none", ""]:
-        return default
-    return str(val)
-
-def format_rating(rating):
-    if pd.isna(rating):
-        return "Not Rated"
-    return f"{int(rating)}-Star"
+from date_engine import parse_date_string, find_date_phrase, resolve_locally
+from narrative_cache import narrative_cache, narrative_key
+from catalog_snapshot import open_catalog
+from route_planner import DAY_SLOTS
+from llm_client import chat_completion, chat_completion_async, chat_stream, chat_stream_async
+from deadline import degraded
+
 
 # Preference mapping
 preference_map = {
@@ -63,29 +29,47 @@ time_based_map = {
     "Evening": ["Desert", "Safari", "Adventure", "Nightlife", "Show", "Observation", "Fountain", "Water Park"]
 }
 
-# Load keys
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY").strip()
-OPENAI_ORG_ID = os.getenv("OPENAI_ORG_ID")
-OPENAI_PROJECT_ID = os.getenv("OPENAI_PROJECT_ID")
-
-client = OpenAI(
-    api_key=OPENAI_API_KEY,
-    organization=OPENAI_ORG_ID if OPENAI_ORG_ID else None,
-    project=OPENAI_PROJECT_ID if OPENAI_PROJECT_ID else None
-)
+# ✅ Load data: prebuilt snapshot (catalog_snapshot.py) if current, warna CSVs via pandas
+city_catalogs = open_catalog(preference_map, time_based_map)
+valid_categories = city_catalogs.categories
 
 import re
+import threading
 from datetime import datetime
 
-def extract_start_date(query):
-    """
-    Use OpenAI LLM to extract a date phrase (not normalized).
-    Examples: "next Wednesday", "tomorrow", "15 September", "after 5 days"
-    Normalization to ISO (YYYY-MM-DD) is handled later in Python.
-    Returns None if no date is present.
-    """
-    prompt = f"""
+# How many date lookups were answered locally vs. sent to the LLM
+date_resolver_counts = {"local": 0, "llm": 0}
+_counts_lock = threading.Lock()
+
+
+def _count_date_resolver(tier):
+    with _counts_lock:
+        date_resolver_counts[tier] += 1
+
+
+def date_resolver_stats():
+    with _counts_lock:
+        local, llm = date_resolver_counts["local"], date_resolver_counts["llm"]
+    total = local + llm
+    return {
+        "local_hits": local,
+        "llm_calls": llm,
+        "llm_calls_avoided_pct": round(100 * local / total, 1) if total else 0.0
+    }
+
+
+def _local_date_phrase(query):
+    """Tier 1 of extract_start_date: the phrase if local patterns resolve it confidently, else None."""
+    phrase = find_date_phrase(query)
+    if phrase and resolve_locally(phrase):
+        _count_date_resolver("local")
+        return phrase
+    _count_date_resolver("llm")
+    return None
+
+
+def build_date_prompt(query):
+    return f"""
     You are a date extractor.
     Extract exactly ONE date or relative date phrase from the query as the user mentioned it.
     Do NOT convert or normalize into ISO format.
@@ -106,13 +90,9 @@ def extract_start_date(query):
     Output format: the exact phrase (string) or null
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0
-    )
 
-    content = response.choices[0].message.content.strip()
+def _date_phrase_from_reply(content):
+    content = content.strip()
 
     if content.lower() == "null":
         return None
@@ -121,78 +101,30 @@ def extract_start_date(query):
     phrase = content.strip().strip('"').strip("'")
     return phrase
 
-def parse_date_string(natural_date, base_date=None):
-    if not natural_date:
-        return None
 
-    natural_date_lower = natural_date.lower().strip()
-    today = base_date or datetime.now()
-
-    # ✅ Special cases first
-    if "day after tomorrow" in natural_date_lower:
-        return (today + timedelta(days=2)).strftime('%Y-%m-%d')
-    if "tomorrow" in natural_date_lower:
-        return (today + timedelta(days=1)).strftime('%Y-%m-%d')
-
-    # ✅ Handle weekdays explicitly
-    weekdays = list(calendar.day_name)
-    for i, wd in enumerate(weekdays):
-        if wd.lower() in natural_date_lower:
-          weekday_num = i
-          days_ahead = (weekday_num - today.weekday() + 7) % 7
-          if days_ahead == 0:
-               days_ahead = 7  # same day → push 7 days
-          return (today + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
-
-
-    # ✅ Handle "next month"
-    if natural_date_lower == "next month":
-        return (today + relativedelta(months=1)).strftime('%Y-%m-%d')
-
-    # ✅ Handle "after N days"
-    match = re.search(r'after (\d+) days?', natural_date_lower)
-    if match:
-        days = int(match.group(1))
-        return (today + timedelta(days=days)).strftime('%Y-%m-%d')
-
-    # ✅ parsedatetime fallback
-    cal = parsedatetime.Calendar()
-    time_struct, parse_status = cal.parse(natural_date, sourceTime=today.timetuple())
-    if parse_status != 0:
-        return datetime(*time_struct[:6]).strftime('%Y-%m-%d')
-
-    # ✅ dateutil fallback
-    try:
-        return dateutil.parser.parse(natural_date, fuzzy=True, default=today).strftime('%Y-%m-%d')
-    except Exception:
-        return None
+def extract_start_date(query):
+    """
+    Extract a date phrase (not normalized) from the query.
+    Tier 1: local regex patterns, accepted only if they resolve confidently (resolve_locally).
+    Tier 2: OpenAI LLM, for everything else ("Christmas", "mid next month", no date at all...).
+    Examples: "next Wednesday", "tomorrow", "15 September", "after 5 days"
+    Normalization to ISO (YYYY-MM-DD) is handled later in Python.
+    Returns None if no date is present.
+    """
+    phrase = _local_date_phrase(query)
+    if phrase:
+        return phrase
 
+    return _date_phrase_from_reply(chat_completion(build_date_prompt(query)))
 
-def filter_by_preferences(city_attractions, preferences):
-    if not preferences:
-        return city_attractions
-    matched = pd.DataFrame()
-    for pref in preferences:
-        for cat in preference_map.get(pref.lower(), []):
-            matches = city_attractions[city_attractions["Category"].str.contains(cat, case=False, na=False)]
-            matched = pd.concat([matched, matches])
-    if not matched.empty:
-        non_pref = city_attractions[~city_attractions.index.isin(matched.index)]
-        return pd.concat([matched, non_pref]).drop_duplicates().reset_index(drop=True)
-    return city_attractions
-
-def pick_time_based_attraction(city_attractions, used, slot):
-    categories = time_based_map.get(slot, [])
-    candidates = city_attractions[
-        city_attractions["Category"].str.contains("|".join(categories), case=False, na=False)
-    ]
-    candidates = candidates[~candidates["Name"].isin(used)]
-    if not candidates.empty:
-        return candidates.iloc[0]
-    unused = city_attractions[~city_attractions["Name"].isin(used)]
-    if not unused.empty:
-        return unused.iloc[0]
-    return None
+
+async def extract_start_date_async(query):
+    """extract_start_date with the LLM tier on the async client."""
+    phrase = _local_date_phrase(query)
+    if phrase:
+        return phrase
+
+    return _date_phrase_from_reply(await chat_completion_async(build_date_prompt(query)))
 
 def split_days_among_cities(cities, total_days):
     city_day_counts = {}
@@ -208,7 +140,39 @@ def split_days_among_cities(cities, total_days):
         idx += 1
     return city_day_counts
 
+def _has_coordinates(record):
+    return math.isfinite(record.lat) and math.isfinite(record.lon)
+
+
+def _centroid(records):
+    """Mean (lat, lon) of the records that have coordinates, or None."""
+    points = [(r.lat, r.lon) for r in records if _has_coordinates(r)]
+    if not points:
+        return None
+    return sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points)
+
+
 def build_itinerary(query):
+    try:
+        raw_start_date = extract_start_date(query)
+    except Exception as e:
+        # ✅ Date LLM down / out of time → itinerary without dates instead of no itinerary
+        degraded("start date", e)
+        raw_start_date = None
+    return assemble_itinerary(query, raw_start_date)
+
+
+async def build_itinerary_async(query):
+    try:
+        raw_start_date = await extract_start_date_async(query)
+    except Exception as e:
+        degraded("start date", e)
+        raw_start_date = None
+    return assemble_itinerary(query, raw_start_date)
+
+
+def assemble_itinerary(query, raw_start_date):
+    """(parsed, itinerary) for `query`, given its date phrase (extract_start_date) or None."""
     days, budget, currency, preferences = None, None, "AED", []
 
     # Days
@@ -235,15 +199,12 @@ def build_itinerary(query):
     for kw in preference_map.keys():
         if kw in query.lower():
             preferences.append(kw)
-    valid_categories = [c for c in attractions["Category"].dropna().unique().tolist() if c.lower() != "hotel"]
     for cat in valid_categories:
         if cat.lower() in query.lower() and cat not in preferences:
             preferences.append(cat)
     preferences = list(set([p.capitalize() for p in preferences]))
 
-    # Start date via LLM
-    # Start date via LLM + normalize
-    raw_start_date = extract_start_date(query)
+    # Start date (phrase from extract_start_date) → normalize
     start_date = parse_date_string(raw_start_date) if raw_start_date else None
  
 
@@ -253,47 +214,55 @@ def build_itinerary(query):
     day_counter = 1
 
     for idx, city in enumerate(cities):
-        city_attractions = attractions[attractions["City"].str.lower() == city.lower()].sample(frac=1).reset_index(drop=True)
-        city_attractions = filter_by_preferences(city_attractions, preferences)
-
-        city_hotels = hotels[hotels["cityName"].str.lower() == city.lower()].sample(frac=1).reset_index(drop=True)
-        city_restaurants = restaurants[restaurants["City"].str.lower() == city.lower()].sample(frac=1).reset_index(drop=True)
+        catalog = city_catalogs.city(city)
+        picker = catalog.picker(preferences, preference_map)
+        city_hotels = catalog.rotated_hotels()
+        city_restaurants = catalog.rotated_restaurants()
 
         current_hotel = None
-        used_attractions = set()
-
-        for i in range(city_day_counts[city]):
-            morning = pick_time_based_attraction(city_attractions, used_attractions, "Morning")
-            if morning is not None:
-                used_attractions.add(morning["Name"])
-            afternoon = pick_time_based_attraction(city_attractions, used_attractions, "Afternoon")
-            if afternoon is not None:
-                used_attractions.add(afternoon["Name"])
-            evening_pick = pick_time_based_attraction(city_attractions, used_attractions, "Evening")
-            if evening_pick is not None:
-                used_attractions.add(evening_pick["Name"])
-
-            restaurant = city_restaurants.iloc[i % len(city_restaurants)] if not city_restaurants.empty else None
-            hotel = city_hotels.iloc[i % len(city_hotels)] if not city_hotels.empty else None
+        day_stops = [
+            [i for i in (picker.pick_index(slot) for slot in DAY_SLOTS) if i is not None]
+            for _ in range(city_day_counts[city])
+        ]
+        # ✅ Hotel: city ke saare picks ke centroid ke sabse paas (coordinates na ho to random)
+        centre = _centroid([catalog.attractions[i] for day in day_stops for i in day])
+        city_hotel = catalog.nearest_hotel(*centre) if centre else None
+        if city_hotel is None and city_hotels:
+            city_hotel = city_hotels[0]
+        # ✅ Route: picks ko compact days me regroup karo, har din hotel se chhota route
+        day_stops = catalog.plan_days(day_stops, city_hotel)
+        day_picks = [
+            tuple(catalog.attractions[i] for i in day) + (None,) * (len(DAY_SLOTS) - len(day))
+            for day in day_stops
+        ]
+        used_restaurants = set()
+
+        for i, (morning, afternoon, evening_pick) in enumerate(day_picks):
+            # ✅ Dinner: evening attraction ke sabse paas wala restaurant, repeat nahi
+            anchor = next((a for a in (evening_pick, afternoon, morning) if a is not None and _has_coordinates(a)), None)
+            restaurant = catalog.nearest_restaurant(anchor.lat, anchor.lon, used_restaurants) if anchor else None
+            if restaurant is None:
+                restaurant = city_restaurants[i % len(city_restaurants)] if city_restaurants else None
+            hotel = city_hotel
 
             if i == 0 and idx > 0:
                 morning_text = f"🚗 Travel to **{city}**, check into hotel."
                 current_hotel = hotel
-                hotel_text = "No hotels available" if hotel is None else f"{clean_value(hotel['HotelName'])} ⭐ {format_rating(hotel['HotelRating'])}"
+                hotel_text = "No hotels available" if hotel is None else f"{hotel.name} ⭐ {hotel.rating}"
             elif i == 0 and idx == 0:
-                morning_text = f"Check into hotel then visit {morning['Name']} ({morning['Category']}) – {morning['Description']}"
+                morning_text = f"Check into hotel then visit {morning.name} ({morning.category}) – {morning.description}"
                 current_hotel = hotel
-                hotel_text = "No hotels available" if hotel is None else f"{clean_value(hotel['HotelName'])} ⭐ {format_rating(hotel['HotelRating'])}"
+                hotel_text = "No hotels available" if hotel is None else f"{hotel.name} ⭐ {hotel.rating}"
             else:
-                morning_text = f"{morning['Name']} ({morning['Category']}) – {morning['Description']}"
+                morning_text = f"{morning.name} ({morning.category}) – {morning.description}"
                 hotel_text = "Same hotel as previous day" if current_hotel is not None else "No hotels available"
 
-            afternoon_text = "No afternoon activity" if afternoon is None else f"{afternoon['Name']} ({afternoon['Category']}) – {afternoon['Description']}"
+            afternoon_text = "No afternoon activity" if afternoon is None else f"{afternoon.name} ({afternoon.category}) – {afternoon.description}"
 
-            dinner_text = "No restaurants available" if restaurant is None else f"{clean_value(restaurant['Restaurant Name'])} 🍴 {clean_value(restaurant['Cuisines'])} | ⭐ {clean_value(restaurant['Aggregate rating'], 'Not Rated')} ({clean_value(restaurant['Votes'], '0')} reviews) | 💰 {clean_value(restaurant['Average Cost for two'], 'N/A')} AED for 2 people"
+            dinner_text = "No restaurants available" if restaurant is None else f"{restaurant.name} 🍴 {restaurant.cuisines} | ⭐ {restaurant.rating} ({restaurant.votes} reviews) | 💰 {restaurant.cost_for_two} AED for 2 people"
 
             if evening_pick is not None:
-                evening_activity = f"{evening_pick['Name']} ({evening_pick['Category']}) – {evening_pick['Description']}"
+                evening_activity = f"{evening_pick.name} ({evening_pick.category}) – {evening_pick.description}"
                 evening_text = f"{evening_activity}\nDinner: {dinner_text}"
             else:
                 evening_text = f"Dinner: {dinner_text}"
@@ -328,10 +297,7 @@ def build_itinerary(query):
 
     return parsed, itinerary
 
-def make_human_like(parsed, itinerary):
-    import json
-    from datetime import datetime
-
+def build_narrative_prompt(parsed, itinerary):
     days = parsed.get("days", len(itinerary))
     cities = parsed.get("cities", [])
 
@@ -364,10 +330,60 @@ def make_human_like(parsed, itinerary):
     JSON itinerary data:
     {json.dumps(itinerary, indent=2, ensure_ascii=False)}
     """
+    return prompt
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7
-    )
-    return response.choices[0].message.content
+def make_human_like(parsed, itinerary):
+    # ✅ Same itinerary pehle bana hai to cached narrative do, LLM skip
+    key = narrative_key(parsed, itinerary)
+    cached = narrative_cache.lookup(key)
+    if cached is not None:
+        return cached
+
+    prompt = build_narrative_prompt(parsed, itinerary)
+
+    narrative = chat_completion(prompt, temperature=0.7)
+    narrative_cache.store(key, narrative)
+    return narrative
+
+def make_human_like_stream(parsed, itinerary):
+    """Same narrative as make_human_like, yielded as text deltas while the LLM generates it."""
+    key = narrative_key(parsed, itinerary)
+    cached = narrative_cache.lookup(key)
+    if cached is not None:
+        yield cached
+        return
+
+    prompt = build_narrative_prompt(parsed, itinerary)
+
+    parts = []
+    for delta in chat_stream(prompt, temperature=0.7):
+        parts.append(delta)
+        yield delta
+    narrative_cache.store(key, "".join(parts))  # only reached when the stream completed
+
+
+async def make_human_like_async(parsed, itinerary):
+    """make_human_like on the async client."""
+    key = narrative_key(parsed, itinerary)
+    cached = narrative_cache.lookup(key)
+    if cached is not None:
+        return cached
+
+    narrative = await chat_completion_async(build_narrative_prompt(parsed, itinerary), temperature=0.7)
+    narrative_cache.store(key, narrative)
+    return narrative
+
+
+async def make_human_like_stream_async(parsed, itinerary):
+    """make_human_like_stream on the async client (async generator of text deltas)."""
+    key = narrative_key(parsed, itinerary)
+    cached = narrative_cache.lookup(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    async for delta in chat_stream_async(build_narrative_prompt(parsed, itinerary), temperature=0.7):
+        parts.append(delta)
+        yield delta
+    narrative_cache.store(key, "".join(parts))
@@ -0,0 +1,163 @@
+"""
+Shared OpenAI client, created on first use.
+
+Importing openai alone takes ~0.4 s, so it is not imported at module load; itinerary and
+smart_flight_utils share this one client instead of building one each.
+get_async_client() is the AsyncOpenAI counterpart for the asyncio serving mode (async_app).
+chat_completion() / chat_completion_async() send one prompt and return the reply text;
+identical prompts already in flight share that call (single_flight), and every call
+takes an openai_limit slot (upstream_limits). chat_stream() / chat_stream_async() yield
+the reply as text deltas. All of them time out and retry within the request deadline
+(deadline.py), so the SDK's own retries are off.
+"""
+import importlib
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from deadline import acall_with_retries, budget, call_with_retries, current
+from single_flight import SingleFlight
+from upstream_limits import openai_limit
+
+# Load environment variables from .env (for local dev)
+load_dotenv()
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))  # seconds per attempt, capped by the request deadline
+
+_client = None
+_async_client = None
+_async_client_pid = None
+_lock = threading.Lock()
+
+openai_flight = SingleFlight("openai")
+
+
+def _client_kwargs():
+    api_key = (os.getenv("OPENAI_API_KEY") or "").strip()
+    if not api_key:
+        raise ValueError("❌ OPENAI_API_KEY not found. Please set it in environment variables or .env file.")
+    org_id = os.getenv("OPENAI_ORG_ID")
+    project_id = os.getenv("OPENAI_PROJECT_ID")
+
+    # This supports both normal keys (sk-...) and project keys (sk-proj-...)
+    return {
+        "api_key": api_key,
+        "organization": org_id if org_id else None,
+        "project": project_id if project_id else None,
+        "max_retries": 0  # retried in call_with_retries, within the request deadline
+    }
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from openai import OpenAI
+
+                _client = OpenAI(**_client_kwargs())
+    return _client
+
+
+def get_async_client():
+    """Shared AsyncOpenAI client for this worker process (rebuilt after fork, like http_client)."""
+    global _async_client, _async_client_pid
+    pid = os.getpid()
+    if _async_client is None or _async_client_pid != pid:
+        with _lock:
+            if _async_client is None or _async_client_pid != pid:
+                from openai import AsyncOpenAI
+
+                _async_client, _async_client_pid = AsyncOpenAI(**_client_kwargs()), pid
+    return _async_client
+
+
+def prompt_key(prompt, model, temperature):
+    """Coalescing key: same model, temperature and prompt text up to whitespace."""
+    return model, temperature, " ".join(prompt.split())
+
+
+def chat_completion(prompt, temperature=0, model="gpt-4o-mini"):
+    """Reply text for a single-message prompt (non-streaming)."""
+    def attempt():
+        with openai_limit.slot():
+            response = get_client().chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                timeout=budget(LLM_TIMEOUT)
+            )
+        return response.choices[0].message.content
+    key = prompt_key(prompt, model, temperature)
+    return openai_flight.do(key, lambda: call_with_retries(attempt))
+
+
+async def chat_completion_async(prompt, temperature=0, model="gpt-4o-mini"):
+    """chat_completion on the async client."""
+    async def attempt():
+        async with openai_limit.aslot():
+            response = await get_async_client().chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                timeout=budget(LLM_TIMEOUT)
+            )
+        return response.choices[0].message.content
+    key = prompt_key(prompt, model, temperature)
+    return await openai_flight.do_async(key, lambda: acall_with_retries(attempt))
+
+
+def _delta(chunk):
+    return chunk.choices[0].delta.content if chunk.choices else None
+
+
+def chat_stream(prompt, temperature=0, model="gpt-4o-mini"):
+    """
+    Reply text deltas while the model generates them. Opening the stream is retried;
+    the deltas stop with DeadlineExceeded once the request deadline passes. The HTTP
+    stream is closed when the generator ends, raises or is closed (client disconnect).
+    """
+    def connect():
+        return get_client().chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            stream=True,
+            timeout=budget(LLM_TIMEOUT)
+        )
+
+    deadline = current()
+    with openai_limit.slot():  # held until the stream ends
+        with call_with_retries(connect) as stream:
+            for chunk in stream:
+                if deadline is not None:
+                    deadline.check("narrative stream")
+                if _delta(chunk):
+                    yield _delta(chunk)
+
+
+async def chat_stream_async(prompt, temperature=0, model="gpt-4o-mini"):
+    """chat_stream on the async client (async generator); the HTTP stream is closed the same way."""
+    async def connect():
+        return await get_async_client().chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            stream=True,
+            timeout=budget(LLM_TIMEOUT)
+        )
+
+    deadline = current()
+    async with openai_limit.aslot():
+        async with await acall_with_retries(connect) as stream:
+            async for chunk in stream:
+                if deadline is not None:
+                    deadline.check("narrative stream")
+                if _delta(chunk):
+                    yield _delta(chunk)
+
+
+def preload():
+    """Import openai without creating a client (e.g. in a preforking master, so workers share the module)."""
+    importlib.import_module("openai")
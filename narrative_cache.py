@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from cache_utils import TTLCache
+
+NARRATIVE_CACHE_SIZE = int(os.getenv("NARRATIVE_CACHE_SIZE", 512))
+NARRATIVE_CACHE_TTL = int(os.getenv("NARRATIVE_CACHE_TTL", 7 * 24 * 3600))
+NARRATIVE_VARIANTS = int(os.getenv("NARRATIVE_VARIANTS", 3))  # narratives kept per itinerary
+NARRATIVE_CACHE_DIR = os.getenv("NARRATIVE_CACHE_DIR")  # optional, one JSON file per key
+
+
+def narrative_key(parsed, itinerary):
+    """
+    Content hash of everything the narrative prompt depends on:
+    the itinerary itself, preferences, days and cities (order of preferences doesn't matter).
+    """
+    content = {
+        "itinerary": itinerary,
+        "preferences": sorted(parsed.get("preferences") or []),
+        "days": parsed.get("days"),
+        "cities": parsed.get("cities") or [],
+    }
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class NarrativeCache:
+    """
+    Bounded TTL cache of generated narratives, keyed by narrative_key().
+    Up to `variants` narratives are collected per key; until then lookups miss so a new one
+    gets generated, afterwards a random stored variant is served and the LLM is skipped.
+    With `path` set, entries are also written to <path>/<key>.json and survive restarts.
+    """
+
+    def __init__(self, maxsize=NARRATIVE_CACHE_SIZE, ttl=NARRATIVE_CACHE_TTL,
+                 variants=NARRATIVE_VARIANTS, path=NARRATIVE_CACHE_DIR):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl, name="narrative_cache")
+        self.variants = max(1, variants)
+        self.path = path
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self._writes = 0
+        self._prune_every = max(1, maxsize // 8)  # writes between directory scans
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def lookup(self, key):
+        """A cached narrative for `key`, or None when one should be generated."""
+        stored = self.cache.get(key)
+        if stored is None and self.path:
+            stored = self._read(key)
+            if stored is not None:
+                self.disk_hits += 1
+                self.cache.set(key, stored)
+        if not stored or len(stored) < self.variants:
+            return None
+        return random.choice(stored)
+
+    def store(self, key, narrative):
+        if not narrative:
+            return
+        with self._lock:
+            stored = self.cache.peek(key) or (self._read(key) if self.path else None) or []
+            if len(stored) >= self.variants or narrative in stored:
+                return
+            stored = stored + [narrative]
+            self.cache.set(key, stored)
+        if self.path:
+            self._write(key, stored)
+
+    def stats(self):
+        return {
+            **self.cache.stats(),
+            "variants": self.variants,
+            "disk_hits": self.disk_hits,
+            "persisted": bool(self.path),
+        }
+
+    # --- disk store ---
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.json")
+
+    def _read(self, key):
+        try:
+            with open(self._file(key), encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("stored_at", 0) > self.cache.ttl:
+            return None
+        return entry.get("variants") or None
+
+    def _write(self, key, stored):
+        tmp_path = None
+        try:
+            # own temp file per call: threads and workers storing the same key don't share one
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=f"{key}.", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump({"stored_at": time.time(), "variants": stored}, fh, ensure_ascii=False)
+            os.replace(tmp_path, self._file(key))
+        except OSError as e:
+            print("narrative_cache: could not persist", e)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self._prune_every == 0
+        if due:
+            self._prune()
+
+    def _prune(self):
+        """Keep the directory bounded: drop the oldest files beyond 2x maxsize (every few writes)."""
+        try:
+            names = [f for f in os.listdir(self.path) if f.endswith(".json")]
+        except OSError:
+            return
+        if len(names) <= 2 * self.cache.maxsize:
+            return
+        files = []
+        for name in names:
+            try:  # another thread / worker may be pruning the same directory
+                files.append((os.path.getmtime(os.path.join(self.path, name)), name))
+            except OSError:
+                pass
+        files.sort()
+        for _, name in files[:len(files) - self.cache.maxsize]:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+
+narrative_cache = NarrativeCache()
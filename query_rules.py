@@ -0,0 +1,229 @@
+import re
+import threading
+import time
+
+from date_engine import DATE_PHRASE_PATTERNS, resolve_locally
+
+# ---------------- Offline lookup tables ----------------
+# City / airport name → primary international IATA code
+AIRPORTS = {
+    # UAE
+    "dubai": "DXB", "abu dhabi": "AUH", "sharjah": "SHJ", "ras al khaimah": "RKT",
+    "fujairah": "FJR", "ajman": "DXB", "umm al quwain": "DXB", "al ain": "AAN",
+    # GCC / Middle East
+    "doha": "DOH", "muscat": "MCT", "bahrain": "BAH", "manama": "BAH", "kuwait": "KWI",
+    "riyadh": "RUH", "jeddah": "JED", "dammam": "DMM", "medina": "MED", "amman": "AMM",
+    "cairo": "CAI", "beirut": "BEY", "istanbul": "IST",
+    # India
+    "delhi": "DEL", "new delhi": "DEL", "mumbai": "BOM", "bombay": "BOM", "bangalore": "BLR",
+    "bengaluru": "BLR", "chennai": "MAA", "madras": "MAA", "hyderabad": "HYD", "kolkata": "CCU",
+    "calcutta": "CCU", "kochi": "COK", "cochin": "COK", "trivandrum": "TRV",
+    "thiruvananthapuram": "TRV", "kozhikode": "CCJ", "calicut": "CCJ", "ahmedabad": "AMD",
+    "pune": "PNQ", "goa": "GOI", "jaipur": "JAI", "lucknow": "LKO", "amritsar": "ATQ",
+    "chandigarh": "IXC", "mangalore": "IXE", "coimbatore": "CJB", "kannur": "CNN",
+    "tiruchirappalli": "TRZ", "trichy": "TRZ", "varanasi": "VNS", "nagpur": "NAG",
+    "indore": "IDR", "bhubaneswar": "BBI", "patna": "PAT", "guwahati": "GAU",
+    # South Asia
+    "karachi": "KHI", "lahore": "LHE", "islamabad": "ISB", "dhaka": "DAC", "kathmandu": "KTM",
+    "colombo": "CMB", "malé": "MLE",
+    # Europe / rest of world
+    "london": "LHR", "manchester": "MAN", "birmingham": "BHX", "paris": "CDG",
+    "frankfurt": "FRA", "amsterdam": "AMS", "rome": "FCO", "madrid": "MAD", "zurich": "ZRH",
+    "new york": "JFK", "toronto": "YYZ", "singapore": "SIN", "bangkok": "BKK",
+    "kuala lumpur": "KUL", "hong kong": "HKG", "sydney": "SYD", "melbourne": "MEL",
+    "nairobi": "NBO", "johannesburg": "JNB",
+    # Hindi names of the most common routes
+    "दिल्ली": "DEL", "मुंबई": "BOM", "दुबई": "DXB", "अबू धाबी": "AUH", "शारजाह": "SHJ",
+    "बेंगलुरु": "BLR", "चेन्नई": "MAA", "हैदराबाद": "HYD", "कोलकाता": "CCU",
+}
+IATA_CODES = set(AIRPORTS.values())
+# Codes that are also everyday English words are only recognised through their city name
+AMBIGUOUS_CODES = {"MAN", "MED", "SIN", "PAT", "NAG", "MEL", "BAH"}
+
+# Airline name → IATA airline code
+AIRLINES = {
+    "indigo": "6E", "air india express": "IX", "air india": "AI", "spicejet": "SG",
+    "vistara": "UK", "akasa": "QP", "emirates": "EK", "etihad": "EY", "flydubai": "FZ",
+    "fly dubai": "FZ", "air arabia": "G9", "qatar airways": "QR",
+    "oman air": "WY", "saudia": "SV", "gulf air": "GF", "kuwait airways": "KU",
+    "british airways": "BA", "lufthansa": "LH", "turkish airlines": "TK", "klm": "KL",
+    "air france": "AF", "singapore airlines": "SQ", "pia": "PK", "srilankan": "UL",
+    "biman": "BG",
+}
+
+CABINS = {
+    "premium economy": "premium economy", "business": "business", "first class": "first",
+    "economy": "economy",
+}
+
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9}
+
+_DEVANAGARI = "\u0900-\u097F"
+_NOT_DEVANAGARI = rf"(?<![{_DEVANAGARI}\w])"
+_NOT_DEVANAGARI_AFTER = rf"(?![{_DEVANAGARI}\w])"
+
+
+def _alternation(names):
+    return "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+
+
+_AIRPORT_RE = re.compile(
+    rf"{_NOT_DEVANAGARI}({_alternation(AIRPORTS)}|{_alternation(c.lower() for c in IATA_CODES - AMBIGUOUS_CODES)}){_NOT_DEVANAGARI_AFTER}"
+)
+_AIRLINE_RE = re.compile(rf"\b({_alternation(AIRLINES)})\b")
+_CABIN_RE = re.compile(rf"\b({_alternation(CABINS)})\b")
+_COUNT = rf"(\d+|{'|'.join(NUMBER_WORDS)})"
+_PAX_RES = {
+    "adults": re.compile(rf"\b{_COUNT}\s*(?:adults?|adlts?|pax|passengers?|people|persons?|travell?ers?)\b"),
+    "children": re.compile(rf"\b{_COUNT}\s*(?:child(?:ren)?|kids?)\b"),
+    "infants": re.compile(rf"\b{_COUNT}\s*(?:infants?|bab(?:y|ies))\b"),
+}
+_RETURN_RE = re.compile(r"\b(?:return(?:ing)?|back|coming back)\b|वापसी")
+_DEVANAGARI_RE = re.compile(rf"[{_DEVANAGARI}]")
+_HINDI_FROM_RE = re.compile(rf"\s*से(?![{_DEVANAGARI}])")  # "दिल्ली से दुबई" = Delhi → Dubai
+_DIGIT_RE = re.compile(r"\d")
+# Words that usually mean the query needs real understanding (alternatives, negation, vague dates)
+_HARD_WORDS_RE = re.compile(
+    r"\b(?:or|not|no|non|without|avoid(?:ing)?|exclud(?:e|ing)|except|other than|apart from|skip"
+    r"|don'?t|never|instead|via|multi|multicity|then|cheapest day|flexible"
+    r"|mid|early|late|end of|around|between|before|after the)\b"
+)
+
+# How many queries each tier handled
+parser_tier_counts = {"rules": 0, "cache": 0, "llm": 0}
+_counts_lock = threading.Lock()
+
+
+def _count(value):
+    return NUMBER_WORDS.get(value) or int(value)
+
+
+def _find_dates(text):
+    """All local date phrases with their positions, in text order."""
+    found, masked = [], text
+    for _ in range(3):
+        for pattern in DATE_PHRASE_PATTERNS:
+            match = pattern.search(masked)
+            if match:
+                found.append((match.start(), match.end(), text[match.start():match.end()].strip()))
+                masked = masked[:match.start()] + " " * (match.end() - match.start()) + masked[match.end():]
+                break
+        else:
+            break
+    return sorted(found)
+
+
+def rule_parse_query(query):
+    """
+    Deterministic parse of plain "X to Y on DATE" flight queries.
+    Returns (parsed, confident). `parsed` has the same keys as the LLM JSON from build_prompt
+    (dates stay raw phrases); when `confident` is False the caller should ask the LLM instead.
+    """
+    text = " ".join(query.casefold().split())
+    consumed = []  # spans explained by some rule, used to spot leftover digits
+
+    # --- Airports ---
+    airports = [(m.start(), m.end(), AIRPORTS.get(m.group(1), m.group(1).upper())) for m in _AIRPORT_RE.finditer(text)]
+    codes = []
+    for _, _, code in airports:
+        if code not in codes:
+            codes.append(code)
+    consumed += [(s, e) for s, e, _ in airports]
+
+    depfrom = arrto = None
+    if len(codes) == 2:
+        depfrom, arrto = codes
+        # "to X from Y" → swap
+        first_start = airports[0][0]
+        if re.search(r"\bfrom\s*$", text[:first_start]) is None and re.search(r"\bto\s*$", text[:first_start]):
+            depfrom, arrto = arrto, depfrom
+
+    # --- Dates ---
+    dates = _find_dates(text)
+    consumed += [(s, e) for s, e, _ in dates]
+    return_kw = _RETURN_RE.search(text)
+    depdate = retdate = None
+    if dates:
+        if return_kw:
+            before = [d for d in dates if d[0] < return_kw.start()]
+            after = [d for d in dates if d[0] >= return_kw.start()]
+            depdate = before[0][2] if before else None
+            retdate = after[0][2] if after else None
+        else:
+            depdate = dates[0][2]
+
+    # --- Pax, cabin, airline ---
+    pax = {"adults": 1, "children": 0, "infants": 0}
+    for field, pattern in _PAX_RES.items():
+        match = pattern.search(text)
+        if match:
+            pax[field] = _count(match.group(1))
+            consumed.append(match.span())
+
+    cabin_match = _CABIN_RE.search(text)
+    cabin = CABINS[cabin_match.group(1)] if cabin_match else "economy"
+    airline_match = _AIRLINE_RE.search(text)
+    airline = AIRLINES[airline_match.group(1)] if airline_match else ""
+
+    parsed = {
+        "from": depfrom,
+        "to": arrto,
+        "depdate": depdate,
+        "retdate": retdate,
+        **pax,
+        "cabin": cabin,
+        "airline_include": airline,
+    }
+
+    # --- Confidence ---
+    leftover = list(text)
+    for s, e in consumed:
+        leftover[s:e] = " " * (e - s)
+    leftover = "".join(leftover)
+
+    confident = (
+        len(airports) == 2  # a repeated or third airport (round trip, multi-city) needs the LLM
+        and len(codes) == 2
+        and depdate is not None
+        and resolve_locally(depdate) is not None
+        and (not return_kw or (retdate is not None and resolve_locally(retdate) is not None))
+        and len(dates) <= (2 if return_kw else 1)
+        and not _DIGIT_RE.search(leftover)
+        and not _HARD_WORDS_RE.search(text)
+        and (not _DEVANAGARI_RE.search(leftover) or bool(_HINDI_FROM_RE.match(text, airports[0][1])))
+    )
+    return parsed, confident
+
+
+def coverage_report(queries):
+    """Tier coverage of the rule parser over a query corpus (no network calls)."""
+    handled, timings = 0, []
+    for q in queries:
+        start = time.perf_counter()
+        _, confident = rule_parse_query(q)
+        timings.append((time.perf_counter() - start) * 1000)
+        handled += confident
+    timings.sort()
+    return {
+        "queries": len(queries),
+        "rules": handled,
+        "llm_fallback": len(queries) - handled,
+        "rules_pct": round(100 * handled / len(queries), 1) if queries else 0.0,
+        "p50_ms": round(timings[len(timings) // 2], 3) if timings else 0.0,
+        "max_ms": round(timings[-1], 3) if timings else 0.0,
+    }
+
+
+def count_tier(tier):
+    with _counts_lock:
+        parser_tier_counts[tier] += 1
+
+
+def parser_tier_stats():
+    with _counts_lock:
+        counts = dict(parser_tier_counts)
+    total = sum(counts.values())
+    return {
+        **counts,
+        "llm_calls_avoided_pct": round(100 * (total - counts["llm"]) / total, 1) if total else 0.0
+    }
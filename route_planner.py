@@ -0,0 +1,161 @@
+"""
+Day planning over a city's picked attractions: split them into geographically compact
+days, then order each day's stops as a short route from the hotel.
+
+- distance_matrix: vectorized haversine matrix (km, float32); CityCatalog caches one per city
+- cluster_days:    capacitated k-medoids (farthest-point seeds, greedy nearest assignment);
+                   capacities can be per class, so every day keeps one pick per slot
+- order_route:     open path from an origin; exact for a normal day (3 stops),
+                   nearest neighbour + 2-opt for longer ones
+A stop placed in a slot it does not suit (by category) costs slot_mismatch_km(...), more than
+any route through the day, so reordering trades distance only between equally suited orders.
+"""
+import functools
+import itertools
+import os
+
+import numpy as np
+
+from spatial_index import haversine_km
+
+DAY_SLOTS = ("Morning", "Afternoon", "Evening")
+ROUTE_MATRIX_MAX = int(os.getenv("ROUTE_MATRIX_MAX", 512))      # bigger cities: per-request sub-matrix
+ROUTE_CLUSTER_ROUNDS = int(os.getenv("ROUTE_CLUSTER_ROUNDS", 6))
+ROUTE_EXACT_MAX = 4                                             # brute-force orders up to 4! = 24
+
+
+def distance_matrix(lat, lon):
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    return haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :]).astype(np.float32)
+
+
+def slot_mismatch_km(dist, origin=None):
+    """Cost of one slot mismatch: more than any open path over `dist` (plus the first leg from origin)."""
+    longest = float(dist.max()) * max(len(dist) - 1, 0) if len(dist) else 0.0
+    if origin is not None and len(origin):
+        longest += float(origin.max())
+    return longest + 1.0
+
+
+# ---------------- Days ----------------
+def _assign(dist, medoids, capacities, classes):
+    """
+    Group label per point: each point goes to its closest group that still has room for its
+    class; points with the most to lose (largest gap between their best and second-best group)
+    choose first.
+    """
+    to_medoid = dist[:, medoids]
+    best_two = np.partition(to_medoid, 1, axis=1)[:, :2]
+    left = np.array(capacities)
+    labels = np.empty(len(dist), dtype=np.int64)
+    for point in np.argsort(best_two[:, 0] - best_two[:, 1], kind="stable").tolist():
+        cls = classes[point]
+        group = int(np.where(left[:, cls] > 0, to_medoid[point], np.inf).argmin())
+        left[group, cls] -= 1
+        labels[point] = group
+    return labels
+
+
+def cluster_days(dist, capacities, classes=None):
+    """
+    Split points 0..n-1 (dist: n x n) into len(capacities) groups, keeping each group close
+    to its medoid. Without `classes`, group g gets exactly capacities[g] points (they must sum
+    to n). With `classes` (one int per point), capacities[g][c] is the number of class-c points
+    group g gets.
+    """
+    n, k = len(dist), len(capacities)
+    if k <= 1 or n == 0:
+        return [list(range(n))] + [[] for _ in range(k - 1)]
+    if classes is None:
+        classes = np.zeros(n, dtype=np.int64)
+        capacities = [[c] for c in capacities]
+
+    # Farthest-point seeds, starting from the most outlying point
+    medoids = [int(dist.sum(axis=1).argmax())]
+    nearest = dist[medoids[0]].copy()
+    for _ in range(1, k):
+        medoids.append(int(nearest.argmax()))
+        np.minimum(nearest, dist[medoids[-1]], out=nearest)
+    medoids = np.array(medoids)
+
+    labels = None
+    for _ in range(ROUTE_CLUSTER_ROUNDS):
+        assigned = _assign(dist, medoids, capacities, classes)
+        if labels is not None and np.array_equal(assigned, labels):
+            break
+        labels = assigned
+        # New medoid: the member with the smallest summed distance to its own group
+        members = labels[:, None] == np.arange(k)
+        to_group = np.where(members, dist @ members.astype(dist.dtype), np.inf)
+        medoids = np.where(members.any(axis=0), to_group.argmin(axis=0), medoids)
+    return [np.flatnonzero(labels == g).tolist() for g in range(k)]
+
+
+# ---------------- Stops within a day ----------------
+@functools.lru_cache(maxsize=None)
+def _permutations(n):
+    return np.array(list(itertools.permutations(range(n))), dtype=np.int64)
+
+
+def route_cost(route, dist, origin=None, position_cost=None):
+    cost = float(origin[route[0]]) if origin is not None and route else 0.0
+    cost += sum(float(dist[a, b]) for a, b in zip(route, route[1:]))
+    if position_cost is not None:
+        cost += sum(float(position_cost[p, i]) for i, p in enumerate(route))
+    return cost
+
+
+def _two_opt(route, dist, origin):
+    """Reverse segments while that shortens the open path (first leg from `origin` if given)."""
+    n = len(route)
+
+    def leg(a, b):
+        if b is None:
+            return 0.0
+        if a is None:
+            return float(origin[b]) if origin is not None else 0.0
+        return float(dist[a, b])
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            before_i = route[i - 1] if i else None
+            for j in range(i + 1, n):
+                after_j = route[j + 1] if j + 1 < n else None
+                delta = (leg(before_i, route[j]) + leg(route[i], after_j)
+                         - leg(before_i, route[i]) - leg(route[j], after_j))
+                if delta < -1e-6:
+                    route[i:j + 1] = route[i:j + 1][::-1]
+                    improved = True
+    return route
+
+
+def order_route(dist, origin=None, position_cost=None):
+    """
+    Visiting order of points 0..n-1 as an open path.
+    origin:        distance from the start point (hotel) to each point, or None
+    position_cost: n x n extra cost of putting point p at position i, or None
+    """
+    n = len(dist)
+    if n <= 1:
+        return list(range(n))
+    if n <= ROUTE_EXACT_MAX:
+        orders = _permutations(n)
+        cost = dist[orders[:, :-1], orders[:, 1:]].sum(axis=1)
+        if origin is not None:
+            cost += origin[orders[:, 0]]
+        if position_cost is not None:
+            cost += position_cost[orders, np.arange(n)].sum(axis=1)
+        return orders[int(cost.argmin())].tolist()
+
+    # Nearest neighbour from the origin, then 2-opt on distance, then the cheaper direction
+    free = np.ones(n, dtype=bool)
+    route = [int(np.argmin(origin)) if origin is not None else 0]
+    free[route[0]] = False
+    for _ in range(n - 1):
+        route.append(int(np.where(free, dist[route[-1]], np.inf).argmin()))
+        free[route[-1]] = False
+    route = _two_opt(route, dist, origin)
+    return min(route, route[::-1], key=lambda r: route_cost(r, dist, origin, position_cost))
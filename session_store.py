@@ -0,0 +1,264 @@
+"""
+Conversation state per session_id, behind a small backend interface:
+    get(session_id) -> (session_id, state)    state is a plain dict the handler may change
+    save(session_id, state)                   persist changes (no-op in memory)
+    stats()
+
+SESSION_BACKEND picks the backend:
+- "memory" (default): dict in this process; fine for one worker
+- "sqlite": one SQLite file in WAL mode (SESSION_DB) shared by every worker on the host,
+  so a follow-up request can land on any worker
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_TTL = int(os.getenv("SESSION_TTL", 600))
+SESSION_MAX = int(os.getenv("SESSION_MAX", 100_000))
+SESSION_DB = os.getenv("SESSION_DB", "sessions.db")
+SESSION_CLEANUP_INTERVAL = float(os.getenv("SESSION_CLEANUP_INTERVAL", 30))  # seconds between cleanups
+SESSION_CLEANUP_BATCH = int(os.getenv("SESSION_CLEANUP_BATCH", 1000))         # rows deleted per statement
+
+
+def new_session_state(now):
+    return {
+        "flight_already_searched": False,
+        "started_with_flight": False,
+        "last_depdate": None,
+        "last_parsed": None,
+        "timestamp": now
+    }
+
+
+# ---------------- Serialization ----------------
+# Positional JSON: field names are written once here, not in every row
+PARSED_FIELDS = ("city", "cities", "days", "budget", "currency", "preferences", "day_split", "start_date")
+
+
+def encode_state(state):
+    parsed = state["last_parsed"]
+    if parsed is not None:
+        extra = {k: v for k, v in parsed.items() if k not in PARSED_FIELDS}
+        parsed = [parsed.get(k) for k in PARSED_FIELDS] + ([extra] if extra else [])
+    packed = [state["flight_already_searched"], state["started_with_flight"], state["last_depdate"], parsed]
+    return json.dumps(packed, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def decode_state(blob, timestamp):
+    flight_searched, started_with_flight, last_depdate, parsed = json.loads(blob)
+    if parsed is not None:
+        extra = parsed[len(PARSED_FIELDS)] if len(parsed) > len(PARSED_FIELDS) else {}
+        parsed = {**dict(zip(PARSED_FIELDS, parsed)), **extra}
+    return {
+        "flight_already_searched": flight_searched,
+        "started_with_flight": started_with_flight,
+        "last_depdate": last_depdate,
+        "last_parsed": parsed,
+        "timestamp": timestamp
+    }
+
+
+# ---------------- In-process ----------------
+class MemorySessionStore:
+    """
+    In-process conversation state with a sliding TTL and a size cap.
+    Sessions sit in an OrderedDict in last-access order. Every session has the same TTL,
+    so that is also expiry order: expiring pops from the front until the oldest one is
+    still live (amortized O(1) per request, no scan), and going over `maxsize` evicts
+    the least recently used.
+    """
+
+    backend = "memory"
+
+    def __init__(self, ttl=SESSION_TTL, maxsize=SESSION_MAX):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()   # session_id -> state (state["timestamp"] = last access)
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "resumed": 0, "expired": 0, "evicted": 0}
+
+    def get(self, session_id=None):
+        """(session_id, state): the live session, or a new one (under the given id if any)."""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            state = self._data.get(session_id) if session_id else None
+            if state is not None:
+                state["timestamp"] = now
+                self._data.move_to_end(session_id)
+                self._stats["resumed"] += 1
+                return session_id, state
+
+            # Unknown / expired id → naya session, same ID; no id → naya ID
+            session_id = session_id or str(uuid.uuid4())
+            state = self._data[session_id] = new_session_state(now)
+            self._stats["created"] += 1
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats["evicted"] += 1
+            return session_id, state
+
+    def save(self, session_id, state):
+        """The state dict is the stored object itself, nothing to write."""
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, session_id):
+        return session_id in self._data
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.time())
+            return {**self._stats, "backend": self.backend, "active": len(self._data),
+                    "maxsize": self.maxsize, "ttl": self.ttl}
+
+    # --- internals (caller holds the lock) ---
+    def _expire(self, now):
+        while self._data:
+            oldest = next(iter(self._data.values()))
+            if now - oldest["timestamp"] <= self.ttl:
+                break
+            self._data.popitem(last=False)
+            self._stats["expired"] += 1
+
+
+# ---------------- SQLite (shared by workers) ----------------
+class SQLiteSessionStore:
+    """
+    Sessions in one SQLite file in WAL mode: readers never block the writer, and every
+    worker process on the host sees the same sessions.
+    - get() is a primary-key read; a session missing or past its TTL comes back as a fresh
+      state and is only written on save()
+    - save() is one upsert that also refreshes the session's last-access time
+    - expired rows and rows over `maxsize` (least recently used first) are deleted by the
+      save() that comes due every SESSION_CLEANUP_INTERVAL seconds per process, at most one
+      batch of each; a bigger backlog is worked off a batch per second, not in one request
+    - the row count lives in session_count, kept up to date by triggers, so cleanup never
+      counts the table
+    Connections are opened lazily per process and thread, so the store can be created
+    in a preloading master before fork. Counters in stats() are per worker, "active" is global.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path=SESSION_DB, ttl=SESSION_TTL, maxsize=SESSION_MAX,
+                 cleanup_interval=SESSION_CLEANUP_INTERVAL, cleanup_batch=SESSION_CLEANUP_BATCH):
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch = cleanup_batch
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._next_cleanup = 0.0
+        self._stats = {"created": 0, "resumed": 0, "saves": 0, "expired": 0, "evicted": 0, "cleanups": 0}
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, touched REAL NOT NULL, state BLOB NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched)")
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("CREATE TABLE IF NOT EXISTS session_count ("
+                         "id INTEGER PRIMARY KEY CHECK (id = 0), n INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO session_count SELECT 0, COUNT(*) FROM sessions")  # once per file
+            conn.execute("CREATE TRIGGER IF NOT EXISTS sessions_added AFTER INSERT ON sessions "
+                         "BEGIN UPDATE session_count SET n = n + 1; END")
+            conn.execute("CREATE TRIGGER IF NOT EXISTS sessions_removed AFTER DELETE ON sessions "
+                         "BEGIN UPDATE session_count SET n = n - 1; END")
+            conn.execute("COMMIT")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def get(self, session_id=None):
+        now = time.time()
+        if session_id:
+            row = self._conn().execute(
+                "SELECT state FROM sessions WHERE id = ? AND touched >= ?", (session_id, now - self.ttl)
+            ).fetchone()
+            if row is not None:
+                self._count("resumed")
+                return session_id, decode_state(row[0], now)
+        self._count("created")
+        return session_id or str(uuid.uuid4()), new_session_state(now)
+
+    def save(self, session_id, state):
+        now = time.time()
+        state["timestamp"] = now
+        self._conn().execute(
+            "INSERT INTO sessions (id, touched, state) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET touched = excluded.touched, state = excluded.state",
+            (session_id, now, encode_state(state)),
+        )
+        self._count("saves")
+        with self._lock:
+            due = now >= self._next_cleanup
+            if due:
+                self._next_cleanup = now + self.cleanup_interval
+        if due and self.cleanup(now):
+            with self._lock:  # backlog left: next batch in a second, not a whole interval
+                self._next_cleanup = min(self._next_cleanup, now + 1)
+
+    def cleanup(self, now=None):
+        """
+        One batch of expired rows, then one batch of the least recently used rows above
+        maxsize. Returns True when rows are left for another round.
+        """
+        now = time.time() if now is None else now
+        conn = self._conn()
+        expired = conn.execute(
+            "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions WHERE touched < ? LIMIT ?)",
+            (now - self.ttl, self.cleanup_batch),
+        ).rowcount
+        excess = conn.execute("SELECT n FROM session_count").fetchone()[0] - self.maxsize
+        evicted = 0
+        if excess > 0:
+            evicted = conn.execute(
+                "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY touched LIMIT ?)",
+                (min(excess, self.cleanup_batch),),
+            ).rowcount
+        with self._lock:
+            self._stats["expired"] += expired
+            self._stats["evicted"] += evicted
+            self._stats["cleanups"] += 1
+        return expired >= self.cleanup_batch or excess > evicted
+
+    def __len__(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE touched >= ?", (time.time() - self.ttl,)
+        ).fetchone()[0]
+
+    def stats(self):
+        # Trigger-maintained row count: O(1), no scan per /stats call. Expired rows are
+        # included until the next cleanup batch removes them (len() is the exact count).
+        active = self._conn().execute("SELECT n FROM session_count").fetchone()[0]
+        with self._lock:
+            return {**self._stats, "backend": self.backend, "path": self.path, "active": active,
+                    "maxsize": self.maxsize, "ttl": self.ttl}
+
+
+def open_session_store(backend=SESSION_BACKEND):
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend != "memory":
+        print(f"session_store: unknown SESSION_BACKEND {backend!r}, using memory")
+    return MemorySessionStore()
+
+
+sessions = open_session_store()
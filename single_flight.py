@@ -0,0 +1,119 @@
+import asyncio
+import os
+import threading
+
+from deadline import current
+
+# Share one in-flight upstream call between identical concurrent requests (0 = every caller calls)
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "1") == "1"
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent upstream calls.
+    - First caller for a key (the leader) runs the call; callers arriving while it is in
+      flight wait for it and get the same value, or the same exception.
+    - Nothing is kept once the call finishes: the next caller starts a new one (caching
+      is TTLCache's job, this only covers the window while a call is in flight).
+    - A waiter stops waiting when its own request deadline passes (DeadlineExceeded);
+      the call carries on for the others.
+    do() is for threads (gunicorn --threads, fare calendar pool), do_async() for the event loop
+    (async_app); both count into the same stats.
+    """
+
+    def __init__(self, name="single_flight", enabled=SINGLE_FLIGHT):
+        self.name = name
+        self.enabled = enabled
+        self._calls = {}     # key -> _Call (threads)
+        self._tasks = {}     # (loop, key) -> Task (event loops)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "upstream": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        """Return fn(), sharing the result with identical calls (same `key`) already in flight."""
+        if not self.enabled:
+            self._count(leader=True)
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count_locked(leader)
+
+        if not leader:
+            deadline = current()
+            if not call.done.wait(deadline.remaining() if deadline else None):
+                raise deadline.exceeded("waiting for a shared upstream call")
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, fn):
+        """
+        Async do(): fn() returns an awaitable. It runs as its own task, so a waiter that is
+        cancelled (client gone) does not cancel the call for the others.
+        """
+        if not self.enabled:
+            self._count(leader=True)
+            return await fn()
+        slot = (asyncio.get_running_loop(), key)
+        with self._lock:
+            task = self._tasks.get(slot)
+            leader = task is None
+            if leader:
+                task = self._tasks[slot] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda done: self._forget(slot, done))
+            self._count_locked(leader)
+        deadline = current()
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline.remaining() if deadline else None)
+        except asyncio.TimeoutError:
+            if task.done():
+                raise  # the call itself timed out
+            raise deadline.exceeded("waiting for a shared upstream call") from None
+
+    def stats(self):
+        with self._lock:
+            calls = self._stats["calls"]
+            return {
+                **self._stats,
+                "in_flight": len(self._calls) + len(self._tasks),
+                "dedup_ratio": round(self._stats["coalesced"] / calls, 3) if calls else 0.0,
+                "enabled": self.enabled,
+            }
+
+    # --- internals ---
+    def _forget(self, slot, task):
+        with self._lock:
+            self._tasks.pop(slot, None)
+        if not task.cancelled():
+            task.exception()  # retrieved even if every waiter went away
+
+    def _count(self, leader):
+        with self._lock:
+            self._count_locked(leader)
+
+    def _count_locked(self, leader):
+        self._stats["calls"] += 1
+        self._stats["upstream" if leader else "coalesced"] += 1
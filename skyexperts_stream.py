@@ -0,0 +1,134 @@
+"""
+Incremental parser for SkyExperts searchflight responses.
+
+Walks the JSON body chunk by chunk and yields each flight from the `Data`
+array (top-level or under `data`) as soon as it is complete, so callers can
+summarize without ever holding the full multi-MB payload in memory.
+Scalar fields next to `Data` (Currency, Currency_sign, ...) are collected into
+a `meta` dict as they are seen.
+"""
+import codecs
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def iter_response_text(response, chunk_size=CHUNK_SIZE):
+    """Decode a streamed requests.Response into text chunks (UTF-8 safe across chunk edges)."""
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+    for raw in response.iter_content(chunk_size=chunk_size):
+        if raw:
+            yield decoder.decode(raw)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+class _Buffer:
+    """Sliding text window over the chunk stream; only the unparsed tail is kept."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            if chunk:
+                self.text = self.text[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Next non-whitespace character, or "" at end of stream."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"SkyExperts stream: expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value, pulling more chunks until it is whole."""
+        self.peek()
+        while True:
+            try:
+                val, end = _decoder.raw_decode(self.text, self.pos)
+                # A value touching the buffer edge may be a truncated number → read more first
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return val
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.more()
+
+
+def _walk_array(buf):
+    buf.expect("[")
+    if buf.peek() == "]":
+        buf.pos += 1
+        return
+    while True:
+        yield buf.value()
+        char = buf.peek()
+        if char == ",":
+            buf.pos += 1
+        elif char == "]":
+            buf.pos += 1
+            return
+        else:
+            raise ValueError(f"SkyExperts stream: malformed Data array at offset {buf.pos}")
+
+
+def _walk_object(buf, meta, nested=False):
+    buf.expect("{")
+    if buf.peek() == "}":
+        buf.pos += 1
+        return
+    while True:
+        key = buf.value()
+        buf.expect(":")
+        if key == "Data" and buf.peek() == "[":
+            yield from _walk_array(buf)
+        elif key == "data" and not nested and buf.peek() == "{":
+            yield from _walk_object(buf, meta.setdefault("data", {}), nested=True)
+        else:
+            val = buf.value()
+            if not isinstance(val, (dict, list)):
+                meta[key] = val
+        char = buf.peek()
+        if char == ",":
+            buf.pos += 1
+        elif char == "}":
+            buf.pos += 1
+            return
+        else:
+            raise ValueError(f"SkyExperts stream: malformed object at offset {buf.pos}")
+
+
+def iter_flights(chunks, meta=None):
+    """
+    Yield flight dicts from a SkyExperts body given as an iterable of text chunks.
+    `meta` (if passed) is filled with scalar fields, e.g. meta["data"]["Currency_sign"].
+    Scalars that come after `Data` in the body are only available once iteration finishes.
+    """
+    meta = {} if meta is None else meta
+    buf = _Buffer(chunks)
+    if buf.peek() != "{":
+        raise ValueError("SkyExperts stream: response is not a JSON object")
+    yield from _walk_object(buf, meta)
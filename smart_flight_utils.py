@@ -1,11 +1,17 @@
+import asyncio
+import contextvars
 import json
 import re
-import parsedatetime
 from datetime import datetime, timedelta
-import dateutil.parser
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 
-from flight_utils import search_flights_skyexperts, summarize_skyexperts, trip_output
+from flight_utils import search_and_summarize, search_and_summarize_async, trip_output
+from date_engine import resolve_trip_dates
+from intent_cache import intent_cache
+from query_rules import rule_parse_query, count_tier
+from llm_client import chat_completion, chat_completion_async
+from upstream_limits import UpstreamBusy, skyexperts_limit
+from deadline import DeadlineExceeded
 
 
 from dotenv import load_dotenv
@@ -14,20 +20,10 @@ import os
 # Load environment variables from .env (for local dev)
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY").strip()
-OPENAI_ORG_ID = os.getenv("OPENAI_ORG_ID")
-OPENAI_PROJECT_ID = os.getenv("OPENAI_PROJECT_ID")
-
-if not OPENAI_API_KEY:
-    raise ValueError("❌ OPENAI_API_KEY not found. Please set it in environment variables or .env file.")
-
-# Initialize OpenAI client
-# This supports both normal keys (sk-...) and project keys (sk-proj-...)
-client = OpenAI(
-    api_key=OPENAI_API_KEY,
-    organization=OPENAI_ORG_ID if OPENAI_ORG_ID else None,
-    project=OPENAI_PROJECT_ID if OPENAI_PROJECT_ID else None
-)
+# Fare calendar: one thread per date (all dates in one wave), at most skyexperts_limit's
+# in-flight cap, and at most FARE_CALENDAR_WORKERS if set (0 = no extra cap)
+FARE_CALENDAR_WORKERS = int(os.getenv("FARE_CALENDAR_WORKERS", 0))
+FARE_CALENDAR_MAX_DAYS = 7  # ±7 days → at most 15 searches
 
 def build_prompt(query):
     return f"""
@@ -78,57 +74,6 @@ Return **valid JSON only**. Do not explain anything.
 Query: "{query}"
 """
 
-from dateutil.relativedelta import relativedelta  # put at top of file
-
-import calendar
-
-def parse_date_string(natural_date, base_date=None):
-    if not natural_date:
-        return None
-
-    natural_date_lower = natural_date.lower().strip()
-    today = base_date or datetime.now()
-
-    # ✅ Special cases first
-    if "day after tomorrow" in natural_date_lower:
-        return (today + timedelta(days=2)).strftime('%Y-%m-%d')
-    if "tomorrow" in natural_date_lower:
-        return (today + timedelta(days=1)).strftime('%Y-%m-%d')
-
-    # ✅ Handle weekdays explicitly
-    weekdays = list(calendar.day_name)
-    for i, wd in enumerate(weekdays):
-        if wd.lower() in natural_date_lower:
-          weekday_num = i
-          days_ahead = (weekday_num - today.weekday() + 7) % 7
-          if days_ahead == 0:
-               days_ahead = 7  # same day → push 7 days
-          return (today + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
-
-
-    # ✅ Handle "next month"
-    if natural_date_lower == "next month":
-        return (today + relativedelta(months=1)).strftime('%Y-%m-%d')
-
-    # ✅ Handle "after N days"
-    match = re.search(r'after (\d+) days?', natural_date_lower)
-    if match:
-        days = int(match.group(1))
-        return (today + timedelta(days=days)).strftime('%Y-%m-%d')
-
-    # ✅ parsedatetime fallback
-    cal = parsedatetime.Calendar()
-    time_struct, parse_status = cal.parse(natural_date, sourceTime=today.timetuple())
-    if parse_status != 0:
-        return datetime(*time_struct[:6]).strftime('%Y-%m-%d')
-
-    # ✅ dateutil fallback
-    try:
-        return dateutil.parser.parse(natural_date, fuzzy=True, default=today).strftime('%Y-%m-%d')
-    except Exception:
-        return None
-
-
 def is_missing(value):
     if value is None:
         return True
@@ -143,115 +88,275 @@ def generate_sc(length=20):
     letters = string.ascii_letters + string.digits
     return ''.join(random.choice(letters) for i in range(length))
 
-def run_smart_flight_search(user_query):
+def build_search_payload(depfrom, arrto, depdate, retdate=None, adults=1, children=0,
+                         infants=0, cabin="economy", airline=""):
+    payload = {
+        "adults": adults,
+        "children": children,
+        "infants": infants,
+        "cabin": cabin,
+        "stops": False,
+        "airline_include": airline,
+        "ages": [],
+        "sc": generate_sc(),
+        "segments": [{"depfrom": depfrom, "arrto": arrto, "depdate": depdate}]
+    }
+    if retdate:
+        payload["segments"].append({
+            "depfrom": arrto,
+            "arrto": depfrom,
+            "depdate": retdate
+        })
+    return payload
+
+def clamp_flex_days(flex_days):
+    """The ± window actually searched: 0..FARE_CALENDAR_MAX_DAYS."""
+    return max(0, min(int(flex_days), FARE_CALENDAR_MAX_DAYS))
+
+def _calendar_workers(n_dates):
+    """Threads for n_dates searches: all at once unless a cap is lower."""
+    caps = [n for n in (skyexperts_limit.max_in_flight, FARE_CALENDAR_WORKERS) if n > 0]
+    return max(1, min([n_dates, *caps]))
+
+def _calendar_dates(depdate, flex_days, retdate):
+    """(depdate, retdate) pairs for depdate ± flex_days (already clamped), skipping past dates."""
+    center = datetime.strptime(depdate, "%Y-%m-%d")
+    trip_length = (datetime.strptime(retdate, "%Y-%m-%d") - center) if retdate else None
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    dates = [
+        center + timedelta(days=offset)
+        for offset in range(-flex_days, flex_days + 1)
+        if center + timedelta(days=offset) >= today  # past dates can't be booked
+    ]
+    return [
+        (day.strftime("%Y-%m-%d"), (day + trip_length).strftime("%Y-%m-%d") if trip_length is not None else None)
+        for day in dates
+    ]
+
+def _calendar_row(dep, ret, summary):
+    price_summary = summary.get("price_summary") or {}
+    return {
+        "depdate": dep,
+        "retdate": ret,
+        "min_price": price_summary.get("min_price"),
+        "currency": price_summary.get("currency"),
+        "options": len(summary.get("all_flights", [])),
+        "cheapest": summary.get("cheapest"),
+        "fastest": summary.get("fastest"),
+    }
+
+def _calendar_result(calendar_rows, flex_days):
+    priced = [row for row in calendar_rows if row.get("min_price") is not None]
+    best = min(priced, key=lambda row: row["min_price"]) if priced else None
+
+    return {
+        "flex_days": flex_days,  # window searched (requests above FARE_CALENDAR_MAX_DAYS are clamped)
+        "calendar": calendar_rows,
+        "cheapest_date": best["depdate"] if best else None,
+        "cheapest_price": best["min_price"] if best else None,
+        "currency": best["currency"] if best else None
+    }
+
+def fare_calendar_search(depfrom, arrto, depdate, flex_days=3, retdate=None, **search_kwargs):
+    """
+    Search every date in depdate ± flex_days concurrently and reduce each
+    result through summarize_skyexperts into a date → cheapest/fastest grid.
+    A return date (if any) shifts with the departure so trip length stays the same.
+    flex_days is clamped to FARE_CALENDAR_MAX_DAYS; the result's "flex_days" is the window used.
+    """
+    flex_days = clamp_flex_days(flex_days)
+    dates = _calendar_dates(depdate, flex_days, retdate)
+
+    def search_one(dep_ret):
+        dep, ret = dep_ret
+        try:
+            summary = search_and_summarize(build_search_payload(depfrom, arrto, dep, ret, **search_kwargs))
+        except Exception as e:
+            return {"depdate": dep, "retdate": ret, "error": str(e)}
+        return _calendar_row(dep, ret, summary)
+
+    if not dates:
+        return _calendar_result([], flex_days)
+
+    # Each search runs in a copy of this request's context, so it sees the request deadline
+    jobs = [(contextvars.copy_context(), dep_ret) for dep_ret in dates]
+    with ThreadPoolExecutor(max_workers=_calendar_workers(len(dates))) as pool:
+        calendar_rows = list(pool.map(lambda job: job[0].run(search_one, job[1]), jobs))
+    return _calendar_result(calendar_rows, flex_days)
+
+async def fare_calendar_search_async(depfrom, arrto, depdate, flex_days=3, retdate=None, **search_kwargs):
+    """fare_calendar_search with all dates in flight at once on the event loop."""
+    flex_days = clamp_flex_days(flex_days)
+    dates = _calendar_dates(depdate, flex_days, retdate)
+
+    async def search_one(dep, ret):
+        try:
+            summary = await search_and_summarize_async(build_search_payload(depfrom, arrto, dep, ret, **search_kwargs))
+        except Exception as e:
+            return {"depdate": dep, "retdate": ret, "error": str(e)}
+        return _calendar_row(dep, ret, summary)
+
+    if not dates:
+        return _calendar_result([], flex_days)
+    return _calendar_result(list(await asyncio.gather(*(search_one(dep, ret) for dep, ret in dates))), flex_days)
+
+def _parse_offline(user_query):
+    """Parser tiers 1-2 → (parsed or None, intent cache key, slots)."""
+    # ✅ Tier 1: plain "X to Y on DATE" queries → offline rule parser (no LLM)
+    parsed, confident = rule_parse_query(user_query)
+    if confident:
+        count_tier("rules")
+        return parsed, None, None
+
+    # ✅ Tier 2: same query shape seen before → reuse the parsed intent (date phrases stay raw)
+    parsed, cache_key, slots = intent_cache.lookup(user_query)
+    count_tier("cache" if parsed is not None else "llm")
+    return parsed, cache_key, slots
+
+def _parsed_from_reply(content, cache_key, slots):
+    """Tier 3 output → parsed dict (stored in the intent cache), or None if it isn't JSON."""
+    json_match = re.search(r"\{.*\}", content.strip(), re.DOTALL)
+    if not json_match:
+        return None
+
+    parsed = json.loads(json_match.group())
+    intent_cache.store(cache_key, slots, parsed)
+    return parsed
+
+def _search_params(parsed):
+    """Parsed intent → (search params, None), or (None, "incomplete" response) if fields are missing."""
+    depdate_raw = parsed.get("depdate")
+    retdate_raw = parsed.get("retdate")
+    depfrom = parsed.get("from")
+    arrto = parsed.get("to")
+
+    # Dep/ret phrases resolved together (ret is relative to dep)
+    depdate, retdate = resolve_trip_dates(depdate_raw, retdate_raw)
+
+    adults = int(parsed.get("adults", 1))
+    children = int(parsed.get("children", 0))
+    infants = int(parsed.get("infants", 0))
+    cabin = parsed.get("cabin", "economy").lower()
+    airline = parsed.get("airline_include", "")
+
+    # ✅ Missing field checks
+    missing_fields = []
+    follow_up_questions = []
+
+    if is_missing(depfrom):
+        missing_fields.append("from")
+        follow_up_questions.append("✈️ Where are you flying *from*?")
+    if is_missing(arrto):
+        missing_fields.append("to")
+        follow_up_questions.append("🛬 Where are you flying *to*?")
+    if not depdate_raw or not depdate:
+        missing_fields.append("depdate")
+        follow_up_questions.append("📅 When do you want to *depart*?")
+
+    if missing_fields:
+        return None, {
+            "status": "incomplete",
+            "message": f"Missing fields: {', '.join(missing_fields)}",
+            "missing_fields": missing_fields,
+            "follow_up": follow_up_questions,
+            "parsed": {
+                "from": depfrom,
+                "to": arrto,
+                "depdate": depdate_raw or None
+            }
+        }
+
+    return {
+        "depfrom": depfrom, "arrto": arrto, "depdate": depdate, "retdate": retdate,
+        "adults": adults, "children": children, "infants": infants, "cabin": cabin, "airline": airline,
+    }, None
+
+def _flight_response(params, **fields):
+    return {
+        "from": params["depfrom"],
+        "to": params["arrto"],
+        "depdate": params["depdate"],
+        "retdate": params["retdate"],
+        "adults": params["adults"],
+        "children": params["children"],
+        "infants": params["infants"],
+        "cabin": params["cabin"],
+        "airline_include": params["airline"] or None,
+        **fields,
+    }
+
+def run_smart_flight_search(user_query, flex_days=0):
     try:
         if not user_query:
             return {"error": "⚠️ Missing query"}
 
-        # Build the prompt
-        prompt = build_prompt(user_query)
-
-        # Call GPT-4o
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0
-        )
-
-        content = response.choices[0].message.content.strip()
-        json_match = re.search(r"\{.*\}", content, re.DOTALL)
-        if not json_match:
-            return {"error": "Invalid model output"}
-
-        parsed = json.loads(json_match.group())
-
-        depdate_raw = parsed.get("depdate")
-        retdate_raw = parsed.get("retdate")
-        depfrom = parsed.get("from")
-        arrto = parsed.get("to")
+        parsed, cache_key, slots = _parse_offline(user_query)
 
-        depdate = parse_date_string(depdate_raw) if depdate_raw else None
-        retdate = (
-            parse_date_string(retdate_raw, base_date=datetime.strptime(depdate, "%Y-%m-%d"))
-            if retdate_raw and depdate else None
-        )
+        # ✅ Tier 3: LLM
+        if parsed is None:
+            # Call GPT-4o
+            parsed = _parsed_from_reply(chat_completion(build_prompt(user_query)), cache_key, slots)
+            if parsed is None:
+                return {"error": "Invalid model output"}
 
-        adults = int(parsed.get("adults", 1))
-        children = int(parsed.get("children", 0))
-        infants = int(parsed.get("infants", 0))
-        cabin = parsed.get("cabin", "economy").lower()
-        airline = parsed.get("airline_include", "")
-
-        # ✅ Missing field checks
-        missing_fields = []
-        follow_up_questions = []
-
-        if is_missing(depfrom):
-            missing_fields.append("from")
-            follow_up_questions.append("✈️ Where are you flying *from*?")
-        if is_missing(arrto):
-            missing_fields.append("to")
-            follow_up_questions.append("🛬 Where are you flying *to*?")
-        if not depdate_raw or not depdate:
-            missing_fields.append("depdate")
-            follow_up_questions.append("📅 When do you want to *depart*?")
-
-        if missing_fields:
-            return {
-                "status": "incomplete",
-                "message": f"Missing fields: {', '.join(missing_fields)}",
-                "missing_fields": missing_fields,
-                "follow_up": follow_up_questions,
-                "parsed": {
-                    "from": depfrom,
-                    "to": arrto,
-                    "depdate": depdate_raw or None
-                }
-            }
+        params, incomplete = _search_params(parsed)
+        if incomplete:
+            return incomplete
 
-        # ✅ Prepare payload for SkyExperts API
-        payload = {
-            "adults": adults,
-            "children": children,
-            "infants": infants,
-            "cabin": cabin,
-            "stops": False,
-            "airline_include": airline,
-            "ages": [],
-            "sc": generate_sc(),
-            "segments": [{"depfrom": depfrom, "arrto": arrto, "depdate": depdate}]
-        }
-        if retdate:
-            payload["segments"].append({
-                "depfrom": arrto,
-                "arrto": depfrom,
-                "depdate": retdate
-            })
+        # ✅ Flexible dates → fare calendar instead of a single-date search
+        if flex_days:
+            fare_calendar = fare_calendar_search(**params, flex_days=flex_days)
+            return _flight_response(
+                params, flex_days=fare_calendar["flex_days"],
+                flight_search="✅ Fare calendar fetched from SkyExperts API", fare_calendar=fare_calendar,
+            )
 
         # ✅ Call SkyExperts API
-        # ✅ Call SkyExperts API
-        api_data = search_flights_skyexperts(payload)
-
-# Summarize flights
-        summary_dict = summarize_skyexperts(api_data)
-        mindtrip=trip_output(summary_dict, has_return=bool(retdate))
+        # Summarize flights (streamed + top-k when FLIGHT_STREAMING=1)
+        summary_dict = search_and_summarize(build_search_payload(**params))
+        mindtrip = trip_output(summary_dict, has_return=bool(params["retdate"]))
+        return _flight_response(
+            params, flight_search="✅ Flights fetched from SkyExperts API",
+            flights=mindtrip,   # ✅ direct flights summary o
+        )
 
-        return {
-            "from": depfrom,
-            "to": arrto,
-            "depdate": depdate,
-            "retdate": retdate,
-            "adults": adults,
-            "children": children,
-            "infants": infants,
-            "cabin": cabin,
-            "airline_include": airline or None,
-            "flight_search": "✅ Flights fetched from SkyExperts API",
-            "flights": mindtrip,   # ✅ direct flights summary o
-}
+    except (UpstreamBusy, DeadlineExceeded):
+        raise  # /query answers 503 with a retry hint / 504
+    except Exception as e:
+        return {"error": str(e)}
 
+async def run_smart_flight_search_async(user_query, flex_days=0):
+    """run_smart_flight_search with the LLM and SkyExperts calls on the async clients."""
+    try:
+        if not user_query:
+            return {"error": "⚠️ Missing query"}
 
+        parsed, cache_key, slots = _parse_offline(user_query)
+        if parsed is None:
+            parsed = _parsed_from_reply(await chat_completion_async(build_prompt(user_query)), cache_key, slots)
+            if parsed is None:
+                return {"error": "Invalid model output"}
+
+        params, incomplete = _search_params(parsed)
+        if incomplete:
+            return incomplete
+
+        if flex_days:
+            fare_calendar = await fare_calendar_search_async(**params, flex_days=flex_days)
+            return _flight_response(
+                params, flex_days=fare_calendar["flex_days"],
+                flight_search="✅ Fare calendar fetched from SkyExperts API", fare_calendar=fare_calendar,
+            )
+
+        summary_dict = await search_and_summarize_async(build_search_payload(**params))
+        return _flight_response(
+            params, flight_search="✅ Flights fetched from SkyExperts API",
+            flights=trip_output(summary_dict, has_return=bool(params["retdate"])),
+        )
 
+    except (UpstreamBusy, DeadlineExceeded):
+        raise
     except Exception as e:
         return {"error": str(e)}
 
@@ -0,0 +1,110 @@
+"""
+Static grid index over (lat, lon) points for radius and k-nearest queries.
+
+Points are bucketed into square cells of `cell_deg` degrees. Cell keys (row * 2**32 + col)
+are sorted, so a row of cells is one contiguous key range: a query does one binary search
+per cell row it spans (O(rows · log n)) plus haversine distances on the candidates.
+Everything is plain NumPy arrays; there is no per-point Python object.
+"""
+import math
+import os
+
+import numpy as np
+
+SPATIAL_CELL_DEG = float(os.getenv("SPATIAL_CELL_DEG", 0.01))  # ~1.1 km
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180
+_COL_OFFSET = 1 << 31
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance; works elementwise on NumPy arrays."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class SpatialIndex:
+    """
+    Grid index over rows with valid coordinates; rows without coordinates are never returned.
+    Returned row ids are `offset` + position in lat / lon (e.g. a city's span within a table).
+    """
+
+    def __init__(self, lat, lon, cell_deg=SPATIAL_CELL_DEG, offset=0):
+        self.cell_deg = cell_deg
+        self.offset = offset
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+
+        valid = np.flatnonzero(np.isfinite(self.lat) & np.isfinite(self.lon))
+        keys = self._keys(self._cell(self.lat[valid]), self._cell(self.lon[valid]))
+        order = np.argsort(keys, kind="stable")
+        self.points = valid[order]                      # row ids, grouped by cell
+        self.cell_keys, starts = np.unique(keys[order], return_index=True)
+        self.cell_starts = np.append(starts, len(self.points)).astype(np.int64)
+        if len(valid):
+            self.bounds = (self.lat[valid].min(), self.lat[valid].max(), self.lon[valid].min(), self.lon[valid].max())
+        else:
+            self.bounds = None
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, deg):
+        return np.floor(np.asarray(deg) / self.cell_deg).astype(np.int64)
+
+    @staticmethod
+    def _keys(rows, cols):
+        return (rows << 32) + (cols + _COL_OFFSET)
+
+    def _candidates(self, lat, lon, km):
+        """Row ids in all cells overlapping the bounding box of the circle."""
+        dlat = km / KM_PER_DEG_LAT
+        dlon = km / (KM_PER_DEG_LAT * max(math.cos(math.radians(min(abs(lat) + dlat, 89.9))), 1e-6))
+        row_lo, row_hi = self._cell(lat - dlat), self._cell(lat + dlat)
+        col_lo, col_hi = self._cell(lon - dlon), self._cell(lon + dlon)
+        rows = np.arange(row_lo, row_hi + 1, dtype=np.int64)
+        first = np.searchsorted(self.cell_keys, self._keys(rows, col_lo), side="left")
+        last = np.searchsorted(self.cell_keys, self._keys(rows, col_hi), side="right")
+        spans = [(self.cell_starts[a], self.cell_starts[b]) for a, b in zip(first, last) if b > a]
+        if not spans:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([self.points[s:e] for s, e in spans])
+
+    def radius(self, lat, lon, km):
+        """[(row, distance_km)] within `km`, nearest first."""
+        cand = self._candidates(lat, lon, km)
+        dist = haversine_km(lat, lon, self.lat[cand], self.lon[cand])
+        keep = dist <= km
+        cand, dist = cand[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")
+        return [(int(r) + self.offset, float(d)) for r, d in zip(cand[order], dist[order])]
+
+    def _excluded(self, exclude):
+        """How many of the indexed rows are in `exclude`."""
+        n = len(self.lat)
+        return sum(
+            1 for r in exclude
+            if 0 <= r - self.offset < n and np.isfinite(self.lat[r - self.offset]) and np.isfinite(self.lon[r - self.offset])
+        )
+
+    def nearest(self, lat, lon, k=1, exclude=None):
+        """
+        [(row, distance_km)] for the k nearest rows, nearest first.
+        Grows the search radius from one cell until k rows lie inside it (or the data is covered).
+        `exclude` is a set of row ids to skip.
+        """
+        if self.bounds is None or not (np.isfinite(lat) and np.isfinite(lon)):
+            return []
+        exclude = exclude or ()
+        if exclude and self._excluded(exclude) >= len(self.points):
+            return []
+        lat_lo, lat_hi, lon_lo, lon_hi = self.bounds
+        reach = float(haversine_km(lat, lon, np.array([lat_lo, lat_lo, lat_hi, lat_hi]),
+                                   np.array([lon_lo, lon_hi, lon_lo, lon_hi])).max())
+        km = self.cell_deg * KM_PER_DEG_LAT
+        while True:
+            found = [(r, d) for r, d in self.radius(lat, lon, km) if r not in exclude]
+            if len(found) >= k or km >= reach:
+                return found[:k]
+            km *= 2
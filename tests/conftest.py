@@ -0,0 +1,46 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Same shape as itinerary.py's maps (importing it would load the real catalog)
+PREFERENCE_MAP = {
+    "beach": ["Beach", "Water Park", "Island", "Waterway"],
+    "culture": ["Heritage", "Cultural", "Museum", "Religious", "Memorial"],
+    "shopping": ["Shopping", "Mall", "Souq", "Market"],
+}
+TIME_BASED_MAP = {
+    "Morning": ["Museum", "Heritage", "Cultural", "Religious"],
+    "Afternoon": ["Shopping", "Mall", "Souq", "Market"],
+    "Evening": ["Desert", "Safari", "Water Park"],
+}
+
+
+def make_catalog(n, categories, seed=0, city="Dubai"):
+    """build_catalog over n synthetic attractions in a ~40 x 40 km box, no hotels / restaurants."""
+    import pandas as pd
+
+    from catalog_index import build_catalog
+
+    rng = random.Random(seed)
+    attractions = pd.DataFrame({
+        "Name": [f"Attraction {i}" for i in range(n)],
+        "City": city,
+        "Category": [rng.choice(categories) for _ in range(n)],
+        "Description": "",
+        "Latitude": [rng.uniform(25.0, 25.36) for _ in range(n)],
+        "Longitude": [rng.uniform(55.06, 55.46) for _ in range(n)],
+    })
+    hotels = pd.DataFrame(columns=["HotelName", "HotelRating", "cityName"])
+    restaurants = pd.DataFrame(columns=[
+        "Restaurant Name", "City", "Cuisines", "Aggregate rating", "Votes", "Average Cost for two",
+    ])
+    return build_catalog(attractions, hotels, restaurants, PREFERENCE_MAP, TIME_BASED_MAP).city(city)
+
+
+@pytest.fixture
+def catalog_factory():
+    return make_catalog
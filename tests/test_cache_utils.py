@@ -0,0 +1,62 @@
+import pytest
+
+import cache_utils
+from cache_utils import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_negative_results_expire_after_negative_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_utils.time, "monotonic", clock)
+    cache = TTLCache(ttl=300, stale_ttl=600, negative_ttl=30, is_negative=lambda v: "error" in v)
+    cache.set("bad", {"error": "No flights found"})
+    cache.set("good", {"Data": [1]})
+
+    clock.now += 31
+    assert cache.get("bad") is None
+    assert cache.get("good") == {"Data": [1]}
+
+
+def test_negative_results_are_not_served_stale(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_utils.time, "monotonic", clock)
+    cache = TTLCache(ttl=300, stale_ttl=600, negative_ttl=30, is_negative=lambda v: "error" in v)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"error": "upstream hiccup"} if len(calls) == 1 else {"Data": [1]}
+
+    assert cache.get_or_load("k", loader) == {"error": "upstream hiccup"}
+    assert cache.get_or_load("k", loader) == {"error": "upstream hiccup"}  # within negative_ttl
+    clock.now += 31
+    assert cache.get_or_load("k", loader) == {"Data": [1]}                 # reloaded inline
+    assert len(calls) == 2
+
+
+def test_loader_errors_are_not_cached():
+    cache = TTLCache(ttl=300)
+
+    def failing():
+        raise ValueError("502")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.get_or_load("k", failing)
+    assert cache.stats()["size"] == 0
+
+
+def test_peek_is_not_counted():
+    cache = TTLCache(ttl=300)
+    cache.set("k", 1)
+    assert cache.peek("k") == 1
+    assert cache.peek("missing") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 0)
@@ -0,0 +1,49 @@
+import random
+from collections import Counter
+
+from catalog_index import LazyShuffle
+from route_planner import DAY_SLOTS
+
+
+def test_lazy_shuffle_draws_every_row_once():
+    for rows in (range(50), list(range(100, 140))):
+        shuffle = LazyShuffle(rows)
+        drawn = [shuffle.draw() for _ in range(len(rows))]
+        assert sorted(drawn) == sorted(rows)
+        assert shuffle.draw() is None
+
+
+def test_lazy_shuffle_is_uniform():
+    random.seed(1)
+    firsts = Counter(LazyShuffle(range(5)).draw() for _ in range(5000))
+    assert set(firsts) == set(range(5))
+    assert max(firsts.values()) - min(firsts.values()) < 250
+
+
+def test_picker_prefers_slot_then_preference_and_never_repeats(catalog_factory):
+    catalog = catalog_factory(120, ["Museum", "Mall", "Desert Safari", "Beach", "Water Park", "Landmark"], seed=2)
+    random.seed(4)
+    picker = catalog.picker(["Beach"], {"beach": ["Beach", "Water Park"]})
+    names = []
+    for _ in range(5):
+        for slot in DAY_SLOTS:
+            pick = picker.pick(slot)
+            names.append(pick.name)
+            if slot == "Evening":
+                # Water Park suits the evening and matches the preference, so it wins over Desert Safari
+                assert pick.category == "Water Park"
+            else:
+                assert pick.category == {"Morning": "Museum", "Afternoon": "Mall"}[slot]
+    assert len(names) == len(set(names))
+
+    # Once everything is used up the picker returns None
+    while picker.pick_index("Morning") is not None:
+        pass
+    assert picker.pick("Evening") is None
+
+
+def test_rotated_rows_cover_the_span_once(catalog_factory):
+    catalog = catalog_factory(30, ["Museum"], seed=1)
+    view = catalog.attractions.rotated()
+    assert sorted(view[i].name for i in range(len(view))) == sorted(
+        catalog.attractions[i].name for i in range(len(catalog.attractions)))
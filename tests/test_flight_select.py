@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from flight_select import FlightSelector, TopK
+
+
+def make_flights(n, seed):
+    # Small integer ranges so there are many ties on price, minutes and stops
+    rng = random.Random(seed)
+    return [(i, rng.randint(80, 120), rng.randint(100, 140), rng.choice([0, 0, 1, 2])) for i in range(n)]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_rankings_equal_stable_sort(seed):
+    flights = make_flights(300, seed)
+    k = 5
+    selector = FlightSelector({"cheapest": k, "fastest": k, "direct": k, "fewest_stops": k})
+    for f in flights:
+        selector.add(f, f[1], f[2], f[3])
+    results = selector.results()
+
+    assert results["cheapest"] == sorted(flights, key=lambda f: f[1])[:k]
+    assert results["fastest"] == sorted(flights, key=lambda f: f[2])[:k]
+    assert results["fewest_stops"] == sorted(flights, key=lambda f: (f[3], f[1]))[:k]
+    assert results["direct"] == [f for f in flights if f[3] == 0][:k]
+    assert selector.min_price == min(f[1] for f in flights)
+    assert selector.max_price == max(f[1] for f in flights)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_pareto_is_the_undominated_set(seed):
+    flights = make_flights(300, seed)
+    selector = FlightSelector()
+    for f in flights:
+        selector.add(f, f[1], f[2], f[3])
+
+    points = {(f[1], f[2]) for f in flights}
+    expected = sorted(
+        p for p in points
+        if not any(q != p and q[0] <= p[0] and q[1] <= p[1] for q in points)
+    )
+    assert [(f[1], f[2]) for f in selector.results()["pareto"]] == expected
+
+
+def test_topk_ties_keep_arrival_order():
+    top = TopK(3)
+    for item in "abcde":
+        top.push(1, item)
+    assert top.items() == ["a", "b", "c"]
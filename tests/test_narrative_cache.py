@@ -0,0 +1,11 @@
+from narrative_cache import NarrativeCache
+
+
+def test_store_does_not_count_lookups():
+    cache = NarrativeCache(variants=2, path=None)
+    assert cache.lookup("k") is None          # one miss
+    cache.store("k", "first")
+    cache.store("k", "second")
+    assert cache.lookup("k") in ("first", "second")   # one hit
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
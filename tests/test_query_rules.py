@@ -0,0 +1,26 @@
+import pytest
+
+from query_rules import rule_parse_query
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Flights from Delhi to Dubai tomorrow", ("DEL", "DXB")),
+    ("flight to dubai from chennai on 2026-12-01 return 2026-12-15", ("MAA", "DXB")),
+    ("cheap indigo flight hyderabad to dubai 20 oct", ("HYD", "DXB")),
+])
+def test_plain_queries_are_confident(query, expected):
+    parsed, confident = rule_parse_query(query)
+    assert confident
+    assert (parsed["from"], parsed["to"]) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "dubai to delhi tomorrow no indigo",
+    "dubai to delhi tomorrow without indigo",
+    "delhi to dubai tomorrow avoid air india",
+    "delhi dubai delhi tomorrow",
+    "delhi to dubai to mumbai tomorrow",
+    "flights from delhi to dubai or sharjah tomorrow",
+])
+def test_negation_and_extra_airports_go_to_the_llm(query):
+    assert not rule_parse_query(query)[1]
@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+
+from catalog_index import Hotel
+from route_planner import DAY_SLOTS, cluster_days, distance_matrix
+
+HOTEL = Hotel("Central hotel", "5-Star", 25.18, 55.26)
+
+
+def _picks(catalog, days):
+    picker = catalog.picker([], {})
+    return [[i for i in (picker.pick_index(slot) for slot in DAY_SLOTS) if i is not None] for _ in range(days)]
+
+
+def test_planning_never_adds_slot_mismatches(catalog_factory):
+    # Few slot-suited places, so many picks are fallbacks placed in slots they don't suit
+    catalog = catalog_factory(60, ["Museum", "Mall", "Desert Safari", "Landmark", "Landmark", "Park"], seed=3)
+    for seed in range(30):
+        random.seed(seed)
+        days = _picks(catalog, 4 + seed % 5)
+        planned = catalog.plan_days(days, HOTEL)
+        assert sorted(i for day in planned for i in day) == sorted(i for day in days for i in day)
+        assert sorted(map(len, planned)) == sorted(map(len, days))
+        assert catalog.slot_mismatches(planned) <= catalog.slot_mismatches(days)
+
+
+def test_suited_picks_stay_in_their_slot(catalog_factory):
+    catalog = catalog_factory(90, ["Museum", "Mall", "Desert Safari"], seed=5)
+    days = _picks(catalog, 7)
+    assert catalog.slot_mismatches(days) == 0
+    for day in catalog.plan_days(days, HOTEL):
+        assert [catalog.attractions[i].category for i in day] == ["Museum", "Mall", "Desert Safari"]
+
+
+def test_cluster_days_respects_class_capacities():
+    rng = np.random.default_rng(1)
+    dist = distance_matrix(rng.uniform(25.0, 25.4, 12), rng.uniform(55.0, 55.4, 12))
+    classes = np.array([0, 1, 2] * 4)
+    groups = cluster_days(dist, [[1, 1, 1]] * 4, classes)
+    assert sorted(p for g in groups for p in g) == list(range(12))
+    for group in groups:
+        assert sorted(classes[group].tolist()) == [0, 1, 2]
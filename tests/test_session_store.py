@@ -0,0 +1,50 @@
+import session_store
+from session_store import MemorySessionStore, SQLiteSessionStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_store_is_bounded_and_evicts_least_recently_used(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store.time, "time", clock)
+    store = MemorySessionStore(ttl=600, maxsize=3)
+    ids = [store.get()[0] for _ in range(3)]
+    store.get(ids[0])                # ids[0] is now the most recently used
+    new_id, _ = store.get()
+    assert len(store) == 3
+    assert ids[1] not in store and ids[0] in store and new_id in store
+    assert store.stats()["evicted"] == 1
+
+
+def test_memory_store_expires_idle_sessions(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store.time, "time", clock)
+    store = MemorySessionStore(ttl=600, maxsize=100)
+    old_id, state = store.get()
+    state["last_parsed"] = {"from": "DEL"}
+    clock.now += 300
+    live_id, _ = store.get()
+    clock.now += 301                 # old_id idle 601 s, live_id 301 s
+
+    session_id, state = store.get(old_id)
+    assert session_id == old_id and state["last_parsed"] is None   # fresh state under the same id
+    assert live_id in store
+    assert store.stats()["expired"] == 1
+
+
+def test_sqlite_store_shares_state_and_counts_rows(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store, other = SQLiteSessionStore(path=path), SQLiteSessionStore(path=path)
+    session_id, state = store.get()
+    parsed = dict.fromkeys(session_store.PARSED_FIELDS)
+    parsed.update(city="Dubai", days=3, preferences=["beach"])
+    state["last_parsed"] = parsed
+    store.save(session_id, state)
+    assert other.get(session_id)[1]["last_parsed"] == parsed
+    assert other.stats()["active"] == len(other) == 1
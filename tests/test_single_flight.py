@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_threads_share_one_call_per_key():
+    flight = SingleFlight("test", enabled=True)
+    calls = {"a": 0, "b": 0}
+    lock = threading.Lock()
+    start = threading.Barrier(16)
+
+    def upstream(key):
+        with lock:
+            calls[key] += 1
+        time.sleep(0.2)
+        return f"result {key}"
+
+    def caller(i):
+        key = "ab"[i % 2]
+        start.wait()
+        return flight.do(key, lambda: upstream(key))
+
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(caller, range(16)))
+
+    assert calls == {"a": 1, "b": 1}
+    assert results == ["result a", "result b"] * 8
+    stats = flight.stats()
+    assert (stats["upstream"], stats["coalesced"], stats["in_flight"]) == (2, 14, 0)
+
+
+def test_waiters_get_the_leaders_exception_and_nothing_is_kept():
+    flight = SingleFlight("test", enabled=True)
+    calls = []
+    start = threading.Barrier(4)
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("upstream down")
+
+    def caller(_):
+        start.wait()
+        with pytest.raises(ValueError):
+            flight.do("k", failing)
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(caller, range(4)))
+    assert len(calls) == 1
+
+    assert flight.do("k", lambda: "fresh") == "fresh"   # the next call starts a new one
+
+
+def test_async_callers_share_one_call_per_key():
+    flight = SingleFlight("test", enabled=True)
+    calls = []
+
+    async def upstream(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return key.upper()
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async(k, lambda k=k: upstream(k)) for k in "abab" * 5))
+
+    assert asyncio.run(main()) == list("ABAB" * 5)
+    assert sorted(calls) == ["a", "b"]
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from spatial_index import SpatialIndex, haversine_km
+
+
+def brute_nearest(lat, lon, qlat, qlon, k, exclude=()):
+    dist = haversine_km(qlat, qlon, lat, lon)
+    order = [int(r) for r in np.argsort(dist, kind="stable") if np.isfinite(dist[r]) and r not in exclude]
+    return order[:k]
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(7)
+    lat = rng.uniform(24.0, 25.5, 3000)
+    lon = rng.uniform(54.0, 56.0, 3000)
+    lat[::50] = np.nan  # rows without coordinates are never returned
+    return lat, lon, rng
+
+
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_nearest_matches_brute_force(points, k):
+    lat, lon, rng = points
+    index = SpatialIndex(lat, lon)
+    for qlat, qlon in zip(rng.uniform(23.8, 25.7, 50), rng.uniform(53.8, 56.2, 50)):
+        got = index.nearest(qlat, qlon, k)
+        assert [r for r, _ in got] == brute_nearest(lat, lon, qlat, qlon, k)
+        assert all(a[1] <= b[1] for a, b in zip(got, got[1:]))
+
+
+def test_radius_matches_brute_force(points):
+    lat, lon, rng = points
+    index = SpatialIndex(lat, lon)
+    for qlat, qlon in zip(rng.uniform(24.0, 25.5, 50), rng.uniform(54.0, 56.0, 50)):
+        expected = np.flatnonzero(haversine_km(qlat, qlon, lat, lon) <= 5.0).tolist()
+        assert sorted(r for r, _ in index.radius(qlat, qlon, 5.0)) == expected
+
+
+def test_offset_and_exclude(points):
+    lat, lon, _ = points
+    index = SpatialIndex(lat[1000:2000], lon[1000:2000], offset=1000)
+    exclude = {r for r, _ in index.nearest(24.7, 55.0, 10)}
+    got = [r for r, _ in index.nearest(24.7, 55.0, 3, exclude=exclude)]
+    assert got == [r + 1000 for r in brute_nearest(lat[1000:2000], lon[1000:2000], 24.7, 55.0, 3,
+                                                   {r - 1000 for r in exclude})]
+    assert index.nearest(24.7, 55.0, 1, exclude=set(range(1000, 2000))) == []
+
+
+def test_empty_index():
+    index = SpatialIndex(np.array([np.nan]), np.array([np.nan]))
+    assert index.nearest(25.0, 55.0) == []
+
+
+def test_table_nearest_stays_in_the_city():
+    from catalog_index import CodedColumn, Hotel, StringColumn, Table
+
+    lat = np.array([25.20, 25.21, np.nan, 24.40, 24.41])
+    lon = np.array([55.30, 55.31, 1.0, 54.40, 54.41])
+    table = Table(Hotel, (StringColumn(list("abcde")), CodedColumn(["x"] * 5), lat, lon),
+                  {"dubai": (0, 3), "abu dhabi": (3, 5), "ajman": (5, 5)})
+    assert [r for r, _ in table.nearest("abu dhabi", 25.2, 55.3, k=5)] == [4, 3]
+    assert [r for r, _ in table.nearest("dubai", 24.4, 54.4, k=5)] == [0, 1]
+    assert table.nearest("dubai", 25.2, 55.3, exclude={0, 1}) == []
+    assert table.nearest("ajman", 25.2, 55.3) == []
+    assert table.nearest("sharjah", 25.2, 55.3) == []
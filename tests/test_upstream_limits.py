@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from upstream_limits import UpstreamBusy, UpstreamLimiter
+
+
+def test_threads_respect_the_in_flight_cap_and_fifo_order():
+    limiter = UpstreamLimiter("test", max_in_flight=2, max_queue=32, call_seconds=0.05)
+    lock = threading.Lock()
+    active, peak, admitted = [0], [0], []
+
+    def call(i):
+        with limiter.slot(wait=10):
+            with lock:
+                admitted.append(i)
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = []
+    for i in range(10):  # arrive one by one so the queue order is known
+        threads.append(threading.Thread(target=call, args=(i,)))
+        threads[-1].start()
+        time.sleep(0.005)
+    for t in threads:
+        t.join()
+
+    assert peak[0] == 2
+    assert admitted == list(range(10))
+    stats = limiter.stats()
+    assert (stats["admitted"], stats["in_flight"], stats["queue_depth"]) == (10, 0, 0)
+
+
+def test_full_queue_is_rejected_with_a_retry_hint():
+    limiter = UpstreamLimiter("test", max_in_flight=1, max_queue=1, call_seconds=0.2)
+    release = threading.Event()
+
+    def hold():
+        with limiter.slot(wait=10):
+            release.wait(5)
+
+    def queued():
+        with limiter.slot(wait=10):
+            pass
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    time.sleep(0.02)
+    waiter = threading.Thread(target=queued)
+    waiter.start()
+    time.sleep(0.02)
+
+    with pytest.raises(UpstreamBusy) as busy:
+        with limiter.slot(wait=10):
+            pass
+    assert busy.value.retry_after >= 1
+    assert limiter.stats()["rejected_queue_full"] == 1
+
+    release.set()
+    holder.join()
+    waiter.join()
+
+
+def test_tasks_respect_the_in_flight_cap_and_fifo_order():
+    limiter = UpstreamLimiter("test", max_in_flight=3, max_queue=32, call_seconds=0.02)
+    active, peak, admitted = [0], [0], []
+
+    async def call(i):
+        async with limiter.aslot(wait=10):
+            admitted.append(i)
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.02)
+            active[0] -= 1
+
+    async def main():
+        tasks = []
+        for i in range(12):
+            tasks.append(asyncio.ensure_future(call(i)))
+            await asyncio.sleep(0)  # let it reach the queue before the next one
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert peak[0] == 3
+    assert admitted == list(range(12))
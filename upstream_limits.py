@@ -0,0 +1,255 @@
+"""
+Per-upstream admission control for OpenAI and SkyExperts, per worker process.
+
+Each upstream has a token bucket (RATE calls/s, bursts up to BURST) and a cap on calls
+in flight (MAX_IN_FLIGHT). A call that can't start right away waits in a FIFO queue of at
+most MAX_QUEUE callers. It is turned away at once, with an UpstreamBusy carrying a retry
+hint, when the queue is full or when the expected wait is longer than the caller can
+afford (`wait`: UPSTREAM_MAX_WAIT, or less if the request deadline is closer), instead
+of timing out later.
+
+    with openai_limit.slot():               # threads (Flask / gunicorn)
+        ...
+    async with openai_limit.aslot():        # event loop (async_app)
+        ...
+
+Env per upstream (prefix OPENAI_ / SKYEXPERTS_): RATE (0 = no rate limit), BURST,
+MAX_IN_FLIGHT (0 = no cap), MAX_QUEUE, CALL_SECONDS (typical call time, used for wait
+estimates until real calls have been timed).
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from deadline import budget
+
+UPSTREAM_MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", 10))   # seconds a call may queue
+WAIT_SAMPLES = 1000                                              # recent queue waits kept for p50/p99
+
+
+class UpstreamBusy(Exception):
+    """An upstream call was not admitted; retry_after is a hint in whole seconds."""
+
+    def __init__(self, upstream, reason, retry_after):
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"{upstream} is busy ({reason}), retry in {self.retry_after} s")
+
+
+class _Waiter:
+    __slots__ = ("event", "loop", "future", "granted", "queued_at")
+
+    def __init__(self, queued_at, loop=None):
+        self.queued_at = queued_at
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+        self.granted = False
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class UpstreamLimiter:
+    """
+    Token bucket + max-in-flight + bounded FIFO wait queue for one upstream.
+    Threads and event-loop tasks share the same queue and counters. Queued callers are
+    admitted in arrival order when a call finishes or a token comes due.
+    """
+
+    def __init__(self, name, rate=0.0, burst=1, max_in_flight=0, max_queue=0, call_seconds=1.0):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._in_flight = 0
+        self._queue = deque()          # _Waiter, oldest first
+        self._call_seconds = call_seconds  # moving average of call duration, for wait estimates
+        self._timed_calls = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._lock = threading.Lock()
+        self._stats = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_deadline": 0,
+                       "timed_out": 0, "max_queue_depth": 0}
+
+    @classmethod
+    def from_env(cls, prefix, rate, burst, max_in_flight, max_queue, call_seconds):
+        return cls(
+            prefix.lower(),
+            rate=float(os.getenv(f"{prefix}_RATE", rate)),
+            burst=int(os.getenv(f"{prefix}_BURST", burst)),
+            max_in_flight=int(os.getenv(f"{prefix}_MAX_IN_FLIGHT", max_in_flight)),
+            max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", max_queue)),
+            call_seconds=float(os.getenv(f"{prefix}_CALL_SECONDS", call_seconds)),
+        )
+
+    @contextmanager
+    def slot(self, wait=None):
+        """Hold one call slot for the body of the `with` (blocks this thread while queued)."""
+        waiter, end = self._enter(None, wait)
+        while waiter is not None:
+            waiter.event.wait(self._next_check(end))
+            waiter = self._check(waiter, end)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(started)
+
+    @asynccontextmanager
+    async def aslot(self, wait=None):
+        """slot() for the event loop: queued callers await instead of blocking."""
+        waiter, end = self._enter(asyncio.get_running_loop(), wait)
+        try:
+            while waiter is not None:
+                await asyncio.wait([waiter.future], timeout=self._next_check(end))
+                waiter = self._check(waiter, end)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(started)
+
+    def stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            waits = sorted(self._waits)
+            return {
+                **self._stats,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._queue),
+                "tokens": round(self._tokens, 2),
+                "wait_ms_p50": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                "wait_ms_p99": round(waits[int(len(waits) * 0.99)] * 1000, 1) if waits else 0.0,
+                "avg_call_ms": round(self._call_seconds * 1000, 1),
+                "rate": self.rate,
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+            }
+
+    # --- internals ---
+    def _enter(self, loop, wait):
+        """Admit now → (None, None); queue → (waiter, give-up time); else raise UpstreamBusy."""
+        wait = budget(UPSTREAM_MAX_WAIT) if wait is None else wait
+        now = time.monotonic()
+        with self._lock:
+            self._refill(now)
+            if not self._queue and self._can_start():
+                self._start(0.0)
+                return None, None
+            if len(self._queue) >= self.max_queue:
+                self._stats["rejected_queue_full"] += 1
+                raise UpstreamBusy(self.name, "queue full", self._expected_wait(len(self._queue)))
+            expected = self._expected_wait(len(self._queue) + 1)
+            if expected > wait:
+                self._stats["rejected_deadline"] += 1
+                raise UpstreamBusy(self.name, f"expected wait {expected:.1f} s", expected)
+            waiter = _Waiter(now, loop)
+            self._queue.append(waiter)
+            self._stats["queued"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._queue))
+            return waiter, now + wait
+
+    def _check(self, waiter, end):
+        """After a wake-up or timeout: None once admitted, the waiter if still queued."""
+        now = time.monotonic()
+        with self._lock:
+            self._refill(now)
+            self._grant()
+            if waiter.granted:
+                return None
+            if now < end:
+                return waiter
+            self._queue.remove(waiter)
+            self._stats["timed_out"] += 1
+            retry_after = self._expected_wait(len(self._queue) + 1)
+        raise UpstreamBusy(self.name, "queue wait timed out", retry_after)
+
+    def _abandon(self, waiter):
+        with self._lock:
+            if waiter.granted:
+                self._in_flight -= 1
+                self._grant()
+            else:
+                self._queue.remove(waiter)
+
+    def _release(self, started):
+        with self._lock:
+            self._in_flight -= 1
+            took = time.monotonic() - started
+            self._timed_calls += 1
+            # first timed call replaces the configured guess, then a moving average
+            weight = 1.0 if self._timed_calls == 1 else 0.1
+            self._call_seconds += weight * (took - self._call_seconds)
+            self._refill(time.monotonic())
+            self._grant()
+
+    def _next_check(self, end):
+        """How long a queued caller sleeps before looking again: next token or its give-up time."""
+        now = time.monotonic()
+        with self._lock:
+            token_due = (1 - self._tokens) / self.rate if self.rate > 0 and self._tokens < 1 else math.inf
+        return max(0.001, min(end - now, token_due))
+
+    # --- caller holds the lock ---
+    def _refill(self, now):
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _can_start(self):
+        return ((self.max_in_flight <= 0 or self._in_flight < self.max_in_flight)
+                and (self.rate <= 0 or self._tokens >= 1))
+
+    def _start(self, waited):
+        if self.rate > 0:
+            self._tokens -= 1
+        self._in_flight += 1
+        self._stats["admitted"] += 1
+        self._waits.append(waited)
+
+    def _grant(self):
+        """Admit queued callers from the front while there is room."""
+        now = time.monotonic()
+        while self._queue and self._can_start():
+            waiter = self._queue.popleft()
+            waiter.granted = True
+            self._start(now - waiter.queued_at)
+            waiter.wake()
+
+    def _expected_wait(self, position):
+        """Rough seconds until the caller at queue `position` (1 = next) can start."""
+        for_token = (position - self._tokens) / self.rate if self.rate > 0 else 0.0
+        for_slot = 0.0
+        if self.max_in_flight > 0 and self._in_flight >= self.max_in_flight:
+            # calls end staggered: about max_in_flight slots free up per average call
+            for_slot = position / self.max_in_flight * self._call_seconds
+        return max(for_token, for_slot, 0.0)
+
+
+openai_limit = UpstreamLimiter.from_env("OPENAI", rate=20, burst=20, max_in_flight=32, max_queue=64,
+                                       call_seconds=2)
+skyexperts_limit = UpstreamLimiter.from_env("SKYEXPERTS", rate=10, burst=10, max_in_flight=16, max_queue=64,
+                                           call_seconds=3)
+
+
+def upstream_limit_stats():
+    return {limiter.name: limiter.stats() for limiter in (openai_limit, skyexperts_limit)}